@@ -0,0 +1,218 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from json_store import load_json, save_json
+from meter_policy import get_policy_table
+from models import MeterReading
+
+
+@dataclass(slots=True)
+class MeterOutlook:
+    """What the scheduler knows about one meter when planning its next check"""
+    account_number: str
+    balance: Optional[float] = None
+    # Average BDT per day over the recent daily rollups
+    burn_per_day: Optional[float] = None
+    level: Optional[str] = None
+    # When the balance was scraped
+    read_at: Optional[datetime] = None
+    interval_hours: Optional[float] = None
+
+    @property
+    def hours_left(self):
+        if self.balance is None or not self.burn_per_day or self.burn_per_day <= 0:
+            return None
+        return max(self.balance, 0.0) / self.burn_per_day * 24
+
+    def predicted_balance(self, now):
+        """Balance now, assuming it kept dropping at burn_per_day since it was read (None if unknown)"""
+        if self.balance is None:
+            return None
+        if not self.burn_per_day or not self.read_at or now <= self.read_at:
+            return self.balance
+        return self.balance - self.burn_per_day * (now - self.read_at).total_seconds() / 86400
+
+
+def meter_outlooks(history, accounts, policies, burn_days=14, now=None):
+    """MeterOutlook per account from the cached latest readings and one daily-rollup query"""
+    now = now or datetime.now()
+    start = (now - timedelta(days=burn_days)).date().isoformat()
+    # Today is still in progress, so only complete days count towards the rate
+    end = (now - timedelta(days=1)).date().isoformat()
+    usage = {}
+    for row in history.get_rollups(None, 'daily', start, end):
+        days, total = usage.get(row['account_number'], (0, 0.0))
+        usage[row['account_number']] = (days + 1, total + row['consumption'])
+
+    latest = history.get_latest()
+    outlooks = []
+    for account_number in accounts:
+        outlook = MeterOutlook(account_number)
+        if account_number in latest:
+            reading = MeterReading.from_dict(latest[account_number])
+            outlook.balance = reading.balance
+            outlook.read_at = reading.timestamp
+            outlook.level = policies.get(account_number, reading.nickname).level(reading.balance)
+        days, total = usage.get(account_number, (0, 0.0))
+        if days:
+            outlook.burn_per_day = total / days
+        outlooks.append(outlook)
+    return outlooks
+
+
+def desired_interval(outlook, min_hours, max_hours, default_hours, check_fraction):
+    """Hours until a meter should be checked again, before any budget is applied.
+
+    Meters already low/critical are checked every min_hours; others get
+    check_fraction of the time their balance is predicted to last.
+    """
+    if outlook.level in ('low', 'critical'):
+        return min_hours
+    hours_left = outlook.hours_left
+    if hours_left is None:
+        # No burn rate yet: healthy meters can wait, unknown ones get the default
+        return max_hours if outlook.level == 'ok' else default_hours
+    return min(max(hours_left * check_fraction, min_hours), max_hours)
+
+
+def fit_budget(outlooks, budget_minutes, minutes_per_check, max_hours):
+    """Stretch intervals so the expected checks per day fit in budget_minutes of browser time.
+
+    Low/critical meters keep their interval as long as they fit on their own;
+    the healthier meters are stretched first (up to max_hours). Returns the
+    expected minutes per day, which stays above budget_minutes when there are
+    too many meters even at max_hours - AdaptiveScheduler.due() then holds the
+    extra checks back to the next day.
+    """
+    def cost(group):
+        return sum(24 / outlook.interval_hours * minutes_per_check for outlook in group)
+
+    urgent = [outlook for outlook in outlooks if outlook.level in ('low', 'critical')]
+    relaxed = [outlook for outlook in outlooks if outlook.level not in ('low', 'critical')]
+    for group, available in ((urgent, budget_minutes), (relaxed, budget_minutes - cost(urgent))):
+        spend = cost(group)
+        if group and spend > available:
+            factor = spend / max(available, minutes_per_check)
+            for outlook in group:
+                outlook.interval_hours = min(outlook.interval_hours * factor, max(max_hours, outlook.interval_hours))
+    return cost(outlooks)
+
+
+class AdaptiveScheduler:
+    """Per-meter polling: near-empty meters are checked hourly, healthy ones every few days.
+
+    Each meter's next check comes from its latest balance and its burn rate
+    over the last ADAPTIVE_BURN_DAYS of daily rollups, then all intervals are
+    stretched to keep the expected browser time per day within
+    ADAPTIVE_BUDGET_MINUTES. When each meter was last checked, and how many
+    checks were spent today, is kept in POLL_STATE_PATH so restarts don't
+    trigger a full round of scrapes or reset the day's budget.
+    """
+
+    def __init__(self, history, policies=None, path=None):
+        self.history = history
+        self.policies = policies or get_policy_table()
+        self.path = path or os.getenv('POLL_STATE_PATH', 'poll_state.json')
+        self.min_hours = float(os.getenv('ADAPTIVE_MIN_HOURS', '1'))
+        self.max_hours = float(os.getenv('ADAPTIVE_MAX_HOURS', '72'))
+        self.default_hours = float(os.getenv('ADAPTIVE_DEFAULT_HOURS', '12'))
+        # Check 4 times over the time the balance is predicted to last
+        self.check_fraction = float(os.getenv('ADAPTIVE_CHECK_FRACTION', '0.25'))
+        self.burn_days = int(os.getenv('ADAPTIVE_BURN_DAYS', '14'))
+        self.budget_minutes = float(os.getenv('ADAPTIVE_BUDGET_MINUTES', '60'))
+        self.minutes_per_check = float(os.getenv('ADAPTIVE_MINUTES_PER_CHECK', '1.5'))
+        self.last_checked = {}
+        # Checks spent on budget_day; once they use up the budget, the rest wait for the next day
+        self.budget_day = None
+        self.checks_today = 0
+        # Due meters the last due() call held back because the day's budget was spent
+        self.over_budget = []
+        self._load()
+
+    def _load(self):
+        state = load_json(self.path, 'poll state')
+        if state is None:
+            return
+        if 'last_checked' not in state:
+            # Older files hold only {account: last checked}
+            state = {'last_checked': state}
+        self.last_checked = state['last_checked']
+        self.budget_day = state.get('budget_day')
+        self.checks_today = state.get('checks_today', 0)
+
+    def _save(self):
+        state = {'last_checked': self.last_checked, 'budget_day': self.budget_day, 'checks_today': self.checks_today}
+        try:
+            save_json(self.path, state)
+        except Exception as e:
+            print(f"Failed to save poll state: {str(e)}")
+
+    def outlooks(self, accounts, now=None):
+        return meter_outlooks(self.history, accounts, self.policies, self.burn_days, now)
+
+    def plan(self, accounts, now=None):
+        """Return outlooks with interval_hours set and the expected browser-minutes per day"""
+        outlooks = self.outlooks(accounts, now)
+        for outlook in outlooks:
+            outlook.interval_hours = desired_interval(
+                outlook, self.min_hours, self.max_hours, self.default_hours, self.check_fraction
+            )
+        minutes = fit_budget(outlooks, self.budget_minutes, self.minutes_per_check, self.max_hours)
+        return outlooks, minutes
+
+    def next_checks(self, accounts, now=None):
+        """{account: datetime of its next check}; meters never checked are due now"""
+        now = now or datetime.now()
+        outlooks, _ = self.plan(accounts, now)
+        return self._next_checks(outlooks, now)
+
+    def _next_checks(self, outlooks, now):
+        next_checks = {}
+        for outlook in outlooks:
+            last = self.last_checked.get(outlook.account_number)
+            if last:
+                next_checks[outlook.account_number] = datetime.fromisoformat(last) + timedelta(hours=outlook.interval_hours)
+            else:
+                next_checks[outlook.account_number] = now
+        return next_checks
+
+    def checks_left_today(self, now=None):
+        """How many more checks fit in today's ADAPTIVE_BUDGET_MINUTES"""
+        now = now or datetime.now()
+        spent = self.checks_today if self.budget_day == now.date().isoformat() else 0
+        return max(int(self.budget_minutes // self.minutes_per_check) - spent, 0)
+
+    def due(self, accounts, now=None):
+        """Accounts whose next check has come and that fit in today's budget.
+
+        Low/critical meters come first, then the rest by how long they have
+        been due. Due meters beyond the day's budget are left in over_budget
+        and stay due, so they are picked up once the next day starts.
+        """
+        now = now or datetime.now()
+        outlooks, _ = self.plan(accounts, now)
+        urgent = {outlook.account_number for outlook in outlooks if outlook.level in ('low', 'critical')}
+        next_checks = self._next_checks(outlooks, now)
+        due = sorted(
+            (account for account, when in next_checks.items() if when <= now),
+            key=lambda account: (account not in urgent, next_checks[account]),
+        )
+        allowed = self.checks_left_today(now)
+        self.over_budget = due[allowed:]
+        if self.over_budget:
+            print(f"⚠️ Adaptive polling budget of {self.budget_minutes:.0f} browser-min/day spent: "
+                  f"deferring {len(self.over_budget)} due meters to tomorrow")
+        return due[:allowed]
+
+    def mark_checked(self, accounts, now=None):
+        now = now or datetime.now()
+        today = now.date().isoformat()
+        if self.budget_day != today:
+            self.budget_day = today
+            self.checks_today = 0
+        self.checks_today += len(accounts)
+        for account_number in accounts:
+            self.last_checked[account_number] = now.isoformat(timespec='seconds')
+        self._save()
@@ -0,0 +1,144 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pytz
+
+from json_store import load_json, save_json
+from meter_policy import get_policy_table
+
+
+class AlertState:
+    """Per-meter alert state machine (ok -> low -> critical -> recharged), persisted between runs.
+
+    A meter is only reported when it changes into low, critical or recharged,
+    or when it has stayed low/critical for longer than the reminder interval,
+    so several SCHEDULE_TIMES a day don't repeat the same warning. Thresholds
+    and quiet hours come from the meter's policy; anything due during quiet
+    hours is held back and sent on the first run after them.
+
+    filter_notifications() only picks what is worth sending; the state of
+    those meters changes in mark_notified() once the send succeeded, so an
+    alert that failed to go out is sent again on the next run.
+    """
+
+    OK = 'ok'
+    LOW = 'low'
+    CRITICAL = 'critical'
+    RECHARGED = 'recharged'
+
+    def __init__(self, path=None, policies=None):
+        self.path = path or os.getenv('ALERT_STATE_PATH', 'alert_state.json')
+        self.policies = policies or get_policy_table()
+        # 0 turns reminders off for that state
+        self.reminders = {
+            self.LOW: timedelta(hours=float(os.getenv('ALERT_REMINDER_HOURS', '24'))),
+            self.CRITICAL: timedelta(hours=float(os.getenv('CRITICAL_REMINDER_HOURS', '12'))),
+        }
+        self._lock = threading.Lock()
+        self.meters = load_json(self.path, 'alert state', {})
+        # Entries picked by the last filter_notifications(), waiting for mark_notified()
+        self.unsent = {}
+
+    def _save(self):
+        try:
+            save_json(self.path, self.meters)
+        except Exception as e:
+            print(f"Failed to save alert state: {str(e)}")
+
+    def get(self, account_number):
+        """Current state of a meter ('ok' if never seen)"""
+        return self.meters.get(account_number, {}).get('state', self.OK)
+
+    def classify(self, reading):
+        """State a MeterReading puts its meter in, or None if the balance is unknown"""
+        if reading.recently_recharged:
+            return self.RECHARGED
+        level = self.policies.get(reading.account_number, reading.nickname).level(reading.balance)
+        if level is None:
+            return None
+        if level == 'critical':
+            return self.CRITICAL
+        if level == 'low':
+            return self.LOW
+        return self.OK
+
+    def transition(self, account_number, state, now=None, quiet=False):
+        """Move a meter to `state`; returns True if this should be sent to Telegram now.
+
+        A move that should be sent is only staged in unsent until mark_notified().
+        """
+        now = now or datetime.now()
+        entry = self.meters.get(account_number)
+        previous = entry['state'] if entry else self.OK
+
+        if entry is None or state != previous:
+            entry = {"state": state, "since": now.isoformat(timespec='seconds'), "last_notified": None}
+            # Going back to ok, or easing from critical to low, isn't news
+            notify = state != previous and state in (self.LOW, self.CRITICAL, self.RECHARGED) and not (
+                previous == self.CRITICAL and state == self.LOW
+            )
+        elif entry.get('pending'):
+            # Held back by quiet hours earlier
+            notify = True
+        else:
+            reminder = self.reminders.get(state)
+            last_notified = entry.get('last_notified') or entry.get('since')
+            notify = bool(reminder) and now - datetime.fromisoformat(last_notified) >= reminder
+
+        if notify and quiet:
+            entry = dict(entry, pending=True)
+            notify = False
+        if notify:
+            self.unsent[account_number] = entry
+        else:
+            self.meters[account_number] = entry
+        return notify
+
+    def mark_notified(self, accounts, sent=True, now=None):
+        """Commit the staged alerts of `accounts` once the Telegram send finished.
+
+        A failed send keeps the meter's new state but marks it pending, so the
+        next run (outside quiet hours) sends it again.
+        """
+        now = now or datetime.now(pytz.timezone('Asia/Dhaka')).replace(tzinfo=None)
+        with self._lock:
+            for account_number in accounts:
+                entry = self.unsent.pop(account_number, None)
+                if entry is None:
+                    continue
+                entry = dict(entry)
+                if sent:
+                    entry["last_notified"] = now.isoformat(timespec='seconds')
+                    entry.pop("pending", None)
+                else:
+                    entry["pending"] = True
+                self.meters[account_number] = entry
+            self._save()
+
+    def filter_notifications(self, readings, warnings, recently_recharged, now=None):
+        """Update every meter from this run's readings and keep only the warnings / recharges worth sending
+
+        now is Bangladesh local time (quiet hours are configured in it). Call
+        mark_notified() with the accounts returned once they were sent.
+        """
+        now = now or datetime.now(pytz.timezone('Asia/Dhaka')).replace(tzinfo=None)
+        notify = {}
+        states = {}
+        with self._lock:
+            self.unsent = {}
+            for reading in readings:
+                state = self.classify(reading)
+                if state is not None:
+                    states[reading.account_number] = state
+                    quiet = self.policies.get(reading.account_number, reading.nickname).is_quiet(now)
+                    notify[reading.account_number] = self.transition(reading.account_number, state, now, quiet)
+            self._save()
+
+        to_warn = []
+        for warning in warnings:
+            if notify.get(warning.account_number):
+                warning.level = states[warning.account_number]
+                to_warn.append(warning)
+        to_recharge = [event for event in recently_recharged if notify.get(event.account_number)]
+        return to_warn, to_recharge
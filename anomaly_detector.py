@@ -0,0 +1,103 @@
+import os
+import statistics
+from datetime import date, datetime, timedelta
+
+from models import Anomaly, MeterReading
+
+# Scales MAD to a standard deviation for normally distributed data
+MAD_SCALE = 1.4826
+
+
+def rolling_spikes(series, window, threshold, min_history, min_spread):
+    """Indexes of values more than `threshold` robust deviations above the median of the preceding window.
+
+    series is a list of floats in time order; each point is compared against
+    up to `window` points before it (median / MAD), once it has `min_history`.
+    min_spread floors the MAD so a perfectly steady meter doesn't flag noise.
+    """
+    spikes = []
+    for index in range(min_history, len(series)):
+        history = series[max(0, index - window):index]
+        median = statistics.median(history)
+        mad = statistics.median(abs(value - median) for value in history) * MAD_SCALE
+        if series[index] > median + threshold * max(mad, min_spread):
+            spikes.append((index, median, mad))
+    return spikes
+
+
+def daily_rates(points):
+    """[(day, BDT per day, days covered)] from (day, consumption) daily rollups in day order.
+
+    A day's rollup holds everything used since the previous reading, so the
+    first day after a gap in scraping carries several days of consumption;
+    it is spread over the calendar days elapsed instead of looking like a spike.
+    """
+    rates = []
+    previous = None
+    for day, consumption in points:
+        current = date.fromisoformat(day)
+        days = max((current - previous).days, 1) if previous else 1
+        rates.append((day, consumption / days, days))
+        previous = current
+    return rates
+
+
+class AnomalyDetector:
+    """Flags consumption spikes, overdrawn balances and meters whose reading time stopped moving.
+
+    Runs over every meter in one batch: a single daily-rollup query for the
+    consumption series plus the in-memory latest readings.
+    """
+
+    def __init__(self, history):
+        self.history = history
+        self.window_days = int(os.getenv('ANOMALY_WINDOW_DAYS', '28'))
+        self.min_history_days = int(os.getenv('ANOMALY_MIN_HISTORY_DAYS', '7'))
+        self.mad_threshold = float(os.getenv('ANOMALY_MAD_THRESHOLD', '3.5'))
+        # Ignore spikes smaller than this many BDT over the median
+        self.min_spike_bdt = float(os.getenv('ANOMALY_MIN_SPIKE_BDT', '20'))
+        self.stale_after = timedelta(hours=float(os.getenv('STALE_READING_HOURS', '48')))
+
+    def detect(self, now=None, lookback_days=1):
+        """Return Anomaly findings across all meters; spikes are only reported for the last `lookback_days`"""
+        now = now or datetime.now()
+        start = (now - timedelta(days=self.window_days + lookback_days)).date().isoformat()
+        recent = (now - timedelta(days=lookback_days)).date().isoformat()
+
+        findings = []
+        series = {}
+        for row in self.history.get_rollups(None, 'daily', start):
+            series.setdefault(row['account_number'], []).append((row['day'], row['consumption']))
+        for account_number, points in series.items():
+            rates = daily_rates(points)
+            values = [rate for _, rate, _ in rates]
+            for index, median, mad in rolling_spikes(
+                values, self.window_days, self.mad_threshold, self.min_history_days, self.min_spike_bdt / self.mad_threshold
+            ):
+                day, rate, days = rates[index]
+                if day >= recent:
+                    used = f"used {rate:.2f} BDT/day over {days} days" if days > 1 else f"used {rate:.2f} BDT"
+                    findings.append(Anomaly(
+                        account_number, 'spike', day, rate,
+                        f"{used} vs typical {median:.2f} BDT/day"
+                    ))
+
+        today = now.date().isoformat()
+        for account_number, latest in self.history.get_latest().items():
+            reading = MeterReading.from_dict(latest)
+            if reading.balance is not None and reading.balance < 0:
+                findings.append(Anomaly(
+                    account_number, 'overdraw', today, reading.balance,
+                    f"balance is {reading.balance:.2f} BDT"
+                ))
+            if reading.reading_at and reading.timestamp and reading.timestamp - reading.reading_at > self.stale_after:
+                hours = (reading.timestamp - reading.reading_at).total_seconds() / 3600
+                findings.append(Anomaly(
+                    account_number, 'stale', today, round(hours, 1),
+                    f"meter hasn't reported since {reading.reading_at.strftime('%d %b %Y %H:%M')}"
+                ))
+        return findings
+
+    def run(self, now=None):
+        """Detect and return only the findings not reported before"""
+        return self.history.record_anomalies(self.detect(now))
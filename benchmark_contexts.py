@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark scraping all meters sequentially, in N browser contexts of one Chrome, and in N Chrome processes.
+Reports wall time and peak RSS of the whole process tree. Needs Chrome and the portal.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from multi_context import MultiContextScraper
+from scrape_worker import process_tree_rss_mb
+from scraper import ElectricityMeterScraper
+
+class PeakRss:
+    """Samples the RSS of this process and its descendants in the background"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak = 0.0
+        self.baseline = process_tree_rss_mb(os.getpid())
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss_mb(os.getpid()) - self.baseline)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def _scrape_chunk(args):
+    url, accounts = args
+    _, _, all_data = ElectricityMeterScraper().scrape_all_meters(url, accounts=accounts)
+    return len(all_data)
+
+def run_sequential(url, accounts, workers):
+    _, _, all_data = ElectricityMeterScraper().scrape_all_meters(url, accounts=accounts)
+    return len(all_data)
+
+def run_contexts(url, accounts, workers):
+    _, _, all_data = MultiContextScraper(concurrency=workers).scrape_all_meters(url, accounts=accounts)
+    return len(all_data)
+
+def run_processes(url, accounts, workers):
+    chunks = [accounts[i::workers] for i in range(workers)]
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        return sum(pool.map(_scrape_chunk, [(url, chunk) for chunk in chunks if chunk]))
+
+MODES = {
+    'sequential': run_sequential,
+    'contexts': run_contexts,
+    'processes': run_processes,
+}
+
+def main():
+    url = os.getenv('METER_WEBSITE_URL', 'https://prepaid.desco.org.bd/customer/#/customer-login')
+    workers = int(os.getenv('BROWSER_CONTEXTS', '3'))
+    accounts = ElectricityMeterScraper().all_meters
+    modes = sys.argv[1:] or list(MODES)
+
+    print("🏁 MULTI-CONTEXT BENCHMARK")
+    print("=" * 60)
+    print(f"URL: {url}")
+    print(f"Meters: {len(accounts)}, parallelism: {workers}\n")
+    print(f"{'Mode':<14}{'Wall (s)':>10}{'Peak RSS (MB)':>16}{'Meters OK':>12}")
+    print("-" * 52)
+
+    for mode in modes:
+        try:
+            with PeakRss() as rss:
+                started = time.perf_counter()
+                scraped = MODES[mode](url, accounts, workers)
+                elapsed = time.perf_counter() - started
+            print(f"{mode:<14}{elapsed:>10.1f}{rss.peak:>16.0f}{scraped:>12}")
+        except Exception as e:
+            print(f"{mode:<14}  ❌ failed: {str(e).splitlines()[0][:60]}")
+
+if __name__ == "__main__":
+    main()
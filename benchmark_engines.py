@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark startup time and memory (RSS of the whole process tree) for each browser engine
+"""
+
+import os
+import statistics
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scraper import BROWSER_ENGINES, get_browser_engine
+from scrape_worker import process_tree_rss_mb
+
+def benchmark_engine(name, url, runs):
+    startup_times = []
+    load_times = []
+    rss_values = []
+    baseline_rss = process_tree_rss_mb(os.getpid())
+
+    for _ in range(runs):
+        engine = get_browser_engine(name)
+        started = time.perf_counter()
+        driver = engine.create_driver()
+        ready = time.perf_counter()
+        try:
+            driver.get(url)
+            loaded = time.perf_counter()
+            # Everything the engine started (driver binary, browser, renderers) is our descendant
+            rss_values.append(process_tree_rss_mb(os.getpid()) - baseline_rss)
+        finally:
+            driver.quit()
+        startup_times.append(ready - started)
+        load_times.append(loaded - ready)
+
+    return {
+        "startup_s": statistics.median(startup_times),
+        "load_s": statistics.median(load_times),
+        "rss_mb": statistics.median(rss_values),
+    }
+
+def main():
+    url = os.getenv('BENCHMARK_URL', 'https://prepaid.desco.org.bd/customer/#/customer-login')
+    runs = int(os.getenv('BENCHMARK_RUNS', '3'))
+    engines = sys.argv[1:] or list(BROWSER_ENGINES)
+
+    print("🏁 BROWSER ENGINE BENCHMARK")
+    print("=" * 60)
+    print(f"URL: {url}")
+    print(f"Runs per engine: {runs} (median reported)\n")
+    print(f"{'Engine':<24}{'Startup (s)':>12}{'Load (s)':>10}{'RSS (MB)':>10}")
+    print("-" * 56)
+
+    for name in engines:
+        try:
+            result = benchmark_engine(name, url, runs)
+            print(f"{name:<24}{result['startup_s']:>12.2f}{result['load_s']:>10.2f}{result['rss_mb']:>10.0f}")
+        except Exception as e:
+            print(f"{name:<24}  ❌ unavailable: {str(e).splitlines()[0][:60]}")
+
+if __name__ == "__main__":
+    main()
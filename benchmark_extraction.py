@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark parse + extract time per dashboard page: each HTML parser on raw HTML vs the
+per-element WebDriver approach (find_elements + .text per element) in a real Chrome.
+
+Usage: python benchmark_extraction.py [PAGE.html ...]
+Without files, uses the page HTML in the snapshot archive, or a generated dashboard.
+"""
+
+import os
+import statistics
+import sys
+import time
+from urllib.parse import quote
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from extraction import reading_from_texts
+from html_extraction import available_html_parsers, extract_html
+
+def sample_dashboard(rows=150):
+    """A dashboard-sized page: the balance cards plus a long recharge table, like the SPA renders"""
+    table = "".join(
+        f"<tr><td>{day % 28 + 1:02d} Jul 2025 1{day % 10}:05</td><td>ORD{day:06d}</td>"
+        f"<td><span>{(day % 5 + 1) * 500:,.2f} BDT</span></td></tr>"
+        for day in range(rows)
+    )
+    return f"""<html><head><title>DESCO Customer Portal</title><script>window.__state = {{}};</script></head>
+<body><div id="app">
+  <nav><a href="#">Dashboard</a><a href="#">Recharge History</a><a href="#">Logout</a></nav>
+  <div class="card"><span data-v-1>Remaining Balance: 135.25 BDT</span>
+    <span data-v-1>Reading time: 17 Aug 2025 00:00</span></div>
+  <div class="card"><p>Last Recharge: <b>1,000.00 BDT</b></p><p>Recharge time: 16 Aug 2025 15:16</p></div>
+  <table><thead><tr><th>Date</th><th>Order</th><th>Amount</th></tr></thead><tbody>{table}</tbody></table>
+</div></body></html>"""
+
+def load_pages(paths, limit=50):
+    if paths:
+        pages = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append(f.read())
+        return pages, f"{len(paths)} file(s)"
+    try:
+        from snapshot_archive import SnapshotArchive
+        if not os.path.isdir(os.getenv('SNAPSHOT_DIR', 'snapshots')):
+            raise FileNotFoundError("no snapshot archive")
+        archive = SnapshotArchive(retention_days=0)
+        blobs = list(dict.fromkeys(entry['sha256'] for entry in reversed(archive.entries())))[:limit]
+        pages = [page['html'] for page in map(archive.get, blobs) if page.get('html')]
+        if pages:
+            return pages, f"{len(pages)} archived snapshot(s)"
+    except Exception:
+        pass
+    return [sample_dashboard()], "generated dashboard"
+
+def time_per_page(pages, extract, runs):
+    """Median seconds per page over `runs` passes"""
+    timings = []
+    for _ in range(runs):
+        for html in pages:
+            started = time.perf_counter()
+            extract(html)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def benchmark_webdriver(pages, runs):
+    """Both ways of reading a loaded page through WebDriver: per element, and one page_source + local parse"""
+    from selenium.webdriver.common.by import By
+    from scraper import get_browser_engine
+
+    driver = get_browser_engine('chrome').create_driver()
+    try:
+        per_element = []
+        page_source = []
+        for _ in range(runs):
+            for html in pages:
+                driver.get("data:text/html;charset=utf-8," + quote(html))
+                started = time.perf_counter()
+                texts = [element.text.strip() for element in driver.find_elements(By.XPATH, "//*[text()]")]
+                reading_from_texts([text for text in texts if text], '37226784')
+                per_element.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                extract_html(driver.page_source, '37226784')
+                page_source.append(time.perf_counter() - started)
+        return statistics.median(per_element), statistics.median(page_source)
+    finally:
+        driver.quit()
+
+def main():
+    runs = int(os.getenv('BENCHMARK_RUNS', '5'))
+    pages, source = load_pages(sys.argv[1:])
+
+    print("🏁 EXTRACTION BENCHMARK")
+    print("=" * 60)
+    print(f"Pages: {source}, {runs} runs (median per page)\n")
+    print(f"{'Method':<34}{'ms/page':>10}")
+    print("-" * 44)
+
+    for parser in available_html_parsers():
+        seconds = time_per_page(pages, lambda html: extract_html(html, '37226784', parser=parser), runs)
+        print(f"{'raw HTML, ' + parser:<34}{seconds * 1000:>10.2f}")
+
+    try:
+        per_element, page_source = benchmark_webdriver(pages, runs)
+        print(f"{'WebDriver page_source + parse':<34}{page_source * 1000:>10.2f}")
+        print(f"{'WebDriver per element (current)':<34}{per_element * 1000:>10.2f}")
+    except Exception as e:
+        print(f"{'WebDriver':<34}  ❌ failed: {str(e).splitlines()[0][:60]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker for the DESCO portal.
+
+    After `failure_threshold` consecutive login failures the breaker opens and
+    every scrape is short-circuited (no Chrome launch, no selector timeouts)
+    until the cooldown expires. The cooldown doubles on every consecutive trip
+    up to `max_cooldown`, with +/- `jitter` randomisation. When it expires the
+    breaker goes half-open and lets one trial scrape through: success closes
+    it, failure re-opens it with the next backoff step. Concurrent scrapers
+    are refused while the trial is in flight; only the thread running it may
+    keep calling allow_request (e.g. again inside scrape_account). A trial
+    that never reports back frees up after CIRCUIT_TRIAL_TIMEOUT_SECONDS.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=None, base_cooldown=None, max_cooldown=None, jitter=0.2):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '2'))
+        self.base_cooldown = base_cooldown or float(os.getenv('CIRCUIT_COOLDOWN_SECONDS', '300'))
+        self.max_cooldown = max_cooldown or float(os.getenv('CIRCUIT_MAX_COOLDOWN_SECONDS', '3600'))
+        self.jitter = jitter
+        self.trial_timeout = float(os.getenv('CIRCUIT_TRIAL_TIMEOUT_SECONDS', '300'))
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.open_until = None
+        self.last_failure = None
+        # Thread running the half-open trial, and since when
+        self.trial_owner = None
+        self.trial_started = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Return True if a scrape may hit the portal right now"""
+        with self._lock:
+            if self.state == self.OPEN and time.time() >= self.open_until:
+                self.state = self.HALF_OPEN
+                self.trial_owner = None
+                print(f"Circuit breaker for {self.name} is half-open, allowing a trial request")
+            if self.state == self.OPEN:
+                return False
+            if self.state == self.HALF_OPEN:
+                caller = threading.get_ident()
+                trial_expired = self.trial_started is not None and time.time() - self.trial_started > self.trial_timeout
+                if self.trial_owner is None or trial_expired:
+                    self.trial_owner = caller
+                    self.trial_started = time.time()
+                elif self.trial_owner != caller:
+                    return False
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"Circuit breaker for {self.name} closed after successful request")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.trips = 0
+            self.open_until = None
+            self.trial_owner = None
+            self.trial_started = None
+
+    def record_failure(self, reason=None):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_failure = reason
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        self.trips += 1
+        cooldown = min(self.base_cooldown * (2 ** (self.trips - 1)), self.max_cooldown)
+        cooldown *= 1 + random.uniform(-self.jitter, self.jitter)
+        self.state = self.OPEN
+        self.open_until = time.time() + cooldown
+        self.trial_owner = None
+        self.trial_started = None
+        print(f"Circuit breaker for {self.name} OPEN after {self.consecutive_failures} failures, "
+              f"retrying in {cooldown:.0f}s")
+
+    def retry_in(self):
+        """Seconds until the breaker lets a trial request through (0 if not open)"""
+        if self.state != self.OPEN:
+            return 0
+        return max(self.open_until - time.time(), 0)
+
+    def export_state(self):
+        """Raw state, for handing the breaker to and from a worker process"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "open_until": self.open_until,
+            "last_failure": self.last_failure,
+        }
+
+    def restore_state(self, state):
+        with self._lock:
+            self.state = state["state"]
+            self.consecutive_failures = state["consecutive_failures"]
+            self.trips = state["trips"]
+            self.open_until = state["open_until"]
+            self.last_failure = state["last_failure"]
+            if self.state != self.HALF_OPEN:
+                self.trial_owner = None
+                self.trial_started = None
+
+    def to_dict(self):
+        return {
+            "host": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "retry_in_seconds": round(self.retry_in()),
+            "open_until": datetime.fromtimestamp(self.open_until).isoformat(timespec='seconds') if self.open_until else None,
+            "last_failure": self.last_failure,
+        }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(url):
+    """Return the shared breaker for the host of `url`"""
+    host = urlparse(url).hostname or url
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the bot: python cli.py {scrape,schedule,serve,report,reextract,diagnose}
+
+Subsystems are imported inside each command, so commands that never launch a
+browser (serve, report, diagnose) don't pay for Selenium, and nothing pays for
+requests until it actually sends something.
+"""
+
+import argparse
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cmd_scrape(args):
+    """Scrape now (all meters, or --accounts) and send notifications like a scheduled run"""
+    from scheduled_scraper import ScheduledMeterScraper
+
+    accounts = [account.strip() for account in args.accounts.split(',')] if args.accounts else None
+    ScheduledMeterScraper().run_daily_scraping(accounts=accounts)
+    return 0
+
+
+def cmd_schedule(args):
+    """Run the scheduler (and the keep-alive/API server) until stopped"""
+    from scheduled_scraper import ScheduledMeterScraper
+
+    if not args.no_server:
+        try:
+            from keep_alive import keep_alive
+            keep_alive()
+        except ImportError:
+            print("Keep-alive server not available")
+    scheduler = ScheduledMeterScraper()
+    if os.getenv('TEST_RUN', 'false').lower() == 'true':
+        print("Running test scraping for all meters...")
+        scheduler.run_daily_scraping()
+    else:
+        print(f"Starting daily scheduler for times: {os.getenv('SCHEDULE_TIMES', '08:00')}")
+        scheduler.start_scheduler()
+    return 0
+
+
+def cmd_serve(args):
+    """Serve /health, /ready and the meter API without the scheduler"""
+    from keep_alive import run
+
+    run()
+    return 0
+
+
+def cmd_report(args):
+    """Build (or reuse the cached) weekly/monthly digest and send or print it"""
+    from datetime import date
+
+    from history_store import get_history_store
+    from models import METER_NICKNAMES
+    from reports import DigestReporter
+
+    today = date.fromisoformat(args.date) if args.date else None
+    nicknames = dict(METER_NICKNAMES)
+    if args.print:
+        digest = DigestReporter(get_history_store(), meter_nicknames=nicknames, charts=False).build(
+            args.kind, today, force=args.force
+        )
+        print(digest.message)
+        return 0
+
+    from telegram_bot import TelegramBot
+    reporter = DigestReporter(get_history_store(), TelegramBot(), nicknames)
+    if reporter.send(args.kind, today, force=args.force):
+        print(f"✅ Sent {args.kind} digest")
+        return 0
+    print(f"❌ Failed to send {args.kind} digest")
+    return 1
+
+
+def cmd_reextract(args):
+    """Re-run extraction over archived page snapshots and diff against stored readings (offline)"""
+    import reextract
+
+    return reextract.main(args.extra)
+
+
+def cmd_diagnose(args):
+    """Check environment, imports, Chrome and Telegram"""
+    import diagnose_replit
+
+    diagnose_replit.main()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Electricity meter bot")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scrape = subparsers.add_parser('scrape', help=cmd_scrape.__doc__)
+    scrape.add_argument('--accounts', help="Comma-separated account numbers (default: all meters)")
+    scrape.set_defaults(func=cmd_scrape)
+
+    schedule = subparsers.add_parser('schedule', help=cmd_schedule.__doc__)
+    schedule.add_argument('--no-server', action='store_true', help="Don't start the keep-alive/API server")
+    schedule.set_defaults(func=cmd_schedule)
+
+    serve = subparsers.add_parser('serve', help=cmd_serve.__doc__)
+    serve.set_defaults(func=cmd_serve)
+
+    report = subparsers.add_parser('report', help=cmd_report.__doc__)
+    report.add_argument('kind', choices=['weekly', 'monthly'])
+    report.add_argument('--date', help="Pretend today is this date (YYYY-MM-DD)")
+    report.add_argument('--print', action='store_true', help="Print the digest instead of sending it")
+    report.add_argument('--force', action='store_true', help="Rebuild even if a cached digest exists")
+    report.set_defaults(func=cmd_report)
+
+    reextract = subparsers.add_parser('reextract', help=cmd_reextract.__doc__, add_help=False)
+    reextract.set_defaults(func=cmd_reextract)
+
+    diagnose = subparsers.add_parser('diagnose', help=cmd_diagnose.__doc__)
+    diagnose.set_defaults(func=cmd_diagnose)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, args.extra = parser.parse_known_args(argv)
+    # reextract takes its own options (python cli.py reextract --help)
+    if args.extra and args.command != 'reextract':
+        parser.error(f"unrecognized arguments: {' '.join(args.extra)}")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+from models import MeterReading, parse_amount
+
+MONTH_ABBREVIATIONS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _has_month(text):
+    return any(month in text for month in MONTH_ABBREVIATIONS)
+
+
+def _quiet(message):
+    pass
+
+
+def extract_fields(texts, log=None):
+    """Dashboard fields from the page's text elements, in the scraper's dict format.
+
+    These are the rules extract_data has always applied to the rendered
+    dashboard, as a pure function so archived snapshots can be re-extracted
+    offline. log (e.g. print) receives what each rule matched.
+    """
+    log = log or _quiet
+    data = {}
+
+    # Remaining balance: a balance-looking BDT amount, else any BDT amount that isn't the usual recharge
+    for text in texts:
+        if ("balance" in text.lower() or "remaining" in text.lower()) and "BDT" in text:
+            data["remaining_balance"] = text
+            log(f"Found remaining balance: {text}")
+            break
+    else:
+        for text in texts:
+            if "BDT" in text and any(char.isdigit() for char in text):
+                # Skip if it looks like the recharge amount (3,000.00)
+                if "3,000" not in text and "3000" not in text:
+                    data["remaining_balance"] = text
+                    log(f"Found potential balance: {text}")
+                    break
+        else:
+            data["remaining_balance"] = "Not found"
+            log("Remaining balance not found")
+    data["balance_numeric"] = parse_amount(data["remaining_balance"])
+
+    # Reading time: a date next to "reading"/"meter", else any timestamp that isn't the recharge date
+    for text in texts:
+        if ("reading" in text.lower() or "meter" in text.lower()) and _has_month(text):
+            data["reading_time"] = text
+            log(f"Found reading time: {text}")
+            break
+    else:
+        for text in texts:
+            if _has_month(text) and ":" in text:
+                if "10 Jul" not in text:  # Skip the recharge date
+                    data["reading_time"] = text
+                    log(f"Found potential reading time: {text}")
+                    break
+        else:
+            data["reading_time"] = "Not found"
+            log("Reading time not found")
+
+    # Last recharge amount: a BDT amount next to "recharge", else a large non-balance amount
+    for text in texts:
+        if "recharge" in text.lower() and "BDT" in text:
+            data["last_recharge_amount"] = text
+            log(f"Found recharge amount: {text}")
+            break
+    else:
+        for text in texts:
+            if "BDT" in text and any(char.isdigit() for char in text):
+                if "balance" not in text.lower() and "remaining" not in text.lower():
+                    numeric_amount = parse_amount(text)
+                    if numeric_amount and numeric_amount >= 500:  # Recharges are usually >= 500 BDT
+                        data["last_recharge_amount"] = text
+                        log(f"Found potential recharge amount: {text}")
+                        break
+        else:
+            data["last_recharge_amount"] = "Not found"
+            log("Recharge amount not found")
+
+    # Last recharge date: a date next to "recharge", else any timestamp that isn't a midnight reading
+    for text in texts:
+        if "recharge" in text.lower() and _has_month(text):
+            data["last_recharge_date"] = text
+            log(f"Found recharge date: {text}")
+            break
+    else:
+        for text in texts:
+            if _has_month(text) and ":" in text:
+                # Skip if it's the balance reading time (usually has "00:00")
+                if "00:00" not in text:
+                    data["last_recharge_date"] = text
+                    log(f"Found potential recharge date: {text}")
+                    break
+        else:
+            data["last_recharge_date"] = "Not found"
+            log("Recharge date not found")
+
+    return data
+
+
+def reading_from_texts(texts, account_number, nickname='Unknown', timestamp=None, log=None):
+    """MeterReading from the dashboard's text elements (see extract_fields)"""
+    data = {
+        "timestamp": (timestamp or datetime.now()).strftime("%Y-%m-%d %H:%M:%S"),
+        "account_number": account_number,
+        "nickname": nickname,
+        "status": "success",
+    }
+    data.update(extract_fields(texts, log))
+    return MeterReading.from_dict(data)
@@ -0,0 +1,381 @@
+import os
+import sqlite3
+import threading
+import time
+
+import rollups
+from models import MeterReading, format_timestamp
+
+READING_COLUMNS = [
+    'account_number',
+    'timestamp',
+    'nickname',
+    'status',
+    'remaining_balance',
+    'balance_numeric',
+    'reading_time',
+    'last_recharge_amount',
+    'last_recharge_date',
+    'recharge_amount_numeric',
+    'recently_recharged',
+]
+
+
+class MeterHistory:
+    """SQLite-backed history of meter readings plus an in-memory latest-value cache.
+
+    data.json only ever holds the last scrape; this keeps every successful
+    reading so the API and reports can look back in time.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.getenv('HISTORY_DB_PATH', 'meter_history.db')
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._create_tables()
+
+        # Latest reading per account, served by the API without touching the db
+        self.latest = {}
+        # Seeded from the clock so ETags from before a restart never match
+        self.latest_version = int(time.time() * 1000)
+        # Bumped whenever readings or recharges change the rollups
+        self.rollup_version = self.latest_version
+        self._load_latest()
+
+    def _create_tables(self):
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS readings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    account_number TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    nickname TEXT,
+                    status TEXT,
+                    remaining_balance TEXT,
+                    balance_numeric REAL,
+                    reading_time TEXT,
+                    last_recharge_amount TEXT,
+                    last_recharge_date TEXT,
+                    recharge_amount_numeric REAL,
+                    recently_recharged INTEGER DEFAULT 0
+                )
+            """)
+            self.conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_readings_account_timestamp
+                ON readings (account_number, timestamp)
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS recharge_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    account_number TEXT NOT NULL,
+                    recharged_at TEXT NOT NULL,
+                    amount REAL,
+                    reference TEXT,
+                    nickname TEXT
+                )
+            """)
+            self.conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_recharge_events_account_time
+                ON recharge_events (account_number, recharged_at, amount)
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS monthly_consumption (
+                    account_number TEXT NOT NULL,
+                    month TEXT NOT NULL,
+                    units REAL,
+                    amount REAL,
+                    PRIMARY KEY (account_number, month)
+                )
+            """)
+            # Newest record already stored per meter and feed, so syncs only fetch what's new
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_marks (
+                    account_number TEXT NOT NULL,
+                    feed TEXT NOT NULL,
+                    mark TEXT NOT NULL,
+                    synced_at TEXT,
+                    PRIMARY KEY (account_number, feed)
+                )
+            """)
+            rollups.create_rollup_tables(self.conn)
+            # Anomalies already reported, so a stuck meter is flagged once per day
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS anomalies (
+                    account_number TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    value REAL,
+                    detail TEXT,
+                    PRIMARY KEY (account_number, kind, day)
+                )
+            """)
+            # Rendered digests, so resending a period doesn't recompute it
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS report_cache (
+                    kind TEXT NOT NULL,
+                    period_start TEXT NOT NULL,
+                    period_end TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    chart BLOB,
+                    created_at TEXT,
+                    PRIMARY KEY (kind, period_start, period_end)
+                )
+            """)
+            # Databases from before rollups existed get them computed once
+            if (self.conn.execute("SELECT 1 FROM readings LIMIT 1").fetchone()
+                    and not self.conn.execute("SELECT 1 FROM daily_rollups LIMIT 1").fetchone()):
+                rollups.rebuild_rollups(self.conn)
+
+    def _row_to_dict(self, row):
+        reading = {column: row[column] for column in READING_COLUMNS}
+        reading['recently_recharged'] = bool(reading['recently_recharged'])
+        return reading
+
+    def _load_latest(self):
+        rows = self.conn.execute("""
+            SELECT r.* FROM readings r
+            JOIN (SELECT account_number, MAX(timestamp) AS ts FROM readings GROUP BY account_number) m
+              ON r.account_number = m.account_number AND r.timestamp = m.ts
+        """).fetchall()
+        self.latest = {row['account_number']: self._row_to_dict(row) for row in rows}
+        self.latest_version += 1
+
+    def record_reading(self, data):
+        """Store one scraped reading. Returns False if it was already stored."""
+        return self.record_readings([data]) == 1
+
+    def record_readings(self, readings):
+        """Store scraped readings (MeterReading or dicts) in one transaction, returns the number inserted"""
+        readings = [reading.to_dict() if isinstance(reading, MeterReading) else reading for reading in readings]
+        rows = []
+        for data in readings:
+            if not data or not data.get('account_number') or not data.get('timestamp'):
+                continue
+            row = [data.get(column) for column in READING_COLUMNS]
+            row[READING_COLUMNS.index('recently_recharged')] = int(bool(data.get('recently_recharged')))
+            rows.append(row)
+
+        if not rows:
+            return 0
+
+        placeholders = ", ".join("?" for _ in READING_COLUMNS)
+        insert = f"INSERT OR IGNORE INTO readings ({', '.join(READING_COLUMNS)}) VALUES ({placeholders})"
+        balance_index = READING_COLUMNS.index('balance_numeric')
+        inserted = 0
+        with self._lock, self.conn:
+            for row in rows:
+                if self.conn.execute(insert, row).rowcount:
+                    inserted += 1
+                    # Same transaction, so rollups never disagree with the readings
+                    rollups.apply_reading(self.conn, row[0], row[1], row[balance_index])
+                    self._invalidate_reports(row[1])
+
+        if inserted:
+            self.rollup_version += 1
+            self._update_latest(readings)
+        return inserted
+
+    def _update_latest(self, readings):
+        latest = dict(self.latest)
+        for data in readings:
+            if not data or not data.get('account_number'):
+                continue
+            current = latest.get(data['account_number'])
+            if current is None or data['timestamp'] >= current['timestamp']:
+                latest[data['account_number']] = {column: data.get(column) for column in READING_COLUMNS}
+        self.latest = latest
+        self.latest_version += 1
+
+    def get_latest(self, account_number=None):
+        """Return the cached latest reading for one account, or all of them"""
+        if account_number is None:
+            return self.latest
+        return self.latest.get(account_number)
+
+    def _range_clause(self, account_number, date_from=None, date_to=None, column='timestamp'):
+        clause = "account_number = ?"
+        params = [account_number]
+        if date_from:
+            clause += f" AND {column} >= ?"
+            params.append(date_from)
+        if date_to:
+            # A bare date means "until the end of that day"
+            if len(date_to) == 10:
+                date_to += " 23:59:59"
+            clause += f" AND {column} <= ?"
+            params.append(date_to)
+        return clause, params
+
+    def get_history_version(self, account_number, date_from=None, date_to=None):
+        """Cheap (count, max id) fingerprint of a history range, used for ETags"""
+        clause, params = self._range_clause(account_number, date_from, date_to)
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT COUNT(*), MAX(id) FROM readings WHERE {clause}", params
+            ).fetchone()
+        return row[0], row[1]
+
+    def get_history(self, account_number, date_from=None, date_to=None, limit=100, offset=0):
+        """Return readings for an account in timestamp order, oldest first"""
+        clause, params = self._range_clause(account_number, date_from, date_to)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT * FROM readings WHERE {clause} ORDER BY timestamp LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def record_recharge_events(self, events):
+        """Store RechargeEvents from the portal's recharge history, returns the number inserted"""
+        rows = [
+            (event.account_number, format_timestamp(event.recharged_at), event.amount, event.reference, event.nickname)
+            for event in events if event.account_number and event.recharged_at
+        ]
+        if not rows:
+            return 0
+        inserted = 0
+        with self._lock, self.conn:
+            for row in rows:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO recharge_events (account_number, recharged_at, amount, reference, nickname) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    row
+                )
+                if cursor.rowcount:
+                    inserted += 1
+                    rollups.apply_recharge(self.conn, row[0], row[1], row[2])
+                    self._invalidate_reports(row[1])
+        if inserted:
+            self.rollup_version += 1
+        return inserted
+
+    def get_recharge_events(self, account_number, date_from=None, date_to=None, limit=100, offset=0):
+        """Return stored recharges for an account, oldest first"""
+        clause, params = self._range_clause(account_number, date_from, date_to, column='recharged_at')
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT account_number, recharged_at, amount, reference, nickname FROM recharge_events "
+                f"WHERE {clause} ORDER BY recharged_at LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def record_monthly_consumption(self, months):
+        """Insert or refresh MonthlyConsumption rows (the current month keeps changing)"""
+        rows = [(month.account_number, month.month, month.units, month.amount) for month in months]
+        if not rows:
+            return 0
+        with self._lock, self.conn:
+            self.conn.executemany("""
+                INSERT INTO monthly_consumption (account_number, month, units, amount) VALUES (?, ?, ?, ?)
+                ON CONFLICT (account_number, month) DO UPDATE SET units = excluded.units, amount = excluded.amount
+            """, rows)
+            # Monthly digests show these units
+            self._invalidate_reports(f"{min(row[1] for row in rows)}-01")
+        return len(rows)
+
+    def get_monthly_consumption(self, account_number, month_from=None, month_to=None):
+        """Return portal-reported monthly consumption for an account, oldest month first"""
+        clause = "account_number = ?"
+        params = [account_number]
+        if month_from:
+            clause += " AND month >= ?"
+            params.append(month_from)
+        if month_to:
+            clause += " AND month <= ?"
+            params.append(month_to)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT account_number, month, units, amount FROM monthly_consumption WHERE {clause} ORDER BY month",
+                params
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_rollups(self, account_number, period='daily', start=None, end=None):
+        """Precomputed daily or monthly consumption / recharge / min balance rows (account_number=None for all)"""
+        with self._lock:
+            return rollups.get_rollups(self.conn, account_number, period, start, end)
+
+    def rebuild_rollups(self):
+        with self._lock, self.conn:
+            rollups.rebuild_rollups(self.conn)
+            self.conn.execute("DELETE FROM report_cache")
+
+    def get_monthly_consumption_for(self, month):
+        """Portal-reported consumption of every meter for one month, keyed by account"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT account_number, month, units, amount FROM monthly_consumption WHERE month = ?", (month,)
+            ).fetchall()
+        return {row['account_number']: dict(row) for row in rows}
+
+    def record_anomalies(self, anomalies):
+        """Store Anomaly findings, returning only those not already recorded for that day"""
+        new = []
+        with self._lock, self.conn:
+            for anomaly in anomalies:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO anomalies (account_number, kind, day, value, detail) VALUES (?, ?, ?, ?, ?)",
+                    (anomaly.account_number, anomaly.kind, anomaly.day, anomaly.value, anomaly.detail)
+                )
+                if cursor.rowcount:
+                    new.append(anomaly)
+        return new
+
+    def _invalidate_reports(self, timestamp):
+        """Drop cached digests a rollup change on this day can affect (call inside the writing transaction).
+
+        An out-of-order reading also changes the consumption of the next
+        reading, so every period ending on or after the day goes, not just
+        the ones containing it.
+        """
+        self.conn.execute("DELETE FROM report_cache WHERE period_end >= ?", (timestamp[:10],))
+
+    def get_cached_report(self, kind, period_start, period_end):
+        """Return (message, chart_png_or_None) for a rendered digest, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT message, chart FROM report_cache WHERE kind = ? AND period_start = ? AND period_end = ?",
+                (kind, period_start, period_end)
+            ).fetchone()
+        return (row['message'], row['chart']) if row else None
+
+    def cache_report(self, kind, period_start, period_end, message, chart=None):
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO report_cache (kind, period_start, period_end, message, chart, created_at)
+                VALUES (?, ?, ?, ?, ?, datetime('now'))
+            """, (kind, period_start, period_end, message, chart))
+
+    def get_sync_mark(self, account_number, feed):
+        """Return the newest record already synced for a meter's feed, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT mark FROM sync_marks WHERE account_number = ? AND feed = ?", (account_number, feed)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_sync_mark(self, account_number, feed, mark):
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO sync_marks (account_number, feed, mark, synced_at) VALUES (?, ?, ?, datetime('now'))
+                ON CONFLICT (account_number, feed) DO UPDATE SET mark = excluded.mark, synced_at = excluded.synced_at
+            """, (account_number, feed, mark))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+_history = None
+_history_lock = threading.Lock()
+
+def get_history_store():
+    """Return the process-wide MeterHistory, opening it on first use"""
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = MeterHistory()
+    return _history
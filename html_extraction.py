@@ -0,0 +1,152 @@
+import os
+from html.parser import HTMLParser
+
+from extraction import reading_from_texts
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# Never part of an element's visible text (the title is the tab caption, not page text)
+NON_TEXT_TAGS = ('script', 'style', 'noscript', 'template', 'title')
+
+
+class HttpElement:
+    """Parsed HTML element exposing the bits of the WebElement API the scraper uses"""
+
+    def __init__(self, tag_name, attributes, parent=None):
+        self.tag_name = tag_name
+        self.attributes = dict(attributes)
+        self.parent = parent
+        # Text chunks and child elements in document order
+        self.parts = []
+        self.has_own_text = False
+
+    def _text_chunks(self):
+        for part in self.parts:
+            if isinstance(part, HttpElement):
+                yield from part._text_chunks()
+            else:
+                yield part
+
+    @property
+    def text(self):
+        return " ".join(" ".join(self._text_chunks()).split())
+
+    def get_attribute(self, name):
+        if name == 'outerHTML':
+            attrs = "".join(f' {key}="{value}"' for key, value in self.attributes.items())
+            return f"<{self.tag_name}{attrs}>{self.text}</{self.tag_name}>"
+        return self.attributes.get(name)
+
+    def iter(self):
+        yield self
+        for part in self.parts:
+            if isinstance(part, HttpElement):
+                yield from part.iter()
+
+
+class HttpPageParser(HTMLParser):
+    """Builds a tree of HttpElements from raw HTML using the stdlib parser"""
+
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+    SKIP_TEXT_TAGS = {'script', 'style', 'noscript', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = HttpElement('#document', {})
+        self.stack = [self.root]
+        self.title = ''
+
+    def handle_starttag(self, tag, attrs):
+        element = HttpElement(tag, [(key, value or '') for key, value in attrs], self.stack[-1])
+        self.stack[-1].parts.append(element)
+        if tag not in self.VOID_TAGS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack[-1].parts.append(HttpElement(tag, [(key, value or '') for key, value in attrs], self.stack[-1]))
+
+    def handle_endtag(self, tag):
+        # Tolerate unclosed tags: pop back to the matching open element if there is one
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag_name == tag:
+                del self.stack[index:]
+                break
+
+    def handle_data(self, data):
+        current = self.stack[-1]
+        if any(e.tag_name in self.SKIP_TEXT_TAGS for e in self.stack):
+            return
+        if current.tag_name == 'title':
+            self.title += data
+            return
+        if data.strip():
+            current.parts.append(data)
+            current.has_own_text = True
+
+
+def _texts_stdlib(html):
+    parser = HttpPageParser()
+    parser.feed(html)
+    parser.close()
+    return [element.text for element in parser.root.iter() if element.has_own_text and element is not parser.root]
+
+
+def _texts_lxml(html):
+    root = lxml.html.document_fromstring(html)
+    lxml.etree.strip_elements(root, lxml.etree.Comment, *NON_TEXT_TAGS, with_tail=False)
+    return [" ".join(" ".join(element.itertext()).split()) for element in root.xpath('//*[text()[normalize-space()]]')]
+
+
+def _texts_selectolax(html):
+    tree = SelectolaxParser(html)
+    tree.strip_tags(list(NON_TEXT_TAGS))
+    texts = []
+    for node in tree.root.traverse(include_text=False):
+        if any(child.tag == '-text' and child.text(deep=False).strip() for child in node.iter(include_text=True)):
+            texts.append(" ".join(node.text(deep=True, separator=' ').split()))
+    return texts
+
+
+# Fastest first; the stdlib parser is always available
+HTML_PARSERS = {
+    'selectolax': _texts_selectolax if SelectolaxParser else None,
+    'lxml': _texts_lxml if lxml else None,
+    'stdlib': _texts_stdlib,
+}
+
+
+def available_html_parsers():
+    return [name for name, parse in HTML_PARSERS.items() if parse]
+
+
+def get_html_parser(name=None):
+    """Name of the parser to use: HTML_PARSER if installed, else the fastest available"""
+    name = (name or os.getenv('HTML_PARSER', 'auto')).strip().lower()
+    if HTML_PARSERS.get(name):
+        return name
+    if name != 'auto':
+        print(f"HTML parser '{name}' not available, using {available_html_parsers()[0]}")
+    return available_html_parsers()[0]
+
+
+def page_texts(html, parser=None):
+    """Text of every element with its own text, in document order - what //*[text()] + .text gives in a browser.
+
+    One parse of the page instead of a WebDriver round trip per element.
+    Static HTML has no layout, so text hidden by CSS is included.
+    """
+    return [text for text in HTML_PARSERS[get_html_parser(parser)](html) if text]
+
+
+def extract_html(html, account_number, nickname='Unknown', timestamp=None, parser=None):
+    """MeterReading from raw dashboard HTML, using the same field rules as extract_data"""
+    return reading_from_texts(page_texts(html, parser), account_number, nickname, timestamp)
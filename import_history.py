@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Stream old balance exports (CSV, JSON arrays, JSON lines, data.json snapshots) into the history store
+
+Usage: python import_history.py FILE [FILE ...] [--account 37226784] [--chunk-size 5000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from history_store import MeterHistory
+from models import MeterReading, parse_amount, parse_datetime, parse_timestamp
+
+READ_BUFFER_SIZE = 64 * 1024
+WHITESPACE = re.compile(r'\s*')
+SEPARATORS = re.compile(r'[\s,]*')
+
+# Spreadsheet / statement headers (lowercased, spaces as underscores) -> reading fields
+COLUMN_ALIASES = {
+    'account': 'account_number',
+    'account_no': 'account_number',
+    'account_id': 'account_number',
+    'meter': 'account_number',
+    'meter_no': 'account_number',
+    'date': 'timestamp',
+    'datetime': 'timestamp',
+    'time': 'timestamp',
+    'balance': 'remaining_balance',
+    'current_balance': 'remaining_balance',
+    'recharge_amount': 'last_recharge_amount',
+    'recharge_date': 'last_recharge_date',
+}
+
+
+def iter_json_records(path):
+    """Yield objects from a JSON array, JSON lines, or a single object - without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        eof = False
+        in_array = None
+        while True:
+            # Skip whitespace, and commas between array items
+            pos = SEPARATORS.match(buffer, pos).end() if in_array else WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer):
+                if in_array is None:
+                    in_array = buffer[pos] == '['
+                    if in_array:
+                        pos += 1
+                    continue
+                if in_array and buffer[pos] == ']':
+                    return
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A value that runs to the end of the buffer may be cut short (e.g. a number)
+                    if end < len(buffer) or eof:
+                        pos = end
+                        yield value
+                        continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+            elif eof:
+                return
+
+            # Need more input: keep only the unparsed tail
+            chunk = f.read(READ_BUFFER_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def iter_csv_records(path):
+    """Yield one dict per CSV row with headers normalised to reading fields"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        fields = []
+        for name in header:
+            key = name.strip().lower().replace(' ', '_')
+            fields.append(COLUMN_ALIASES.get(key, key))
+        for row in reader:
+            yield dict(zip(fields, row))
+
+
+def normalize_record(record, default_account=None):
+    """Turn one exported row into a MeterReading, or None if it has no account/time"""
+    if not isinstance(record, dict):
+        return None
+    data = {key: value for key, value in record.items() if value not in (None, '')}
+    data.setdefault('account_number', default_account)
+    if not data.get('account_number'):
+        return None
+    data['account_number'] = str(data['account_number']).strip()
+
+    # Spreadsheets hold plain numbers; keep them as the portal text too
+    for numeric, text in (('balance_numeric', 'remaining_balance'), ('recharge_amount_numeric', 'last_recharge_amount')):
+        if numeric in data and not isinstance(data[numeric], (int, float)):
+            data[numeric] = parse_amount(str(data[numeric]))
+        if text in data and not isinstance(data[text], str):
+            data[text] = str(data[text])
+    if isinstance(data.get('recently_recharged'), str):
+        data['recently_recharged'] = data['recently_recharged'].strip().lower() in ('1', 'true', 'yes')
+
+    timestamp = parse_timestamp(data.get('timestamp')) or parse_datetime(data.get('reading_time'))
+    if not timestamp:
+        return None
+    data['timestamp'] = timestamp
+
+    return MeterReading.from_dict(data)
+
+
+def detect_format(path):
+    if path.lower().endswith('.csv'):
+        return 'csv'
+    return 'json'
+
+
+def import_file(history, path, file_format='auto', default_account=None, chunk_size=5000):
+    """Import one file chunk by chunk. Returns (read, inserted, invalid)."""
+    file_format = detect_format(path) if file_format == 'auto' else file_format
+    records = iter_csv_records(path) if file_format == 'csv' else iter_json_records(path)
+
+    read = inserted = invalid = 0
+    chunk = []
+    for record in records:
+        read += 1
+        reading = normalize_record(record, default_account)
+        if reading is None:
+            invalid += 1
+            continue
+        chunk.append(reading)
+        if len(chunk) >= chunk_size:
+            inserted += history.record_readings(chunk)
+            chunk = []
+    if chunk:
+        inserted += history.record_readings(chunk)
+    return read, inserted, invalid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import CSV/JSON balance exports into the meter history store")
+    parser.add_argument('files', nargs='+', help="CSV, JSON array, JSON lines or data.json files")
+    parser.add_argument('--format', choices=['auto', 'csv', 'json'], default='auto')
+    parser.add_argument('--account', help="Account number for files whose rows don't carry one")
+    parser.add_argument('--chunk-size', type=int, default=int(os.getenv('IMPORT_CHUNK_SIZE', '5000')),
+                        help="Rows per transaction")
+    parser.add_argument('--db', help="History database (defaults to HISTORY_DB_PATH)")
+    args = parser.parse_args(argv)
+
+    history = MeterHistory(args.db)
+    total_read = total_inserted = total_invalid = 0
+    started = time.perf_counter()
+    try:
+        for path in args.files:
+            file_started = time.perf_counter()
+            read, inserted, invalid = import_file(history, path, args.format, args.account, args.chunk_size)
+            elapsed = time.perf_counter() - file_started
+            rate = read / elapsed if elapsed > 0 else 0
+            print(f"📥 {path}: {read} rows, {inserted} new, {read - inserted - invalid} duplicates, "
+                  f"{invalid} invalid ({rate:,.0f} rows/s)")
+            total_read += read
+            total_inserted += inserted
+            total_invalid += invalid
+    finally:
+        history.close()
+
+    elapsed = time.perf_counter() - started
+    rate = total_read / elapsed if elapsed > 0 else 0
+    print(f"✅ Imported {total_inserted} of {total_read} rows ({total_invalid} invalid) "
+          f"in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
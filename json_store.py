@@ -0,0 +1,63 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+
+def load_json(path, what, default=None):
+    """Return the JSON stored at path; default if it is missing or unreadable"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        print(f"Ignoring unreadable {what} {path}: {str(e)}")
+        return default
+
+
+@contextmanager
+def file_lock(path, mode=0o644):
+    """Exclusive lock on path + '.lock', held across processes and threads"""
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, mode)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _write(path, data, mode):
+    # Per process and thread, so two writers never share (and truncate) the same tmp file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def save_json(path, data, mode=0o644):
+    """Atomically replace path with data"""
+    with file_lock(path, mode):
+        _write(path, data, mode)
+
+
+def update_json(path, what, merge, default=None, mode=0o644):
+    """Reload path, apply merge(current) and write the result back, all under the file lock.
+
+    Use this when several processes share the file: each one changes only
+    its own entries instead of overwriting the others' with its stale copy.
+    Returns what was written.
+    """
+    with file_lock(path, mode):
+        data = merge(load_json(path, what, default))
+        _write(path, data, mode)
+        return data
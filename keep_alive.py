@@ -1,30 +1,153 @@
-from flask import Flask
+from flask import Flask, request, url_for
 from threading import Thread
+import logging
 import os
 
+from run_status import run_status
+from history_store import get_history_store
+
+# Pagination bounds for /meters/<account>/history
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
 app = Flask('')
 
 @app.route('/')
 def home():
     schedule_times = os.environ.get('SCHEDULE_TIMES', '08:00')
+    snapshot = run_status.snapshot()
     return f"""
     <h1>🔋 Electricity Meter Bot</h1>
     <p>Status: Running</p>
     <p>Schedule: Daily at {schedule_times}</p>
     <p>Meters: Ayon, Arif, Payel, Piyal, Solo</p>
     <p>Smart recharge detection enabled</p>
-    <p>Next run will be logged in console</p>
+    <p>Last run: {snapshot['last_run_finished'] or 'never'} ({snapshot['last_run_status'] or 'n/a'})</p>
+    <p>Next run: {snapshot['next_run_bd'] or 'not scheduled'} (Bangladesh time)</p>
     """
 
 @app.route('/health')
 def health():
-    return {"status": "healthy", "service": "electricity-meter-bot"}
+    payload, healthy = run_status.health()
+    return payload, 200 if healthy else 503
+
+@app.route('/ready')
+def ready():
+    payload, is_ready = run_status.readiness()
+    return payload, 200 if is_ready else 503
+
+def _not_modified(etag):
+    """Return a bare 304 if the client already has this version"""
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def _json_with_etag(payload, etag):
+    response = app.response_class(
+        app.json.dumps(payload), mimetype='application/json'
+    )
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/meters')
+def list_meters():
+    history = get_history_store()
+    etag = f"meters-{history.latest_version}"
+    cached = _not_modified(etag)
+    if cached:
+        return cached
+    meters = sorted(history.get_latest().values(), key=lambda m: m['account_number'])
+    return _json_with_etag({"meters": meters, "count": len(meters)}, etag)
+
+@app.route('/meters/<account>')
+def get_meter(account):
+    history = get_history_store()
+    etag = f"meter-{account}-{history.latest_version}"
+    cached = _not_modified(etag)
+    if cached:
+        return cached
+    reading = history.get_latest(account)
+    if reading is None:
+        return {"error": f"Unknown meter {account}"}, 404
+    return _json_with_etag(reading, etag)
+
+@app.route('/meters/<account>/history')
+def get_meter_history(account):
+    history = get_history_store()
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return {"error": "limit and offset must be integers"}, 400
+
+    total, max_id = history.get_history_version(account, date_from, date_to)
+    etag = f"history-{account}-{total}-{max_id}-{date_from}-{date_to}-{limit}-{offset}"
+    cached = _not_modified(etag)
+    if cached:
+        return cached
+
+    readings = history.get_history(account, date_from, date_to, limit, offset)
+    payload = {
+        "account_number": account,
+        "readings": readings,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next": None,
+    }
+    if offset + limit < total:
+        payload["next"] = url_for(
+            'get_meter_history', account=account, offset=offset + limit, limit=limit,
+            **{key: value for key, value in (('from', date_from), ('to', date_to)) if value}
+        )
+    return _json_with_etag(payload, etag)
+
+@app.route('/meters/<account>/recharges')
+def get_meter_recharges(account):
+    history = get_history_store()
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return {"error": "limit and offset must be integers"}, 400
+    recharges = history.get_recharge_events(account, request.args.get('from'), request.args.get('to'), limit, offset)
+    return {
+        "account_number": account,
+        "recharges": recharges,
+        "monthly_consumption": history.get_monthly_consumption(account),
+        "limit": limit,
+        "offset": offset,
+    }
+
+@app.route('/meters/<account>/usage')
+def get_meter_usage(account):
+    period = request.args.get('period', 'daily')
+    if period not in ('daily', 'monthly'):
+        return {"error": "period must be 'daily' or 'monthly'"}, 400
+    history = get_history_store()
+    etag = f"usage-{account}-{period}-{history.rollup_version}-{request.args.get('from')}-{request.args.get('to')}"
+    cached = _not_modified(etag)
+    if cached:
+        return cached
+    rows = history.get_rollups(account, period, request.args.get('from'), request.args.get('to'))
+    return _json_with_etag({"account_number": account, "period": period, "rollups": rows}, etag)
 
 def run():
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
+    try:
+        from waitress import serve
+        logging.info(f"Serving keep-alive app with waitress on port {port}")
+        serve(app, host='0.0.0.0', port=port, threads=int(os.environ.get('WEB_THREADS', 4)))
+    except ImportError:
+        logging.warning("waitress not installed, falling back to Flask development server")
+        app.run(host='0.0.0.0', port=port)
 
 def keep_alive():
     t = Thread(target=run)
     t.daemon = True
-    t.start()
\ No newline at end of file
+    t.start()
@@ -5,24 +5,19 @@ import sys
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Import and run the scheduled scraper
-from scheduled_scraper import ScheduledMeterScraper
+# Same as `python cli.py schedule`; the scheduler and server are imported there
+from cli import main
+from meter_policy import get_policy_table
+from models import METER_NICKNAMES
 
 if __name__ == "__main__":
     print("Starting Multi-Meter Electricity Bot on Replit...")
-    print("Configured to monitor 5 meters: 37226784, 37202772, 37195501, 37226785, 37202771")
-    print("Will only send warnings for meters with balance < 100 BDT")
+    print(f"Configured to monitor {len(METER_NICKNAMES)} meters: {', '.join(METER_NICKNAMES)}")
+    # Thresholds come from METER_POLICIES, per meter
+    policies = get_policy_table()
+    for account_number, nickname in METER_NICKNAMES.items():
+        policy = policies.get(account_number, nickname)
+        print(f"  {account_number} ({nickname}): warning < {policy.warning_balance:g} BDT, "
+              f"critical < {policy.critical_balance:g} BDT")
     
-    scheduler = ScheduledMeterScraper()
-    
-    # For Replit, run a test first to verify everything works
-    test_run = os.getenv('TEST_RUN', 'false').lower() == 'true'
-    
-    if test_run:
-        print("Running test scraping for all meters...")
-        scheduler.run_daily_scraping()
-    else:
-        schedule_times = os.getenv('SCHEDULE_TIMES', '08:00')
-        print(f"Starting daily scheduler for times: {schedule_times}")
-        print("Smart recharge detection enabled - no false warnings!")
-        scheduler.start_scheduler()
\ No newline at end of file
+    sys.exit(main(['schedule']))
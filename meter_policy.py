@@ -0,0 +1,129 @@
+import json
+import os
+from dataclasses import dataclass, replace
+from typing import Optional
+
+# Field names accepted in METER_POLICIES -> MeterPolicy attributes
+POLICY_FIELDS = {
+    'critical': 'critical_balance',
+    'warning': 'warning_balance',
+    'notice': 'notice_balance',
+    'recharge_min': 'recharge_minimum',
+    'quiet_hours': 'quiet_hours',
+}
+
+
+@dataclass(frozen=True, slots=True)
+class MeterPolicy:
+    """Balance thresholds (BDT) and quiet hours for one meter"""
+    # Below this the meter is critical
+    critical_balance: float = 50.0
+    # Below this the meter gets a low balance warning
+    warning_balance: float = 100.0
+    # Below this the status message suggests recharging soon
+    notice_balance: float = 500.0
+    # A same-day recharge at least this big counts as "recently recharged"
+    recharge_minimum: float = 500.0
+    # (start, end) minutes after midnight, Bangladesh time; may wrap past midnight
+    quiet_hours: Optional[tuple] = None
+
+    def level(self, balance):
+        """'critical', 'low', 'notice' or 'ok' for a balance (None if unknown)"""
+        if balance is None:
+            return None
+        if balance < self.critical_balance:
+            return 'critical'
+        if balance < self.warning_balance:
+            return 'low'
+        if balance < self.notice_balance:
+            return 'notice'
+        return 'ok'
+
+    def is_quiet(self, when):
+        """True if `when` (a Bangladesh-time datetime) falls in this meter's quiet hours"""
+        if not self.quiet_hours:
+            return False
+        start, end = self.quiet_hours
+        minute = when.hour * 60 + when.minute
+        if start <= end:
+            return start <= minute < end
+        return minute >= start or minute < end
+
+
+def parse_quiet_hours(text):
+    """'23:00-07:00' -> (1380, 420); empty / invalid -> None"""
+    if not text:
+        return None
+    try:
+        start, end = text.split('-')
+        minutes = []
+        for part in (start, end):
+            hour, minute = part.strip().split(':')
+            minutes.append(int(hour) * 60 + int(minute))
+        return tuple(minutes)
+    except ValueError:
+        print(f"Ignoring invalid quiet hours '{text}' (expected HH:MM-HH:MM)")
+        return None
+
+
+def _apply(policy, settings):
+    changes = {}
+    for key, value in settings.items():
+        field = POLICY_FIELDS.get(key)
+        if field is None:
+            print(f"Ignoring unknown meter policy setting '{key}'")
+        elif field == 'quiet_hours':
+            changes[field] = parse_quiet_hours(value)
+        else:
+            changes[field] = float(value)
+    return replace(policy, **changes)
+
+
+class PolicyTable:
+    """Per-meter policies compiled once into a dict, so lookups on the hot path are O(1).
+
+    METER_POLICIES is JSON: a "default" entry plus overrides keyed by account
+    number or nickname, e.g.
+    {"default": {"warning": 100, "quiet_hours": "23:00-07:00"}, "Piyal": {"warning": 200}}
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = self._load_config()
+        default = MeterPolicy(critical_balance=float(os.getenv('ALERT_CRITICAL_BALANCE', '50')))
+        self.default = _apply(default, config.get('default', {}))
+
+        # Keyed by whatever the config used - account number or nickname
+        self.policies = {
+            key: _apply(self.default, settings) for key, settings in config.items() if key != 'default'
+        }
+
+    def _load_config(self):
+        raw = os.getenv('METER_POLICIES', '').strip()
+        if not raw:
+            return {}
+        try:
+            # Either inline JSON or a path to a JSON file
+            if raw.startswith('{'):
+                return json.loads(raw)
+            with open(raw, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Ignoring invalid METER_POLICIES: {str(e)}")
+            return {}
+
+    def get(self, account_number, nickname=None):
+        policy = self.policies.get(account_number)
+        if policy is None and nickname:
+            policy = self.policies.get(nickname)
+        return policy or self.default
+
+
+_policy_table = None
+
+def get_policy_table():
+    """Return the process-wide PolicyTable, compiling it on first use"""
+    global _policy_table
+    if _policy_table is None:
+        _policy_table = PolicyTable()
+    return _policy_table
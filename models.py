@@ -0,0 +1,304 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Text values the scraper uses when a field could not be read
+MISSING_VALUES = ('Not found', 'Error', 'N/A', '')
+
+# Monitored meters (account number -> nickname), in scrape order
+METER_NICKNAMES = {
+    '37226784': 'Ayon',
+    '37202772': 'Arif',
+    '37195501': 'Payel',
+    '37226785': 'Piyal',
+    '37202771': 'Solo',
+}
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
+}
+
+DATETIME_PATTERN = re.compile(
+    r'(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{4})\s+(\d{1,2}):(\d{2})'
+)
+# A leading minus counts only when it isn't joined to a word ("Jul-2025" is 2025, not -2025)
+AMOUNT_PATTERN = re.compile(r'(?:(?<!\w)-)?[\d,]+\.?\d*')
+
+
+def parse_amount(text):
+    """First plausible BDT amount in text, e.g. 'Remaining Balance: -36.3 BDT' -> -36.3
+
+    Signed on purpose: a prepaid meter running on emergency credit shows a
+    negative remaining balance, and reading that as 36.3 would hide the most
+    urgent meter. Amounts outside -10000..10000 are skipped as implausible.
+    """
+    if not text or text in MISSING_VALUES:
+        return None
+    for number in AMOUNT_PATTERN.findall(text):
+        try:
+            value = float(number.replace(',', ''))
+        except ValueError:
+            continue
+        # Only consider reasonable balance values (negative = emergency credit in use)
+        if -10000 <= value <= 10000:
+            return value
+    return None
+
+
+def parse_datetime(text):
+    """Parse '17 Aug 2025 15:16' (anywhere in text) into a datetime"""
+    if not text:
+        return None
+    match = DATETIME_PATTERN.search(text)
+    if not match:
+        return None
+    day, month_str, year, hour, minute = match.groups()
+    try:
+        return datetime(int(year), MONTHS[month_str], int(day), int(hour), int(minute))
+    except ValueError:
+        return None
+
+
+# Date formats seen in spreadsheets and the portal's JSON API
+TIMESTAMP_FORMATS = (
+    TIMESTAMP_FORMAT,
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+)
+
+
+def parse_timestamp(value):
+    """Parse a timestamp in any of TIMESTAMP_FORMATS (or portal text like '17 Aug 2025 15:16'), or None"""
+    if isinstance(value, datetime) or not value:
+        return value or None
+    value = str(value).strip()
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return parse_datetime(value)
+
+
+def format_timestamp(value):
+    return value.strftime(TIMESTAMP_FORMAT) if value else None
+
+
+def _parse_timestamp(value):
+    if isinstance(value, datetime) or value is None:
+        return value
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+@dataclass(slots=True)
+class MeterReading:
+    """One scrape of one meter, with the balance and dates parsed exactly once"""
+    account_number: str
+    nickname: str = 'Unknown'
+    timestamp: Optional[datetime] = None
+    status: str = 'success'
+    balance: Optional[float] = None
+    reading_at: Optional[datetime] = None
+    recharge_amount: Optional[float] = None
+    recharged_at: Optional[datetime] = None
+    recently_recharged: bool = False
+    # Raw portal text, kept for messages and debugging
+    balance_text: Optional[str] = None
+    reading_time_text: Optional[str] = None
+    recharge_amount_text: Optional[str] = None
+    recharge_date_text: Optional[str] = None
+    error_message: Optional[str] = None
+
+    @property
+    def succeeded(self):
+        return self.status == 'success'
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from the scraper's dict format (data.json, history rows, run state)"""
+        balance_text = data.get('remaining_balance')
+        reading_time_text = data.get('reading_time')
+        recharge_amount_text = data.get('last_recharge_amount')
+        recharge_date_text = data.get('last_recharge_date')
+
+        balance = data.get('balance_numeric')
+        if balance is None:
+            balance = parse_amount(balance_text)
+        recharge_amount = data.get('recharge_amount_numeric')
+        if recharge_amount is None:
+            recharge_amount = parse_amount(recharge_amount_text)
+
+        return cls(
+            account_number=data.get('account_number'),
+            nickname=data.get('nickname') or 'Unknown',
+            timestamp=_parse_timestamp(data.get('timestamp')),
+            status=data.get('status', 'success'),
+            balance=balance,
+            reading_at=parse_datetime(reading_time_text),
+            recharge_amount=recharge_amount,
+            recharged_at=parse_datetime(recharge_date_text),
+            recently_recharged=bool(data.get('recently_recharged', False)),
+            balance_text=balance_text,
+            reading_time_text=reading_time_text,
+            recharge_amount_text=recharge_amount_text,
+            recharge_date_text=recharge_date_text,
+            error_message=data.get('error_message'),
+        )
+
+    def to_dict(self):
+        """Serialize to the scraper's dict format (JSON-safe, same keys as data.json)"""
+        data = {
+            "timestamp": format_timestamp(self.timestamp),
+            "account_number": self.account_number,
+            "nickname": self.nickname,
+            "status": self.status,
+            "remaining_balance": self.balance_text,
+            "balance_numeric": self.balance,
+            "reading_time": self.reading_time_text,
+            "last_recharge_amount": self.recharge_amount_text,
+            "last_recharge_date": self.recharge_date_text,
+            "recharge_amount_numeric": self.recharge_amount,
+            "recently_recharged": self.recently_recharged,
+        }
+        if self.error_message:
+            data["error_message"] = self.error_message
+        return data
+
+
+@dataclass(slots=True)
+class RechargeEvent:
+    """A meter that was recharged after its last balance reading"""
+    account_number: str
+    nickname: str
+    amount: Optional[float]
+    recharged_at: Optional[datetime] = None
+    balance: Optional[float] = None
+    recharge_date_text: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    # Portal order / token id, when the event came from the recharge history
+    reference: Optional[str] = None
+
+    @classmethod
+    def from_reading(cls, reading):
+        return cls(
+            account_number=reading.account_number,
+            nickname=reading.nickname,
+            amount=reading.recharge_amount,
+            recharged_at=reading.recharged_at,
+            balance=reading.balance,
+            recharge_date_text=reading.recharge_date_text,
+            timestamp=reading.timestamp,
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            account_number=data.get('account_number'),
+            nickname=data.get('nickname', 'Unknown'),
+            amount=data.get('recharge_amount'),
+            recharged_at=parse_datetime(data.get('recharge_date')),
+            balance=data.get('balance_numeric'),
+            recharge_date_text=data.get('recharge_date'),
+            timestamp=_parse_timestamp(data.get('timestamp')),
+        )
+
+    def to_dict(self):
+        return {
+            "account_number": self.account_number,
+            "nickname": self.nickname,
+            "balance_numeric": self.balance,
+            "recharge_amount": self.amount,
+            "recharge_date": self.recharge_date_text,
+            "timestamp": format_timestamp(self.timestamp),
+        }
+
+
+@dataclass(slots=True)
+class BalanceWarning:
+    """A meter whose balance is below the warning threshold"""
+    account_number: str
+    nickname: str
+    balance: Optional[float]
+    balance_text: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    # 'low' or 'critical', set by AlertState
+    level: str = 'low'
+
+    @classmethod
+    def from_reading(cls, reading, level='low'):
+        return cls(
+            account_number=reading.account_number,
+            nickname=reading.nickname,
+            balance=reading.balance,
+            balance_text=reading.balance_text,
+            timestamp=reading.timestamp,
+            level=level,
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            account_number=data.get('account_number'),
+            nickname=data.get('nickname', 'Unknown'),
+            balance=data.get('balance_numeric'),
+            balance_text=data.get('balance_text'),
+            timestamp=_parse_timestamp(data.get('timestamp')),
+            level=data.get('level', 'low'),
+        )
+
+    def to_dict(self):
+        return {
+            "account_number": self.account_number,
+            "nickname": self.nickname,
+            "balance_text": self.balance_text,
+            "balance_numeric": self.balance,
+            "timestamp": format_timestamp(self.timestamp),
+            "level": self.level,
+        }
+
+
+@dataclass(slots=True)
+class MonthlyConsumption:
+    """Units and taka one meter used in a calendar month ('YYYY-MM'), as reported by the portal"""
+    account_number: str
+    month: str
+    units: Optional[float] = None
+    amount: Optional[float] = None
+
+    def to_dict(self):
+        return {
+            "account_number": self.account_number,
+            "month": self.month,
+            "units": self.units,
+            "amount": self.amount,
+        }
+
+
+@dataclass(slots=True)
+class Anomaly:
+    """Something odd about one meter: a consumption 'spike', an 'overdraw' or a 'stale' reading"""
+    account_number: str
+    kind: str
+    day: str
+    value: Optional[float] = None
+    detail: str = ''
+
+    def to_dict(self):
+        return {
+            "account_number": self.account_number,
+            "kind": self.kind,
+            "day": self.day,
+            "value": self.value,
+            "detail": self.detail,
+        }
@@ -0,0 +1,291 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+from circuit_breaker import get_circuit_breaker
+from scraper import BrowserEngine, ElectricityMeterScraper, get_browser_engine
+
+
+class SharedBrowser:
+    """One Chrome hosting several isolated browser contexts (separate cookies and storage, like incognito windows).
+
+    Contexts are created over CDP (Target.createBrowserContext /
+    Target.createTarget) and show up as extra window handles in the single
+    WebDriver session. Selenium can only address one window at a time, so
+    every command goes through a lock that first switches to the calling
+    context's window. Page loads are started over CDP and waited for outside
+    the lock, so they overlap like the waits for SPA rendering.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine or get_browser_engine()
+        self.driver = self.engine.create_driver()
+        if not hasattr(self.driver, 'execute_cdp_cmd'):
+            self.driver.quit()
+            raise Exception(f"{self.engine.name} has no CDP; browser contexts need a Chrome engine")
+        self.lock = threading.RLock()
+        self.page_load_timeout = int(os.getenv('PAGE_LOAD_TIMEOUT', '60'))
+        self.page_load_poll = 0.1
+        self.current_handle = self.driver.current_window_handle
+        self.contexts = []
+        # Performance log entries drained for one tab but not yet read by it, by window handle
+        self.performance_logs = {}
+
+    def switch_to(self, handle):
+        """Make handle the window WebDriver commands go to (call with the lock held)"""
+        if self.current_handle != handle:
+            self.driver.switch_to.window(handle)
+            self.current_handle = handle
+
+    def open_context(self):
+        """A new isolated context with one tab, as a WebDriver-like TabDriver"""
+        with self.lock:
+            context_id = self.driver.execute_cdp_cmd('Target.createBrowserContext', {'disposeOnDetach': True})['browserContextId']
+            target_id = self.driver.execute_cdp_cmd(
+                'Target.createTarget', {'url': 'about:blank', 'browserContextId': context_id}
+            )['targetId']
+            self.contexts.append(context_id)
+            self.performance_logs[target_id] = []
+        tab = TabDriver(self, target_id, context_id)
+        tab.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return tab
+
+    def close_context(self, tab):
+        with self.lock:
+            try:
+                self.driver.execute_cdp_cmd('Target.closeTarget', {'targetId': tab.handle})
+                self.driver.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': tab.context_id})
+            except Exception as e:
+                print(f"Failed to close browser context {tab.context_id}: {str(e)}")
+            if tab.context_id in self.contexts:
+                self.contexts.remove(tab.context_id)
+            self.performance_logs.pop(tab.handle, None)
+            if self.current_handle == tab.handle:
+                self.current_handle = None
+
+    def get_log(self, handle, log_type):
+        """Log entries for one tab.
+
+        The performance log is browser-wide and get_log drains it, so each
+        call sorts everything drained by the tab (chromedriver's "webview",
+        the target id) and keeps other tabs' entries for their next call.
+        """
+        with self.lock:
+            if log_type != 'performance':
+                self.switch_to(handle)
+                return self.driver.get_log(log_type)
+            for entry in self.driver.get_log('performance'):
+                try:
+                    webview = json.loads(entry['message']).get('webview')
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if webview in self.performance_logs:
+                    self.performance_logs[webview].append(entry)
+            entries = self.performance_logs.get(handle, [])
+            if handle in self.performance_logs:
+                self.performance_logs[handle] = []
+            return entries
+
+    def quit(self):
+        with self.lock:
+            self.driver.quit()
+
+
+def _unwrap(value):
+    return value.element if isinstance(value, TabElement) else value
+
+
+def _wrap(browser, handle, value):
+    """Wrap WebElements (and lists of them) so later calls switch to their window first"""
+    if isinstance(value, list):
+        return [_wrap(browser, handle, item) for item in value]
+    if hasattr(value, 'id') and hasattr(value, 'get_attribute') and not isinstance(value, TabElement):
+        return TabElement(browser, handle, value)
+    return value
+
+
+class _TabProxy:
+    """Forwards attribute access to a wrapped object with the shared lock held and the right window selected"""
+
+    def _target(self):
+        raise NotImplementedError
+
+    def _call(self, name, *args, **kwargs):
+        with self._browser.lock:
+            self._browser.switch_to(self._handle)
+            result = getattr(self._target(), name)(*[_unwrap(arg) for arg in args], **kwargs)
+        return _wrap(self._browser, self._handle, result)
+
+    def __getattr__(self, name):
+        with self._browser.lock:
+            self._browser.switch_to(self._handle)
+            value = getattr(self._target(), name)
+            if not callable(value):
+                return _wrap(self._browser, self._handle, value)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+
+class TabElement(_TabProxy):
+    def __init__(self, browser, handle, element):
+        self._browser = browser
+        self._handle = handle
+        self.element = element
+
+    def _target(self):
+        return self.element
+
+
+class TabDriver(_TabProxy):
+    """WebDriver stand-in bound to one tab of a SharedBrowser; quit() only closes its context"""
+
+    def __init__(self, browser, handle, context_id):
+        self._browser = browser
+        self._handle = handle
+        self.handle = handle
+        self.context_id = context_id
+
+    def _target(self):
+        return self._browser.driver
+
+    def set_page_load_timeout(self, seconds):
+        # Session-wide in WebDriver, so set once by whoever owns the browser
+        pass
+
+    def get(self, url):
+        """Navigate like WebDriver.get, without holding the browser lock while the page loads"""
+        self._navigate('Page.navigate', {'url': url})
+
+    def refresh(self):
+        self._navigate('Page.reload', {})
+
+    def _navigate(self, command, params):
+        # WebDriver.get/refresh block until the page has loaded, which would hold the lock (and
+        # every other tab) for the whole load; Page.navigate returns once the navigation is committed
+        self._call('execute_cdp_cmd', command, params)
+        give_up = time.monotonic() + self._browser.page_load_timeout
+        while self._call('execute_script', "return document.readyState") != 'complete':
+            if time.monotonic() > give_up:
+                raise TimeoutException(f"Page load exceeded {self._browser.page_load_timeout}s")
+            time.sleep(self._browser.page_load_poll)
+
+    def get_log(self, log_type):
+        # CDP commands (e.g. Network.getResponseBody) already go through _call, on this tab's window
+        return self._browser.get_log(self._handle, log_type)
+
+    def quit(self):
+        self._browser.close_context(self)
+
+
+class ContextEngine(BrowserEngine):
+    """Hands out tabs of a SharedBrowser instead of launching a browser per scrape"""
+    name = 'context'
+
+    def __init__(self, browser):
+        self.browser = browser
+
+    def create_driver(self):
+        return self.browser.open_context()
+
+
+class MultiContextScraper:
+    """Drop-in for ElectricityMeterScraper.scrape_all_meters that scrapes BROWSER_CONTEXTS meters at once in one Chrome.
+
+    Each thread runs the normal scrape_account flow (login, extract, smart
+    recharge logic) in its own browser context, so accounts stay logged in
+    separately while sharing one browser process's memory.
+    """
+
+    def __init__(self, concurrency=None, scraper_factory=None, browser_factory=None):
+        self.concurrency = concurrency or int(os.getenv('BROWSER_CONTEXTS', '3'))
+        self.scraper_factory = scraper_factory or ElectricityMeterScraper
+        self.browser_factory = browser_factory or SharedBrowser
+        # Used in-process only for configuration and result classification
+        self.inline = self.scraper_factory()
+        self.all_meters = self.inline.all_meters
+        self.meter_nicknames = self.inline.meter_nicknames
+        self.skipped_meters = []
+        self.deferred_meters = []
+
+    def scrape_all_meters(self, website_url, progress_callback=None, accounts=None, run_state=None, deadline=None):
+        accounts = list(accounts or self.all_meters)
+        self.skipped_meters = []
+        self.deferred_meters = []
+        results = {}
+        pending = queue.Queue()
+        for account_number in accounts:
+            resumed = run_state.get_completed(account_number) if run_state else None
+            if resumed:
+                results[account_number] = resumed
+                if progress_callback:
+                    progress_callback(account_number, resumed)
+            else:
+                pending.put(account_number)
+
+        if not pending.empty():
+            self._scrape_concurrently(website_url, pending, results, progress_callback, run_state, deadline)
+
+        low_balance_warnings = []
+        recently_recharged = []
+        all_data = []
+        for account_number in accounts:
+            if account_number in self.skipped_meters or account_number in self.deferred_meters:
+                continue
+            self.inline.classify_meter_data(
+                account_number, results.get(account_number), low_balance_warnings, recently_recharged, all_data
+            )
+        return low_balance_warnings, recently_recharged, all_data
+
+    def _scrape_concurrently(self, website_url, pending, results, progress_callback, run_state, deadline):
+        breaker = get_circuit_breaker(website_url)
+        browser = self.browser_factory()
+        browser.driver.set_page_load_timeout(browser.page_load_timeout)
+        results_lock = threading.Lock()
+        # Longest meter so far across all tabs, as the estimate for the next one
+        slowest_meter = [0.0]
+
+        def work():
+            scraper = self.scraper_factory()
+            scraper.engine = ContextEngine(browser)
+            scraper.run_id = run_state.run_id if run_state else None
+            while True:
+                try:
+                    account_number = pending.get_nowait()
+                except queue.Empty:
+                    return
+                with results_lock:
+                    # Same rule as the inline scraper: don't start a meter that wouldn't finish in time
+                    out_of_time = deadline and (self.deferred_meters or time.time() + slowest_meter[0] > deadline)
+                    if out_of_time:
+                        self.deferred_meters.append(account_number)
+                if out_of_time:
+                    print(f"DEFERRED: Run time budget used up, leaving account {account_number} for a follow-up run")
+                    continue
+                if not breaker.allow_request():
+                    print(f"SKIPPED: Circuit breaker open, skipping account {account_number}")
+                    with results_lock:
+                        self.skipped_meters.append(account_number)
+                    if progress_callback:
+                        progress_callback(account_number, None)
+                    continue
+                meter_started = time.time()
+                reading = scraper.scrape_account_with_retries(account_number, website_url)
+                with results_lock:
+                    slowest_meter[0] = max(slowest_meter[0], time.time() - meter_started)
+                    results[account_number] = reading
+                    if run_state:
+                        run_state.record_result(account_number, reading)
+                    if progress_callback:
+                        progress_callback(account_number, reading)
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(min(self.concurrency, pending.qsize()))]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            browser.quit()
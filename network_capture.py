@@ -0,0 +1,155 @@
+import base64
+import json
+import os
+import time
+from datetime import datetime
+
+from models import MeterReading, parse_timestamp
+from recharge_history import _first, _number, parse_recharge_history
+
+# Dashboard XHRs worth harvesting; matched as substrings of the response URL
+DEFAULT_BALANCE_URL_PATTERN = 'getBalance'
+DEFAULT_RECHARGE_URL_PATTERN = 'getRechargeHistory'
+
+BALANCE = 'balance'
+RECHARGE = 'recharge'
+
+# Field names differ between portal versions; first one present wins
+BALANCE_FIELDS = ('balance', 'remainingBalance', 'currentBalance')
+READING_TIME_FIELDS = ('readingTime', 'balanceReadingTime', 'readingDate', 'updatedAt')
+
+# How the dashboard renders values, so messages look the same whichever path produced them
+PORTAL_DATETIME_FORMAT = '%d %b %Y %H:%M'
+
+
+def network_capture_enabled():
+    return os.getenv('XHR_CAPTURE', 'false').lower() == 'true'
+
+
+def enable_performance_log(options):
+    """Ask chromedriver to record DevTools Network events, read back with driver.get_log('performance')"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def _format_amount(value):
+    return f"{value:,.2f} BDT" if value is not None else 'Not found'
+
+
+def _format_datetime(value):
+    return value.strftime(PORTAL_DATETIME_FORMAT) if value else 'Not found'
+
+
+def reading_from_payloads(account_number, nickname, balance_payload, recharge_payload=None, timestamp=None):
+    """MeterReading from the portal's balance (and optionally recharge-history) JSON, or None without a balance"""
+    record = balance_payload.get('data') if isinstance(balance_payload, dict) else None
+    if isinstance(record, list):
+        record = record[0] if record else None
+    if not isinstance(record, dict):
+        return None
+    balance = _number(_first(record, BALANCE_FIELDS))
+    if balance is None:
+        return None
+    reading_at = parse_timestamp(_first(record, READING_TIME_FIELDS))
+
+    latest = None
+    if recharge_payload is not None:
+        events = parse_recharge_history(recharge_payload, account_number, nickname)
+        if events:
+            latest = max(events, key=lambda event: event.recharged_at)
+
+    return MeterReading(
+        account_number=account_number,
+        nickname=nickname,
+        timestamp=timestamp or datetime.now().replace(microsecond=0),
+        status='success',
+        balance=balance,
+        reading_at=reading_at,
+        recharge_amount=latest.amount if latest else None,
+        recharged_at=latest.recharged_at if latest else None,
+        balance_text=_format_amount(balance),
+        reading_time_text=_format_datetime(reading_at),
+        recharge_amount_text=_format_amount(latest.amount if latest else None),
+        recharge_date_text=_format_datetime(latest.recharged_at if latest else None),
+    )
+
+
+class NetworkCapture:
+    """Picks the dashboard's balance and recharge JSON out of Chrome's performance log.
+
+    The SPA fetches its data over XHR before Vue renders anything, so reading
+    the responses directly skips the render waits and the text heuristics.
+    Network.responseReceived tells us which request carries which endpoint;
+    the body can only be fetched (Network.getResponseBody) once the matching
+    Network.loadingFinished has arrived.
+    """
+
+    def __init__(self, driver, account_number=None):
+        self.driver = driver
+        self.account_number = account_number
+        self.patterns = {
+            BALANCE: os.getenv('XHR_BALANCE_URL_PATTERN', DEFAULT_BALANCE_URL_PATTERN),
+            RECHARGE: os.getenv('XHR_RECHARGE_URL_PATTERN', DEFAULT_RECHARGE_URL_PATTERN),
+        }
+        self.timeout = float(os.getenv('XHR_CAPTURE_TIMEOUT', '10'))
+        # The dashboard may never ask for recharges; don't hold a captured balance hostage for long
+        self.recharge_grace = float(os.getenv('XHR_RECHARGE_GRACE', '2'))
+        self.poll_interval = 0.2
+        self.pending = {}
+        self.payloads = {}
+
+    def _kind(self, url):
+        if self.account_number and 'accountNo=' in url and f"accountNo={self.account_number}" not in url:
+            return None
+        for kind, pattern in self.patterns.items():
+            if pattern and pattern in url:
+                return kind
+        return None
+
+    def _body(self, request_id):
+        response = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        body = response.get('body', '')
+        if response.get('base64Encoded'):
+            body = base64.b64decode(body).decode('utf-8', 'replace')
+        return json.loads(body)
+
+    def poll(self):
+        """Drain the performance log; returns the payloads captured so far by kind"""
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, TypeError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.responseReceived':
+                response = params.get('response', {})
+                kind = self._kind(response.get('url', ''))
+                if kind and response.get('status') == 200:
+                    self.pending[params.get('requestId')] = kind
+            elif method == 'Network.loadingFinished' and params.get('requestId') in self.pending:
+                kind = self.pending.pop(params['requestId'])
+                try:
+                    # Later responses (e.g. after a session-restore reload) replace earlier ones
+                    self.payloads[kind] = self._body(params['requestId'])
+                except Exception as e:
+                    print(f"Could not read captured {kind} response: {str(e)}")
+        return self.payloads
+
+    def wait(self, timeout=None):
+        """Poll until balance and recharge JSON have both landed, or give up; returns what was captured"""
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        balance_at = None
+        while True:
+            self.poll()
+            now = time.time()
+            if BALANCE in self.payloads:
+                if RECHARGE in self.payloads:
+                    break
+                balance_at = balance_at or now
+                if now - balance_at >= self.recharge_grace:
+                    break
+            if now >= deadline:
+                break
+            time.sleep(self.poll_interval)
+        return self.payloads
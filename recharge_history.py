@@ -0,0 +1,172 @@
+import os
+from datetime import datetime, timedelta
+
+from circuit_breaker import get_circuit_breaker
+from models import MonthlyConsumption, RechargeEvent, format_timestamp, parse_amount, parse_timestamp
+
+PORTAL_API = 'https://prepaid.desco.org.bd/api/tkdes/customer'
+DEFAULT_RECHARGE_HISTORY_URL = (
+    PORTAL_API + '/getRechargeHistory?accountNo={account}&meterNo=&dateFrom={date_from}&dateTo={date_to}'
+)
+DEFAULT_MONTHLY_CONSUMPTION_URL = (
+    PORTAL_API + '/getCustomerMonthlyConsumption?accountNo={account}&meterNo=&monthFrom={month_from}&monthTo={month_to}'
+)
+
+RECHARGE_FEED = 'recharges'
+CONSUMPTION_FEED = 'consumption'
+
+# Field names differ between portal versions; first one present wins
+RECHARGE_DATE_FIELDS = ('rechargeDate', 'rechargeTime', 'transactionDate', 'date')
+RECHARGE_AMOUNT_FIELDS = ('totalAmount', 'rechargeAmount', 'amount')
+RECHARGE_REFERENCE_FIELDS = ('orderID', 'orderId', 'tokenNo', 'transactionId')
+MONTH_FIELDS = ('month', 'billMonth', 'consumptionMonth')
+UNIT_FIELDS = ('consumedUnit', 'consumedUnits', 'unit')
+TAKA_FIELDS = ('consumedTaka', 'consumedAmount', 'amount')
+
+
+def _first(record, fields):
+    for field in fields:
+        if record.get(field) not in (None, ''):
+            return record[field]
+    return None
+
+
+def _number(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    return parse_amount(str(value)) if value is not None else None
+
+
+def _records(payload):
+    """The API wraps its rows as {"code": 200, "data": [...]}; accept a bare list too"""
+    if isinstance(payload, dict):
+        payload = payload.get('data') or []
+    return payload if isinstance(payload, list) else []
+
+
+def parse_recharge_history(payload, account_number, nickname='Unknown', since=None):
+    """RechargeEvents from a recharge-history response, skipping anything at or before `since`"""
+    events = []
+    for record in _records(payload):
+        if not isinstance(record, dict):
+            continue
+        date_text = _first(record, RECHARGE_DATE_FIELDS)
+        recharged_at = parse_timestamp(date_text)
+        if not recharged_at or (since and recharged_at <= since):
+            continue
+        reference = _first(record, RECHARGE_REFERENCE_FIELDS)
+        events.append(RechargeEvent(
+            account_number=account_number,
+            nickname=nickname,
+            amount=_number(_first(record, RECHARGE_AMOUNT_FIELDS)),
+            recharged_at=recharged_at,
+            recharge_date_text=str(date_text),
+            reference=str(reference) if reference is not None else None,
+        ))
+    return events
+
+
+def parse_monthly_consumption(payload, account_number, since_month=None):
+    """MonthlyConsumption rows from the API, skipping months before `since_month` ('YYYY-MM')"""
+    months = []
+    for record in _records(payload):
+        if not isinstance(record, dict):
+            continue
+        month = str(_first(record, MONTH_FIELDS) or '')[:7]
+        if len(month) != 7 or (since_month and month < since_month):
+            continue
+        months.append(MonthlyConsumption(
+            account_number=account_number,
+            month=month,
+            units=_number(_first(record, UNIT_FIELDS)),
+            amount=_number(_first(record, TAKA_FIELDS)),
+        ))
+    return months
+
+
+class RechargeHistorySync:
+    """Pulls each meter's recharge history and monthly consumption into the history store.
+
+    The dashboard only shows the last recharge, so two recharges between runs
+    would otherwise be lost. A per-meter high-water mark (newest recharge /
+    month already stored) bounds every request to what is new since the last
+    sync; the newest month is always re-fetched since it is still filling up.
+    """
+
+    def __init__(self, history, session=None, meter_nicknames=None):
+        self.history = history
+        self.session = session or self._create_session()
+        self.meter_nicknames = meter_nicknames or {}
+        self.recharge_url = os.getenv('RECHARGE_HISTORY_URL', DEFAULT_RECHARGE_HISTORY_URL)
+        self.consumption_url = os.getenv('MONTHLY_CONSUMPTION_URL', DEFAULT_MONTHLY_CONSUMPTION_URL)
+        # How far back the first sync of a meter reaches
+        self.initial_days = int(os.getenv('RECHARGE_HISTORY_DAYS', '365'))
+        self.timeout = int(os.getenv('PAGE_LOAD_TIMEOUT', '60'))
+
+    def _create_session(self):
+        import requests
+        import urllib3
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        session = requests.Session()
+        session.headers['User-Agent'] = 'Mozilla/5.0 (X11; Linux x86_64) electricity-meter-bot'
+        # Same broken certificate chain as the portal pages
+        session.verify = False
+        return session
+
+    def _fetch(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def sync_recharges(self, account_number, today=None):
+        """Fetch and store recharges newer than the stored mark, returns the number of new events"""
+        today = today or datetime.now()
+        mark = parse_timestamp(self.history.get_sync_mark(account_number, RECHARGE_FEED))
+        # The API filters by whole days; events on the mark's day are dropped by the mark itself
+        date_from = mark.date() if mark else (today - timedelta(days=self.initial_days)).date()
+        url = self.recharge_url.format(
+            account=account_number, date_from=date_from.isoformat(), date_to=today.date().isoformat()
+        )
+        events = parse_recharge_history(
+            self._fetch(url), account_number, self.meter_nicknames.get(account_number, 'Unknown'), since=mark
+        )
+        inserted = self.history.record_recharge_events(events)
+        if events:
+            newest = max(event.recharged_at for event in events)
+            self.history.set_sync_mark(account_number, RECHARGE_FEED, format_timestamp(newest))
+        return inserted
+
+    def sync_consumption(self, account_number, today=None):
+        """Fetch and store months from the stored mark onwards, returns the number of months stored"""
+        today = today or datetime.now()
+        mark = self.history.get_sync_mark(account_number, CONSUMPTION_FEED)
+        month_from = mark or (today - timedelta(days=self.initial_days)).strftime('%Y-%m')
+        url = self.consumption_url.format(
+            account=account_number, month_from=month_from, month_to=today.strftime('%Y-%m')
+        )
+        months = parse_monthly_consumption(self._fetch(url), account_number, since_month=mark)
+        stored = self.history.record_monthly_consumption(months)
+        if months:
+            self.history.set_sync_mark(account_number, CONSUMPTION_FEED, max(month.month for month in months))
+        return stored
+
+    def sync_all(self, accounts):
+        """Sync every meter; returns {account: {"recharges": n, "months": n} or {"error": msg}}"""
+        breaker = get_circuit_breaker(self.recharge_url)
+        results = {}
+        for account_number in accounts:
+            if not breaker.allow_request():
+                print(f"SKIPPED: Circuit breaker open, not syncing history for {account_number}")
+                results[account_number] = {"error": "circuit breaker open"}
+                continue
+            try:
+                results[account_number] = {
+                    "recharges": self.sync_recharges(account_number),
+                    "months": self.sync_consumption(account_number),
+                }
+                print(f"HISTORY SYNC: {account_number} - {results[account_number]['recharges']} new recharges, "
+                      f"{results[account_number]['months']} months updated")
+            except Exception as e:
+                print(f"History sync failed for {account_number}: {str(e)}")
+                results[account_number] = {"error": str(e)}
+        return results
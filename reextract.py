@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Re-run extraction over archived page snapshots and diff the results against the stored readings
+
+Usage: python reextract.py [--account 37226784] [--run RUN_ID] [--since 2025-08-01] [--until 2025-08-31]
+                           [--workers 4] [--output diffs.jsonl] [--from-html] [--all]
+
+Runs entirely offline: pages come from the snapshot archive (SNAPSHOT_DIR), readings
+from the history store. Each distinct page is extracted once, in a process pool, and
+results are streamed as JSON lines - only changed readings unless --all is given.
+"""
+
+import argparse
+import bisect
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from extraction import extract_fields
+from html_extraction import page_texts
+from models import MeterReading
+from network_capture import BALANCE, RECHARGE, reading_from_payloads
+from snapshot_archive import SnapshotArchive
+
+# Reading fields extraction decides, compared against the history store
+COMPARED_FIELDS = (
+    'remaining_balance', 'balance_numeric', 'reading_time',
+    'last_recharge_amount', 'last_recharge_date', 'recharge_amount_numeric',
+)
+
+STORED_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def extract_snapshot(snapshot, account_number='', nickname='Unknown', from_html=False):
+    """Reading fields (COMPARED_FIELDS) from one archived snapshot, with the current extraction rules
+
+    from_html re-parses the archived page source (html_extraction) instead of
+    using the text elements the scraper saw.
+    """
+    if from_html:
+        if not snapshot.get('html'):
+            raise ValueError("snapshot has no page HTML")
+        data = extract_fields(page_texts(snapshot['html']))
+    elif snapshot.get('texts') is not None:
+        data = extract_fields(snapshot['texts'])
+    elif snapshot.get('xhr', {}).get(BALANCE) is not None:
+        reading = reading_from_payloads(account_number, nickname, snapshot['xhr'][BALANCE],
+                                        snapshot['xhr'].get(RECHARGE))
+        if reading is None:
+            raise ValueError("captured balance response has no balance")
+        data = reading.to_dict()
+    else:
+        raise ValueError("snapshot has neither page texts nor a captured balance response")
+    data = MeterReading.from_dict(dict(data, account_number=account_number)).to_dict()
+    return {field: data[field] for field in COMPARED_FIELDS}
+
+
+_worker_archive = None
+
+def _init_worker(root):
+    global _worker_archive
+    _worker_archive = SnapshotArchive(root, retention_days=0)
+
+
+def _extract_blob(sha256, archive=None, from_html=False):
+    try:
+        return sha256, extract_snapshot((archive or _worker_archive).get(sha256), from_html=from_html), None
+    except Exception as e:
+        return sha256, None, f"{type(e).__name__}: {str(e)}"
+
+
+def diff_fields(stored, fields):
+    """{field: [stored, re-extracted]} for every compared field that differs"""
+    return {
+        field: [stored.get(field), fields.get(field)]
+        for field in COMPARED_FIELDS
+        if stored.get(field) != fields.get(field)
+    }
+
+
+class StoredReadings:
+    """Stored readings per account, for finding the one a snapshot was extracted into"""
+
+    def __init__(self, history, entries, match_seconds):
+        self.match = timedelta(seconds=match_seconds)
+        self.readings = {}
+        captured_by_account = {}
+        for entry in entries:
+            captured_by_account.setdefault(entry['account_number'], []).append(entry['captured_at'])
+        for account_number, captured in captured_by_account.items():
+            rows = list(self._history_rows(
+                history, account_number,
+                (datetime.fromisoformat(min(captured)) - self.match).strftime(STORED_TIMESTAMP_FORMAT),
+                (datetime.fromisoformat(max(captured)) + self.match).strftime(STORED_TIMESTAMP_FORMAT),
+            ))
+            self.readings[account_number] = (
+                [datetime.strptime(row['timestamp'], STORED_TIMESTAMP_FORMAT) for row in rows], rows
+            )
+
+    @staticmethod
+    def _history_rows(history, account_number, date_from, date_to, page_size=5000):
+        """Every stored reading in the range, fetched a page at a time"""
+        offset = 0
+        while True:
+            rows = history.get_history(account_number, date_from, date_to, limit=page_size, offset=offset)
+            yield from rows
+            if len(rows) < page_size:
+                return
+            offset += page_size
+
+    def find(self, account_number, captured_at):
+        """The stored reading closest in time to a snapshot (within match_seconds), or None"""
+        times, rows = self.readings.get(account_number, ([], []))
+        index = bisect.bisect_left(times, captured_at)
+        candidates = [i for i in (index - 1, index) if 0 <= i < len(times)]
+        if not candidates:
+            return None
+        best = min(candidates, key=lambda i: abs(times[i] - captured_at))
+        return rows[best] if abs(times[best] - captured_at) <= self.match else None
+
+
+class ReExtractor:
+    """Runs the current extraction rules over archived snapshots and compares with what was stored.
+
+    Identical pages share one blob in the archive, so each distinct blob is
+    extracted once; a process pool spreads the work when there is enough of it.
+    """
+
+    def __init__(self, archive, history=None, workers=None, match_seconds=None, from_html=False):
+        self.archive = archive
+        self.from_html = from_html
+        self.history = history
+        self.workers = workers or int(os.getenv('REEXTRACT_WORKERS', str(os.cpu_count() or 1)))
+        self.match_seconds = float(match_seconds if match_seconds is not None
+                                   else os.getenv('REEXTRACT_MATCH_SECONDS', '300'))
+        # Below this many distinct pages, spawning workers costs more than it saves
+        self.min_pool_pages = 200
+
+    def _extracted(self, blobs):
+        """(sha256, fields, error) for each blob, in completion order"""
+        if self.workers <= 1 or len(blobs) < self.min_pool_pages:
+            for sha256 in blobs:
+                yield _extract_blob(sha256, self.archive, self.from_html)
+            return
+        chunksize = max(1, min(256, len(blobs) // (self.workers * 4)))
+        with multiprocessing.get_context('spawn').Pool(
+            self.workers, initializer=_init_worker, initargs=(self.archive.root,)
+        ) as pool:
+            extract = functools.partial(_extract_blob, from_html=self.from_html)
+            yield from pool.imap_unordered(extract, blobs, chunksize=chunksize)
+
+    def run(self, entries):
+        """Yield one result dict per archived snapshot as its page is extracted"""
+        by_blob = {}
+        for entry in entries:
+            by_blob.setdefault(entry['sha256'], []).append(entry)
+        stored = StoredReadings(self.history, entries, self.match_seconds) if self.history else None
+
+        for sha256, fields, error in self._extracted(list(by_blob)):
+            for entry in by_blob[sha256]:
+                result = {
+                    "account_number": entry['account_number'],
+                    "run_id": entry['run_id'],
+                    "captured_at": entry['captured_at'],
+                    "sha256": sha256,
+                    "fields": fields,
+                    "error": error,
+                    "stored_timestamp": None,
+                    "changes": None,
+                }
+                reading = stored.find(entry['account_number'], datetime.fromisoformat(entry['captured_at'])) if stored else None
+                if reading and fields:
+                    result["stored_timestamp"] = reading['timestamp']
+                    result["changes"] = diff_fields(reading, fields)
+                yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-extract archived dashboard snapshots and diff against stored readings")
+    parser.add_argument('--account', help="Only this account's snapshots")
+    parser.add_argument('--run', help="Only snapshots from this run id")
+    parser.add_argument('--since', help="Snapshots captured on or after this date (YYYY-MM-DD)")
+    parser.add_argument('--until', help="Snapshots captured before this date (YYYY-MM-DD)")
+    parser.add_argument('--workers', type=int, help="Extraction processes (default REEXTRACT_WORKERS or CPU count)")
+    parser.add_argument('--output', help="Write results as JSON lines here instead of stdout")
+    parser.add_argument('--from-html', action='store_true',
+                        help="Re-parse the archived page HTML instead of using the archived text elements")
+    parser.add_argument('--all', action='store_true', help="Output every snapshot, not just changed or failed ones")
+    parser.add_argument('--archive', help="Snapshot directory (defaults to SNAPSHOT_DIR)")
+    parser.add_argument('--db', help="History database (defaults to HISTORY_DB_PATH)")
+    args = parser.parse_args(argv)
+
+    from history_store import MeterHistory
+
+    archive = SnapshotArchive(args.archive, retention_days=0)
+    history = MeterHistory(args.db)
+    entries = archive.entries(
+        account_number=args.account,
+        run_id=args.run,
+        since=datetime.fromisoformat(args.since) if args.since else None,
+        until=datetime.fromisoformat(args.until) if args.until else None,
+    )
+    reextractor = ReExtractor(archive, history, workers=args.workers, from_html=args.from_html)
+
+    started = time.perf_counter()
+    counts = {"snapshots": 0, "matched": 0, "changed": 0, "errors": 0}
+    field_changes = {}
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in reextractor.run(entries):
+            counts["snapshots"] += 1
+            if result["error"]:
+                counts["errors"] += 1
+            if result["stored_timestamp"]:
+                counts["matched"] += 1
+            if result["changes"]:
+                counts["changed"] += 1
+                for field in result["changes"]:
+                    field_changes[field] = field_changes.get(field, 0) + 1
+            if args.all or result["error"] or result["changes"]:
+                out.write(json.dumps(result) + "\n")
+    finally:
+        if args.output:
+            out.close()
+        history.close()
+        archive.close()
+
+    elapsed = time.perf_counter() - started
+    rate = counts["snapshots"] / elapsed if elapsed else 0
+    print(f"✅ Re-extracted {counts['snapshots']} snapshots in {elapsed:.1f}s ({rate:.0f}/s): "
+          f"{counts['matched']} matched a stored reading, {counts['changed']} changed, {counts['errors']} failed",
+          file=sys.stderr)
+    for field, changed in sorted(field_changes.items()):
+        print(f"   {field}: {changed} changed", file=sys.stderr)
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
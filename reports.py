@@ -0,0 +1,162 @@
+import calendar
+import io
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+DIGEST_KINDS = ('weekly', 'monthly')
+
+
+@dataclass(slots=True)
+class Digest:
+    """A rendered digest for one period, covering every meter"""
+    kind: str
+    period_start: str
+    period_end: str
+    message: str
+    chart: Optional[bytes] = None
+    cached: bool = False
+
+
+def period_bounds(kind, today=None):
+    """The last complete period before today: the 7 days ending yesterday, or the previous calendar month"""
+    today = today or date.today()
+    if kind == 'weekly':
+        end = today - timedelta(days=1)
+        return end - timedelta(days=6), end
+    if kind == 'monthly':
+        end = today.replace(day=1) - timedelta(days=1)
+        return end.replace(day=1), end
+    raise ValueError(f"Unknown digest kind: {kind}")
+
+
+def summarize(rows, days_in_period):
+    """Fold daily rollup rows (ordered by account, day) into per-meter totals in a single pass"""
+    meters = {}
+    for row in rows:
+        meter = meters.get(row['account_number'])
+        if meter is None:
+            meter = meters[row['account_number']] = {
+                "consumption": 0.0, "recharge_total": 0.0, "recharge_count": 0,
+                "min_balance": None, "closing_balance": None, "series": [],
+            }
+        meter["consumption"] += row['consumption']
+        meter["recharge_total"] += row['recharge_total']
+        meter["recharge_count"] += row['recharge_count']
+        if row['min_balance'] is not None and (meter["min_balance"] is None or row['min_balance'] < meter["min_balance"]):
+            meter["min_balance"] = row['min_balance']
+        if row['closing_balance'] is not None:
+            # Rows arrive in day order, so the last one seen is the closing balance
+            meter["closing_balance"] = row['closing_balance']
+        meter["series"].append((row['day'], row['consumption']))
+
+    for meter in meters.values():
+        meter["daily_average"] = meter["consumption"] / days_in_period
+        balance = meter["closing_balance"]
+        average = meter["daily_average"]
+        meter["days_left"] = balance / average if balance is not None and average > 0 else None
+        meter["projected"] = average * days_in_period
+    return meters
+
+
+def render_message(kind, start, end, meters, nicknames, units=None):
+    units = units or {}
+    title = "WEEKLY DIGEST" if kind == 'weekly' else "MONTHLY DIGEST"
+    message = f"📊 <b>{title}</b>\n"
+    message += f"📅 <b>Period:</b> {start.strftime('%d %b')} – {end.strftime('%d %b %Y')}\n"
+
+    if not meters:
+        return message + "\nNo readings were stored for this period."
+
+    total = 0.0
+    for account_number, meter in sorted(meters.items()):
+        total += meter["consumption"]
+        message += f"\n🏠 <b>{nicknames.get(account_number, 'Unknown')} ({account_number})</b>\n"
+        used = f"⚡ Used: {meter['consumption']:,.2f} BDT ({meter['daily_average']:,.2f}/day)"
+        if units.get(account_number) and units[account_number].get('units') is not None:
+            used += f", {units[account_number]['units']:,.1f} kWh"
+        message += used + "\n"
+        message += f"💳 Recharges: {meter['recharge_count']} ({meter['recharge_total']:,.2f} BDT)\n"
+        if meter["min_balance"] is not None:
+            message += f"📉 Lowest balance: {meter['min_balance']:,.2f} BDT\n"
+        next_period = "week" if kind == 'weekly' else "month"
+        forecast = f"🔮 Next {next_period}: ~{meter['projected']:,.0f} BDT"
+        if meter["days_left"] is not None:
+            forecast += f"; {meter['closing_balance']:,.2f} BDT left lasts ~{meter['days_left']:.0f} days"
+        message += forecast + "\n"
+
+    message += f"\n💰 <b>Total used:</b> {total:,.2f} BDT"
+    return message
+
+
+def render_chart(kind, start, end, meters, nicknames):
+    """PNG line chart of daily consumption per meter, or None if matplotlib isn't installed"""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return None
+
+    figure, axis = plt.subplots(figsize=(8, 4))
+    for account_number, meter in sorted(meters.items()):
+        days = [day[5:] for day, _ in meter["series"]]
+        axis.plot(days, [value for _, value in meter["series"]], marker='o',
+                  label=nicknames.get(account_number, account_number))
+    axis.set_title(f"Daily consumption {start.isoformat()} to {end.isoformat()}")
+    axis.set_ylabel("BDT")
+    axis.legend(loc='upper left', fontsize='small')
+    axis.tick_params(axis='x', labelrotation=45, labelsize='small')
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', dpi=100)
+    plt.close(figure)
+    return buffer.getvalue()
+
+
+class DigestReporter:
+    """Builds weekly/monthly digests from the precomputed daily rollups and sends them to Telegram"""
+
+    def __init__(self, history, telegram_bot=None, meter_nicknames=None, charts=None):
+        self.history = history
+        self.telegram_bot = telegram_bot
+        self.meter_nicknames = meter_nicknames or {}
+        if charts is None:
+            charts = os.getenv('DIGEST_CHARTS', 'true').lower() == 'true'
+        self.charts = charts
+
+    def build(self, kind, today=None, force=False):
+        start, end = period_bounds(kind, today)
+        if not force:
+            cached = self.history.get_cached_report(kind, start.isoformat(), end.isoformat())
+            if cached:
+                return Digest(kind, start.isoformat(), end.isoformat(), cached[0], cached[1], cached=True)
+
+        days_in_period = (end - start).days + 1
+        rows = self.history.get_rollups(None, 'daily', start.isoformat(), end.isoformat())
+        meters = summarize(rows, days_in_period)
+        # Portal kWh figures only exist per calendar month
+        units = self.history.get_monthly_consumption_for(start.strftime('%Y-%m')) if kind == 'monthly' else {}
+
+        message = render_message(kind, start, end, meters, self.meter_nicknames, units)
+        chart = render_chart(kind, start, end, meters, self.meter_nicknames) if self.charts and meters else None
+        self.history.cache_report(kind, start.isoformat(), end.isoformat(), message, chart)
+        return Digest(kind, start.isoformat(), end.isoformat(), message, chart)
+
+    def send(self, kind, today=None, force=False):
+        digest = self.build(kind, today, force)
+        sent = self.telegram_bot.send_message(digest.message)
+        if sent and digest.chart:
+            self.telegram_bot.send_photo(digest.chart, caption=f"📈 {kind.title()} consumption")
+        return sent
+
+    def due_digests(self, today=None):
+        """Digest kinds due today: weekly on Mondays, monthly on the 1st"""
+        today = today or date.today()
+        due = []
+        if today.weekday() == calendar.MONDAY:
+            due.append('weekly')
+        if today.day == 1:
+            due.append('monthly')
+        return due
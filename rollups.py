@@ -0,0 +1,148 @@
+"""Daily and monthly per-meter aggregates, kept up to date as readings and recharges are stored.
+
+Consumption is the sum of balance drops between consecutive readings,
+booked on the day of the later reading; an interval where the balance rose
+(a recharge landed) counts as zero. Reports and the API read these rows
+instead of scanning the raw readings table.
+"""
+
+# (table, period column, length of the timestamp prefix that names the period)
+ROLLUP_PERIODS = (
+    ('daily_rollups', 'day', 10),
+    ('monthly_rollups', 'month', 7),
+)
+
+ROLLUP_COLUMNS = [
+    'consumption',
+    'recharge_total',
+    'recharge_count',
+    'min_balance',
+    'closing_balance',
+    'closing_at',
+    'readings',
+]
+
+
+def create_rollup_tables(conn):
+    for table, period, _ in ROLLUP_PERIODS:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                account_number TEXT NOT NULL,
+                {period} TEXT NOT NULL,
+                consumption REAL NOT NULL DEFAULT 0,
+                recharge_total REAL NOT NULL DEFAULT 0,
+                recharge_count INTEGER NOT NULL DEFAULT 0,
+                min_balance REAL,
+                closing_balance REAL,
+                closing_at TEXT,
+                readings INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (account_number, {period})
+            )
+        """)
+
+
+def _add(conn, account_number, timestamp, consumption=0.0, recharge=0.0, recharges=0, balance=None, readings=0):
+    """Fold one change into the day and month containing timestamp"""
+    closing_at = timestamp if balance is not None else None
+    for table, period, length in ROLLUP_PERIODS:
+        conn.execute(f"""
+            INSERT INTO {table} (account_number, {period}, consumption, recharge_total, recharge_count,
+                                 min_balance, closing_balance, closing_at, readings)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (account_number, {period}) DO UPDATE SET
+                consumption = consumption + excluded.consumption,
+                recharge_total = recharge_total + excluded.recharge_total,
+                recharge_count = recharge_count + excluded.recharge_count,
+                readings = readings + excluded.readings,
+                min_balance = MIN(COALESCE(min_balance, excluded.min_balance),
+                                  COALESCE(excluded.min_balance, min_balance)),
+                closing_balance = CASE WHEN excluded.closing_at >= COALESCE(closing_at, '')
+                                       THEN excluded.closing_balance ELSE closing_balance END,
+                closing_at = CASE WHEN excluded.closing_at >= COALESCE(closing_at, '')
+                                  THEN excluded.closing_at ELSE closing_at END
+        """, (account_number, timestamp[:length], consumption, recharge, recharges,
+              balance, balance, closing_at, readings))
+
+
+def _drop(previous, current):
+    if previous is None or current is None:
+        return 0.0
+    return max(previous - current, 0.0)
+
+
+def apply_reading(conn, account_number, timestamp, balance):
+    """Account for a reading that was just inserted into `readings` (same transaction)"""
+    if balance is None:
+        _add(conn, account_number, timestamp, readings=1)
+        return
+
+    previous = conn.execute("""
+        SELECT balance_numeric FROM readings
+        WHERE account_number = ? AND timestamp < ? AND balance_numeric IS NOT NULL
+        ORDER BY timestamp DESC LIMIT 1
+    """, (account_number, timestamp)).fetchone()
+    following = conn.execute("""
+        SELECT timestamp, balance_numeric FROM readings
+        WHERE account_number = ? AND timestamp > ? AND balance_numeric IS NOT NULL
+        ORDER BY timestamp LIMIT 1
+    """, (account_number, timestamp)).fetchone()
+    previous_balance = previous[0] if previous else None
+
+    _add(conn, account_number, timestamp, consumption=_drop(previous_balance, balance), balance=balance, readings=1)
+    if following:
+        # A backfilled reading splits the interval that used to end at the following reading
+        following_at, following_balance = following
+        correction = _drop(balance, following_balance) - _drop(previous_balance, following_balance)
+        if correction:
+            _add(conn, account_number, following_at, consumption=correction)
+
+
+def apply_recharge(conn, account_number, recharged_at, amount):
+    """Account for a recharge event that was just inserted (same transaction)"""
+    _add(conn, account_number, recharged_at, recharge=amount or 0.0, recharges=1)
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup from readings and recharge_events in one ordered pass"""
+    for table, _, _ in ROLLUP_PERIODS:
+        conn.execute(f"DELETE FROM {table}")
+    previous_account = previous_balance = None
+    for account_number, timestamp, balance in conn.execute("""
+        SELECT account_number, timestamp, balance_numeric FROM readings ORDER BY account_number, timestamp
+    """).fetchall():
+        if account_number != previous_account:
+            previous_account, previous_balance = account_number, None
+        _add(conn, account_number, timestamp, consumption=_drop(previous_balance, balance),
+             balance=balance, readings=1)
+        if balance is not None:
+            previous_balance = balance
+    for account_number, recharged_at, amount in conn.execute(
+        "SELECT account_number, recharged_at, amount FROM recharge_events"
+    ).fetchall():
+        apply_recharge(conn, account_number, recharged_at, amount)
+
+
+def get_rollups(conn, account_number=None, period='daily', start=None, end=None):
+    """Return rollup rows, oldest first, for one meter or (account_number=None) all meters in one query.
+
+    start/end are inclusive period keys ('2025-08-01' / '2025-08').
+    """
+    table, column, length = ROLLUP_PERIODS[0] if period == 'daily' else ROLLUP_PERIODS[1]
+    clauses = []
+    params = []
+    if account_number is not None:
+        clauses.append("account_number = ?")
+        params.append(account_number)
+    if start:
+        clauses.append(f"{column} >= ?")
+        params.append(start[:length])
+    if end:
+        clauses.append(f"{column} <= ?")
+        params.append(end[:length])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(
+        f"SELECT account_number, {column}, {', '.join(ROLLUP_COLUMNS)} FROM {table} {where} "
+        f"ORDER BY account_number, {column}",
+        params
+    ).fetchall()
+    return [dict(row) for row in rows]
@@ -0,0 +1,47 @@
+import math
+import os
+import time
+from datetime import datetime
+
+from adaptive_scheduler import meter_outlooks
+from meter_policy import get_policy_table
+
+
+class RunPlanner:
+    """Orders a run's meters by risk and sets its time budget.
+
+    Meters whose balance is predicted to be lowest right now (latest balance
+    minus the burn rate since it was read) are scraped first, so a slow or
+    over-budget run still gets the alerts that matter out. Meters with no
+    stored balance go first, since nothing is known about them.
+    """
+
+    def __init__(self, history, policies=None):
+        self.history = history
+        self.policies = policies or get_policy_table()
+        # 0 = no limit; meters that don't fit are deferred to a follow-up run
+        self.time_budget = float(os.getenv('RUN_TIME_BUDGET_SECONDS', '0'))
+        self.burn_days = int(os.getenv('ADAPTIVE_BURN_DAYS', '14'))
+
+    def plan(self, accounts, now=None):
+        """[(account_number, predicted balance or None)] in scrape order"""
+        now = now or datetime.now()
+        predicted = [
+            (outlook.account_number, outlook.predicted_balance(now))
+            for outlook in meter_outlooks(self.history, accounts, self.policies, self.burn_days, now)
+        ]
+        # sorted() is stable, so equally risky meters keep their configured order
+        return sorted(predicted, key=lambda item: -math.inf if item[1] is None else item[1])
+
+    def order(self, accounts, now=None):
+        try:
+            return [account_number for account_number, _ in self.plan(accounts, now)]
+        except Exception as e:
+            print(f"Run planning failed, keeping configured meter order: {str(e)}")
+            return list(accounts)
+
+    def deadline(self, started=None):
+        """Wall-clock (time.time()) deadline for a run starting now, or None without a budget"""
+        if self.time_budget <= 0:
+            return None
+        return (started or time.time()) + self.time_budget
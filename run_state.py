@@ -0,0 +1,96 @@
+import os
+import uuid
+from datetime import datetime
+
+from json_store import load_json, save_json
+from models import MeterReading
+
+
+class RunState:
+    """Resumable state of a multi-meter run, persisted after every meter.
+
+    If the process dies mid-run, the next run picks the file back up and only
+    scrapes the meters that don't have a successful result yet - as long as
+    it is for the same meters and younger than RUN_RESUME_MAX_AGE_SECONDS,
+    so stale balances are never reported as current.
+    """
+
+    def __init__(self, path, accounts, run_id=None, started_at=None, completed=None):
+        self.path = path
+        self.accounts = list(accounts)
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = started_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.completed = completed or {}
+        self.resumed = False
+
+    @classmethod
+    def default_path(cls):
+        return os.getenv('RUN_STATE_PATH', 'run_state.json')
+
+    @classmethod
+    def load(cls, path=None):
+        """Return the unfinished run stored at path, or None"""
+        path = path or cls.default_path()
+        stored = load_json(path, 'run state')
+        if stored is None:
+            return None
+        try:
+            state = cls(path, stored['accounts'], stored['run_id'], stored['started_at'], stored.get('completed'))
+            state.resumed = True
+            return state
+        except Exception as e:
+            print(f"Ignoring unreadable run state {path}: {str(e)}")
+            return None
+
+    @classmethod
+    def load_or_create(cls, accounts, path=None, max_age_seconds=None, now=None):
+        """Resume the interrupted run if it is recent and for the same meters, otherwise start a new one"""
+        path = path or cls.default_path()
+        if max_age_seconds is None:
+            max_age_seconds = float(os.getenv('RUN_RESUME_MAX_AGE_SECONDS', '21600'))
+        state = cls.load(path)
+        if state and state.pending_accounts():
+            age = ((now or datetime.now()) - datetime.strptime(state.started_at, "%Y-%m-%d %H:%M:%S")).total_seconds()
+            if age > max_age_seconds:
+                print(f"Discarding interrupted run {state.run_id} from {state.started_at}: "
+                      f"older than {max_age_seconds:.0f}s")
+            elif set(state.accounts) != set(accounts):
+                # A retry / follow-up / adaptive subset must not run (or mark checked) someone else's meter list
+                print(f"Not resuming interrupted run {state.run_id}: it was for different meters")
+            else:
+                print(f"Resuming interrupted run {state.run_id} from {state.started_at}: "
+                      f"{len(state.pending_accounts())} of {len(state.accounts)} meters left")
+                return state
+        state = cls(path, accounts)
+        state.save()
+        return state
+
+    def pending_accounts(self):
+        return [account for account in self.accounts if account not in self.completed]
+
+    def get_completed(self, account_number):
+        """Return the stored MeterReading for a finished meter, or None"""
+        data = self.completed.get(account_number)
+        return MeterReading.from_dict(data) if data else None
+
+    def record_result(self, account_number, reading):
+        """Remember a successful result; failed meters stay pending for the resume"""
+        if reading and reading.succeeded:
+            self.completed[account_number] = reading.to_dict()
+            self.save()
+
+    def save(self):
+        payload = {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "accounts": self.accounts,
+            "completed": self.completed,
+        }
+        save_json(self.path, payload)
+
+    def finish(self):
+        """The run went through every meter - nothing left to resume"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
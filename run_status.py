@@ -0,0 +1,155 @@
+import os
+import threading
+from datetime import datetime
+
+import pytz
+
+
+class RunStatus:
+    """In-memory snapshot of the scheduler state, shared with the keep-alive server.
+
+    Writers replace the whole snapshot under a lock; readers just grab the
+    current reference, so health checks never wait on a running scrape and
+    never touch the browser or disk.
+    """
+
+    def __init__(self):
+        self.bd_timezone = pytz.timezone('Asia/Dhaka')
+        # A run that takes longer than this is considered wedged (Chrome hung, etc.)
+        self.stall_seconds = int(os.getenv('RUN_STALL_SECONDS', '1800'))
+        self._lock = threading.Lock()
+        self._snapshot = {
+            "service": "electricity-meter-bot",
+            "started_at": self._now(),
+            "scheduler_started": False,
+            "running": False,
+            "current_run_started": None,
+            "last_run_started": None,
+            "last_run_finished": None,
+            "last_run_duration_seconds": None,
+            "last_run_status": None,
+            "last_error": None,
+            "next_run_bd": None,
+            "meters": {},
+            "queue": {"pending_meters": 0, "scheduled_jobs": 0},
+            "circuit_breaker": None,
+            # Meters the last run had no time budget left for
+            "deferred_meters": [],
+            # Adaptive polling: planned vs budgeted browser time and meters held back to the next day
+            "adaptive_budget": None,
+        }
+
+    def _now(self):
+        return datetime.now(self.bd_timezone).isoformat(timespec='seconds')
+
+    def _update(self, **changes):
+        with self._lock:
+            snapshot = dict(self._snapshot)
+            snapshot.update(changes)
+            self._snapshot = snapshot
+
+    def snapshot(self):
+        """Return the current snapshot (treat as read-only)"""
+        return self._snapshot
+
+    def mark_scheduler_started(self, scheduled_jobs):
+        queue = dict(self._snapshot["queue"], scheduled_jobs=scheduled_jobs)
+        self._update(scheduler_started=True, queue=queue)
+
+    def set_next_run(self, next_run_bd):
+        """Record the next scheduled run (an aware BD datetime or None)"""
+        value = next_run_bd.isoformat(timespec='seconds') if next_run_bd else None
+        if value != self._snapshot["next_run_bd"]:
+            self._update(next_run_bd=value)
+
+    def set_circuit_breaker(self, breaker_state):
+        """Record the portal circuit breaker state (CircuitBreaker.to_dict())"""
+        self._update(circuit_breaker=breaker_state)
+
+    def set_deferred(self, accounts):
+        """Record which meters the last run deferred to a follow-up run"""
+        self._update(deferred_meters=list(accounts))
+
+    def set_adaptive_budget(self, budget_minutes, planned_minutes, over_budget):
+        """Record the adaptive polling budget and any overrun (planned minutes above budget, meters deferred)"""
+        self._update(adaptive_budget={
+            "budget_minutes": round(budget_minutes, 1),
+            "planned_minutes": round(planned_minutes, 1),
+            "overrun_minutes": round(max(planned_minutes - budget_minutes, 0), 1),
+            "deferred_to_tomorrow": list(over_budget),
+        })
+
+    def run_started(self, meter_count):
+        queue = dict(self._snapshot["queue"], pending_meters=meter_count)
+        self._update(running=True, current_run_started=self._now(), queue=queue)
+
+    def record_meter_result(self, account_number, reading):
+        """Progress callback for scrape_all_meters - called once per meter with a MeterReading"""
+        meters = dict(self._snapshot["meters"])
+        previous = meters.get(account_number, {})
+        success = bool(reading) and reading.succeeded
+        meters[account_number] = {
+            "nickname": reading.nickname if reading else previous.get('nickname'),
+            "success": success,
+            "last_attempt": self._now(),
+            "last_success": self._now() if success else previous.get('last_success'),
+        }
+        queue = dict(self._snapshot["queue"])
+        queue["pending_meters"] = max(queue["pending_meters"] - 1, 0)
+        self._update(meters=meters, queue=queue)
+
+    def run_finished(self, status, error=None):
+        """Close the current run with status 'success', 'partial', 'failed' or 'error'"""
+        started = self._snapshot["current_run_started"]
+        duration = None
+        if started:
+            elapsed = datetime.now(self.bd_timezone) - datetime.fromisoformat(started)
+            duration = round(elapsed.total_seconds(), 1)
+        queue = dict(self._snapshot["queue"], pending_meters=0)
+        self._update(
+            running=False,
+            current_run_started=None,
+            last_run_started=started,
+            last_run_finished=self._now(),
+            last_run_duration_seconds=duration,
+            last_run_status=status,
+            last_error=error,
+            queue=queue,
+        )
+
+    def is_stalled(self, snapshot=None):
+        snapshot = snapshot or self._snapshot
+        started = snapshot["current_run_started"]
+        if not snapshot["running"] or not started:
+            return False
+        elapsed = datetime.now(self.bd_timezone) - datetime.fromisoformat(started)
+        return elapsed.total_seconds() > self.stall_seconds
+
+    def health(self):
+        """Return (payload, healthy) for the /health endpoint"""
+        snapshot = self._snapshot
+        problems = []
+        if self.is_stalled(snapshot):
+            problems.append("run exceeded stall timeout")
+        if snapshot["last_run_status"] in ('failed', 'error'):
+            problems.append(f"last run {snapshot['last_run_status']}")
+        payload = dict(snapshot)
+        payload["status"] = "unhealthy" if problems else "healthy"
+        payload["problems"] = problems
+        return payload, not problems
+
+    def readiness(self):
+        """Return (payload, ready) for the /ready endpoint"""
+        snapshot = self._snapshot
+        ready = snapshot["scheduler_started"] and not self.is_stalled(snapshot)
+        payload = {
+            "ready": ready,
+            "scheduler_started": snapshot["scheduler_started"],
+            "running": snapshot["running"],
+            "next_run_bd": snapshot["next_run_bd"],
+        }
+        return payload, ready
+
+
+# Shared instance used by both the scheduler and the keep-alive server
+run_status = RunStatus()
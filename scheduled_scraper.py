@@ -2,10 +2,24 @@ import schedule
 import time
 import os
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
 from scraper import ElectricityMeterScraper
 from telegram_bot import TelegramBot
+from run_status import run_status
+from history_store import get_history_store
+from circuit_breaker import get_circuit_breaker
+from run_state import RunState
+from selector_cache import SelectorCache
+from scrape_worker import IsolatedScraper
+from recharge_history import RechargeHistorySync
+from reports import DigestReporter, DIGEST_KINDS
+from anomaly_detector import AnomalyDetector
+from alert_state import AlertState
+from work_queue import QueueScraper
+from multi_context import MultiContextScraper
+from adaptive_scheduler import AdaptiveScheduler
+from run_planner import RunPlanner
 
 # Configure logging
 logging.basicConfig(
@@ -20,8 +34,26 @@ logging.basicConfig(
 class ScheduledMeterScraper:
     def __init__(self):
         self.website_url = os.getenv('METER_WEBSITE_URL', 'https://prepaid.desco.org.bd/customer/#/customer-login')
-        self.scraper = ElectricityMeterScraper()
+        # By default each run's Selenium work happens in a supervised worker process
+        # so Chrome leaks die with the worker instead of piling up in the scheduler;
+        # 'queue' hands the meters to `python work_queue.py worker` processes instead,
+        # 'contexts' scrapes BROWSER_CONTEXTS meters at once in one in-process Chrome
+        isolation = os.getenv('SCRAPE_ISOLATION', 'process').lower()
+        if isolation == 'process':
+            self.scraper = IsolatedScraper()
+        elif isolation == 'queue':
+            self.scraper = QueueScraper()
+        elif isolation == 'contexts':
+            self.scraper = MultiContextScraper()
+        else:
+            self.scraper = ElectricityMeterScraper()
         self.telegram_bot = TelegramBot()
+        self.status = run_status
+        self.history = get_history_store()
+        # Remembers what each meter was last reported as, so repeated runs don't re-send it
+        self.alert_state = AlertState()
+        # Recharge history / monthly consumption from the portal API, synced after each run
+        self.sync_portal_history = os.getenv('PORTAL_HISTORY_SYNC', 'true').lower() == 'true'
         
         # Set up timezone handling
         self.bd_timezone = pytz.timezone('Asia/Dhaka')
@@ -33,6 +65,22 @@ class ScheduledMeterScraper:
         self.bd_schedule_times = self.parse_schedule_times(schedule_times_str)
         self.system_schedule_times = self.convert_bd_to_system_time(self.bd_schedule_times)
         
+        # Weekly (Mondays) / monthly (1st) digests, checked daily at DIGEST_TIME Bangladesh time
+        self.digest_kinds = [kind.strip() for kind in os.getenv('DIGESTS', 'weekly,monthly').split(',')
+                             if kind.strip() in DIGEST_KINDS]
+        self.digest_time = self.normalize_time_format(os.getenv('DIGEST_TIME', '09:00')) or '09:00'
+        
+        # POLLING_MODE=adaptive replaces the fixed SCHEDULE_TIMES with per-meter check intervals
+        self.adaptive = None
+        if os.getenv('POLLING_MODE', 'fixed').lower() == 'adaptive':
+            self.adaptive = AdaptiveScheduler(self.history)
+        self.adaptive_tick_minutes = int(os.getenv('ADAPTIVE_TICK_MINUTES', '15'))
+        
+        # Riskiest meters first, within RUN_TIME_BUDGET_SECONDS; the rest run again after RUN_FOLLOWUP_DELAY_SECONDS
+        self.planner = RunPlanner(self.history)
+        self.followup_delay = int(os.getenv('RUN_FOLLOWUP_DELAY_SECONDS', '300'))
+        self.deferred_accounts = []
+        
     def parse_schedule_times(self, times_str):
         """Parse schedule times from string like '1:07,8:00' or '12:20'"""
         try:
@@ -163,38 +211,187 @@ class ScheduledMeterScraper:
         except ValueError:
             return False
         
-    def run_daily_scraping(self):
+    def get_next_run_bd(self):
+        """Return the next scheduled run as a Bangladesh-time datetime, or None"""
+        # Digest checks aren't scraping runs
+        run_times = [job.next_run for job in schedule.jobs if 'digest' not in job.tags]
+        next_run = min(run_times) if run_times else None
+        if not next_run:
+            return None
         try:
-            logging.info("Starting multi-meter scraping for all 5 meters...")
+            return pytz.UTC.localize(next_run).astimezone(self.bd_timezone)
+        except Exception:
+            return None
+        
+    def schedule_breaker_retry(self, accounts):
+        """Re-run the meters skipped by an open circuit breaker once its cooldown expires"""
+        breaker = get_circuit_breaker(self.website_url)
+        if schedule.get_jobs('breaker-retry'):
+            return
+        delay = max(int(breaker.retry_in()), 1)
+        
+        def retry():
+            logging.info(f"Circuit breaker cooldown over, retrying {len(accounts)} skipped meters")
+            self.run_daily_scraping(accounts=accounts)
+            return schedule.CancelJob
+        
+        schedule.every(delay).seconds.do(retry).tag('breaker-retry')
+        logging.warning(f"Portal circuit breaker open - retrying {len(accounts)} skipped meters in {delay}s")
+        
+    def schedule_deferred_run(self, accounts):
+        """Run the meters a run had no time left for once RUN_FOLLOWUP_DELAY_SECONDS have passed"""
+        # Merge with any follow-up that hasn't run yet
+        self.deferred_accounts = list(dict.fromkeys(self.deferred_accounts + list(accounts)))
+        schedule.clear('deferred-run')
+        
+        def follow_up():
+            accounts, self.deferred_accounts = self.deferred_accounts, []
+            logging.info(f"Follow-up run for {len(accounts)} deferred meters")
+            self.run_daily_scraping(accounts=accounts)
+            return schedule.CancelJob
+        
+        schedule.every(max(self.followup_delay, 1)).seconds.do(follow_up).tag('deferred-run')
+        logging.warning(f"Run time budget used up - {len(self.deferred_accounts)} meters deferred to a follow-up run "
+                        f"in {self.followup_delay}s: {', '.join(self.deferred_accounts)}")
+        
+    def sync_recharge_history(self, accounts):
+        """Pull recharges and monthly consumption newer than what is stored; never fails the run"""
+        try:
+            sync = RechargeHistorySync(self.history, meter_nicknames=self.scraper.meter_nicknames)
+            results = sync.sync_all(accounts)
+            new_recharges = sum(result.get('recharges', 0) for result in results.values())
+            logging.info(f"Recharge history sync: {new_recharges} new recharges for {len(results)} meters")
+        except Exception as e:
+            logging.error(f"Recharge history sync failed: {e}")
+        
+    def report_anomalies(self):
+        """Check every meter's stored series once and post anything new; never fails the run"""
+        try:
+            anomalies = AnomalyDetector(self.history).run()
+            if anomalies:
+                logging.warning(f"Found {len(anomalies)} new anomalies: {[a.to_dict() for a in anomalies]}")
+                self.telegram_bot.send_anomaly_alerts(anomalies, self.scraper.meter_nicknames)
+        except Exception as e:
+            logging.error(f"Anomaly detection failed: {e}")
+        
+    def run_digests(self, today=None):
+        """Send whichever enabled digests are due today (Bangladesh date)"""
+        today = today or datetime.now(self.bd_timezone).date()
+        reporter = DigestReporter(self.history, self.telegram_bot, self.scraper.meter_nicknames)
+        for kind in reporter.due_digests(today):
+            if kind not in self.digest_kinds:
+                continue
+            try:
+                if reporter.send(kind, today):
+                    logging.info(f"Sent {kind} digest to Telegram")
+                else:
+                    logging.error(f"Failed to send {kind} digest to Telegram")
+            except Exception as e:
+                logging.error(f"Error building {kind} digest: {e}")
+        
+    def run_adaptive_check(self, now=None):
+        """Scrape only the meters whose adaptive next check has come"""
+        now = now or datetime.now()
+        due = self.adaptive.due(self.scraper.all_meters, now)
+        outlooks, minutes = self.adaptive.plan(self.scraper.all_meters, now)
+        self.status.set_adaptive_budget(self.adaptive.budget_minutes, minutes, self.adaptive.over_budget)
+        if minutes > self.adaptive.budget_minutes:
+            logging.warning(f"Adaptive polling needs ~{minutes:.0f} browser-min/day even at {self.adaptive.max_hours:.0f}h "
+                            f"intervals (budget {self.adaptive.budget_minutes:.0f}); checks beyond the budget wait for the next day")
+        if not due:
+            return []
+        intervals = ", ".join(f"{o.account_number} every {o.interval_hours:.1f}h" for o in outlooks)
+        logging.info(f"Adaptive polling: {len(due)} meters due ({intervals}; ~{minutes:.0f} browser-min/day)")
+        self.run_daily_scraping(accounts=due)
+        # Deferred meters stay due, so the next tick picks them up
+        self.adaptive.mark_checked([account for account in due if account not in self.scraper.deferred_meters], now)
+        return due
+        
+    def run_daily_scraping(self, accounts=None):
+        # Picks up an interrupted run (process crash/restart) where it left off;
+        # a new run scrapes the meters with the lowest predicted balance first
+        run_state = RunState.load_or_create(self.planner.order(accounts or self.scraper.all_meters))
+        accounts = run_state.accounts
+        self.status.run_started(len(accounts))
+        try:
+            if run_state.resumed:
+                logging.info(f"Resuming run {run_state.run_id}: {len(run_state.pending_accounts())} meters left to scrape")
+            logging.info(f"Starting multi-meter scraping for {len(accounts)} meters...")
             
             # Run the scraper for all meters
-            low_balance_warnings, recently_recharged, all_data = self.scraper.scrape_all_meters(self.website_url)
+            low_balance_warnings, recently_recharged, all_data = self.scraper.scrape_all_meters(
+                self.website_url, progress_callback=self.status.record_meter_result,
+                accounts=accounts, run_state=run_state, deadline=self.planner.deadline()
+            )
+            # Every meter was attempted; failures are retried on the next schedule
+            run_state.finish()
+            # Reloaded from disk, since an isolated worker updates the cache file
+            logging.info(f"Login selector cache stats: {SelectorCache().stats()}")
+            
+            breaker = get_circuit_breaker(self.website_url)
+            self.status.set_circuit_breaker(breaker.to_dict())
+            if self.scraper.skipped_meters:
+                self.schedule_breaker_retry(list(self.scraper.skipped_meters))
+            self.status.set_deferred(self.scraper.deferred_meters)
+            if self.scraper.deferred_meters and not self.adaptive:
+                self.schedule_deferred_run(self.scraper.deferred_meters)
             
             if all_data:
                 logging.info(f"Scraping completed successfully for {len(all_data)} meters")
                 
+                try:
+                    stored = self.history.record_readings(all_data)
+                    logging.info(f"Stored {stored} readings in history")
+                except Exception as e:
+                    logging.error(f"Failed to store readings in history: {e}")
+                
+                if self.sync_portal_history:
+                    self.sync_recharge_history([reading.account_number for reading in all_data])
+                
+                self.report_anomalies()
+                
+                # Only meters whose alert state changed (or are due a reminder) are reported
+                low_balance_warnings, recently_recharged = self.alert_state.filter_notifications(
+                    all_data, low_balance_warnings, recently_recharged
+                )
+                
                 # Send message if there are low balance warnings OR recently recharged meters
                 if low_balance_warnings or recently_recharged:
                     logging.info(f"Found {len(low_balance_warnings)} meters with low balance and {len(recently_recharged)} recently recharged")
                     telegram_success = self.telegram_bot.send_meter_status_update(low_balance_warnings, recently_recharged)
+                    # Only a delivered alert counts as sent; a failed one goes out again next run
+                    self.alert_state.mark_notified(
+                        [warning.account_number for warning in low_balance_warnings]
+                        + [event.account_number for event in recently_recharged],
+                        sent=telegram_success
+                    )
                     
                     if telegram_success:
                         logging.info("Meter status update sent to Telegram successfully")
                     else:
                         logging.error("Failed to send status update to Telegram")
                 else:
-                    logging.info("All meters have sufficient balance (>= 100 BDT). No notifications sent.")
+                    logging.info("No meter changed alert state (or is due a reminder). No notifications sent.")
+                
+                run_result = 'success' if len(all_data) == len(accounts) else 'partial'
+                self.status.run_finished(run_result)
                 
             else:
                 logging.error("Scraping failed for all meters")
+                self.status.run_finished('failed', "Scraping failed for all meters")
                 # Send error notification to Telegram
                 error_msg = f"❌ Electricity meter scraping failed for all meters at {datetime.now().strftime('%d %B %Y, %I:%M %p')}"
+                if breaker.state != breaker.CLOSED:
+                    error_msg += f"\n🔌 Portal unreachable, retrying in {int(breaker.retry_in() / 60)} min"
                 self.telegram_bot.send_message(error_msg)
                 
         except Exception as e:
             logging.error(f"Error in daily scraping: {str(e)}")
+            self.status.run_finished('error', str(e))
             error_msg = f"❌ Scraper error: {str(e)}\nTime: {datetime.now().strftime('%d %B %Y, %I:%M %p')}"
             self.telegram_bot.send_message(error_msg)
+        finally:
+            self.status.set_next_run(self.get_next_run_bd())
     
     def start_scheduler(self):
         # Comprehensive validation and debug logging
@@ -210,13 +407,21 @@ class ScheduledMeterScraper:
         
         # Schedule the scraping using SYSTEM times (converted from BD times)
         scheduled_jobs = []
-        for i, system_time_str in enumerate(self.system_schedule_times):
+        if self.adaptive:
+            schedule.every(self.adaptive_tick_minutes).minutes.do(self.run_adaptive_check).tag('adaptive')
+            logging.info(f"✅ Adaptive polling: checking which meters are due every {self.adaptive_tick_minutes} min")
+        for i, system_time_str in enumerate([] if self.adaptive else self.system_schedule_times):
             bd_time_str = self.bd_schedule_times[i]
             job = schedule.every().day.at(system_time_str).do(self.run_daily_scraping)
             scheduled_jobs.append(job)
             logging.info(f"✅ Scheduled BD time {bd_time_str} as system time {system_time_str}")
             logging.info(f"   Job details: {job}")
         
+        if self.digest_kinds:
+            digest_system_time = self.convert_bd_to_system_time([self.digest_time])[0]
+            schedule.every().day.at(digest_system_time).do(self.run_digests).tag('digest')
+            logging.info(f"✅ Scheduled {', '.join(self.digest_kinds)} digest check at BD {self.digest_time}")
+        
         # Validate that jobs were scheduled correctly
         all_jobs = schedule.jobs
         logging.info(f"Total scheduled jobs: {len(all_jobs)}")
@@ -249,13 +454,19 @@ class ScheduledMeterScraper:
             else:
                 logging.info(f"⏰ Next run in: {time_until_next}")
         
+        self.status.mark_scheduler_started(len(all_jobs))
+        self.status.set_next_run(next_run_bd if next_run else None)
+        
         bd_times_display = ", ".join(self.bd_schedule_times)
         logging.info(f"Scheduler started. Will run daily at: {bd_times_display} (Bangladesh time)")
         logging.info("=== END SCHEDULER DEBUG ===")
         
         # Send startup notification showing Bangladesh times (user-friendly)
         startup_msg = f"🤖 Electricity meter bot started!\n"
-        startup_msg += f"📅 Scheduled to run daily at: {bd_times_display} (Bangladesh time)\n"
+        if self.adaptive:
+            startup_msg += f"📅 Adaptive polling: low meters hourly, healthy ones up to every {self.adaptive.max_hours:.0f}h\n"
+        else:
+            startup_msg += f"📅 Scheduled to run daily at: {bd_times_display} (Bangladesh time)\n"
         if next_run_bd:
             startup_msg += f"⏰ Next run: {next_run_bd.strftime('%Y-%m-%d %I:%M %p')} BD\n"
         else:
@@ -268,6 +479,13 @@ class ScheduledMeterScraper:
         else:
             logging.error("❌ Failed to send startup notification to Telegram")
         
+        # Finish a run that was interrupted by a crash or restart
+        interrupted_run = RunState.load()
+        if interrupted_run and interrupted_run.pending_accounts():
+            logging.info("Found an interrupted run, resuming remaining meters now")
+            # Same meter list, so it is resumed (unless it is older than RUN_RESUME_MAX_AGE_SECONDS)
+            self.run_daily_scraping(accounts=interrupted_run.accounts)
+        
         # Keep the script running
         while True:
             # Check for pending jobs
@@ -276,6 +494,7 @@ class ScheduledMeterScraper:
                 logging.info(f"Found {len(pending_jobs)} pending jobs, executing...")
             
             schedule.run_pending()
+            self.status.set_next_run(self.get_next_run_bd())
             
             # Log next run time every 10 minutes
             current_time = datetime.now()
@@ -0,0 +1,268 @@
+import ctypes
+import multiprocessing
+import os
+import signal
+import time
+
+from circuit_breaker import get_circuit_breaker
+from run_state import RunState
+from scraper import ElectricityMeterScraper
+
+PR_SET_CHILD_SUBREAPER = 36
+
+
+def _worker_main(conn, website_url, accounts, run_state_path, breaker_state, deadline=None):
+    """Child process: scrape one batch and stream each meter's result back over the pipe"""
+    # Own process group, so the supervisor can kill chromedriver and Chrome along with us
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    breaker = get_circuit_breaker(website_url)
+    try:
+        if breaker_state:
+            breaker.restore_state(breaker_state)
+        run_state = RunState.load(run_state_path) if run_state_path else None
+        scraper = ElectricityMeterScraper()
+        scraper.scrape_all_meters(
+            website_url,
+            progress_callback=lambda account, data: conn.send(('meter', account, data)),
+            accounts=accounts,
+            run_state=run_state,
+            deadline=deadline,
+        )
+        conn.send(('done', scraper.skipped_meters, breaker.export_state(), scraper.deferred_meters))
+    except Exception as e:
+        conn.send(('error', str(e), breaker.export_state()))
+    finally:
+        conn.close()
+
+
+def _process_tree(root_pid):
+    """Return root_pid and all its descendants, read from /proc (empty off Linux)"""
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+            # The command name may contain spaces, so split after its closing paren
+            ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree = [root_pid]
+    for pid in tree:
+        tree.extend(children.get(pid, []))
+    return tree
+
+
+def _parent_pid(pid):
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            return int(f.read().rsplit(')', 1)[1].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _rss_mb(pids):
+    page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+    total_pages = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm', 'r') as f:
+                total_pages += int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return total_pages * page_size / (1024 * 1024)
+
+
+def process_tree_rss_mb(root_pid):
+    """Resident memory of a process and all its descendants, in MB"""
+    return _rss_mb(_process_tree(root_pid))
+
+
+def become_child_subreaper():
+    """Have orphaned Chrome processes reparented to us (instead of PID 1) so we can reap them"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0) == 0
+    except Exception:
+        return False
+
+
+def reap_orphans(pids, timeout=1.0):
+    """Collect exit statuses of the given orphans (reparented to us as subreaper) so they don't linger as zombies.
+
+    Only pids the supervisor recorded from a worker's process tree are waited
+    for - never waitpid(-1), which would also steal the exit status of
+    children owned by other code in this process (subprocess, multiprocessing).
+    """
+    pending = set(pids)
+    reaped = 0
+    give_up = time.monotonic() + timeout
+    while pending:
+        for pid in list(pending):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                pending.discard(pid)
+                continue
+            if done:
+                pending.discard(pid)
+                reaped += 1
+        if not pending or time.monotonic() > give_up:
+            break
+        time.sleep(0.05)
+    return reaped
+
+
+class IsolatedScraper:
+    """Runs each scrape batch in a supervised worker process.
+
+    Drop-in replacement for ElectricityMeterScraper.scrape_all_meters: the
+    worker does the Selenium work and streams results back over a pipe, while
+    the supervisor enforces a wall-clock timeout and an RSS ceiling on the
+    worker's whole process tree, and always kills that tree when the batch
+    ends. Chrome leaks therefore die with the worker instead of accumulating
+    in the long-lived scheduler process.
+    """
+
+    def __init__(self, worker_target=None):
+        # Function run in the child process; overridable for tests
+        self.worker_target = worker_target or _worker_main
+        # Used in-process only for configuration and result classification - never launches Chrome
+        self.inline = ElectricityMeterScraper()
+        self.all_meters = self.inline.all_meters
+        self.meter_nicknames = self.inline.meter_nicknames
+        self.skipped_meters = []
+        self.deferred_meters = []
+
+        self.max_rss_mb = float(os.getenv('WORKER_MAX_RSS_MB', '1024'))
+        self.timeout = float(os.getenv('WORKER_TIMEOUT_SECONDS', '1500'))
+        self.max_restarts = int(os.getenv('WORKER_MAX_RESTARTS', '1'))
+        self.poll_interval = 2
+        self.kill_grace_seconds = 5
+        # spawn keeps the worker free of the scheduler's threads, sockets and sqlite handles
+        self.context = multiprocessing.get_context('spawn')
+        self.subreaper = become_child_subreaper()
+
+    def scrape_all_meters(self, website_url, progress_callback=None, accounts=None, run_state=None, deadline=None):
+        accounts = list(accounts or self.all_meters)
+        results = {}
+        self.skipped_meters = []
+        self.deferred_meters = []
+
+        for attempt in range(self.max_restarts + 1):
+            remaining = [account for account in accounts
+                         if account not in results and account not in self.deferred_meters]
+            if not remaining:
+                break
+            if attempt > 0:
+                print(f"Restarting scrape worker for {len(remaining)} meters without a result")
+            if self._run_worker(website_url, remaining, results, progress_callback, run_state, deadline):
+                break
+
+        low_balance_warnings = []
+        recently_recharged = []
+        all_data = []
+        for account_number in accounts:
+            if account_number in self.deferred_meters:
+                continue
+            if account_number in results:
+                self.inline.classify_meter_data(
+                    account_number, results[account_number], low_balance_warnings, recently_recharged, all_data
+                )
+            else:
+                print(f"FAILED: Scrape worker never reported account {account_number}")
+        return low_balance_warnings, recently_recharged, all_data
+
+    def _run_worker(self, website_url, accounts, results, progress_callback, run_state, deadline=None):
+        """Run one worker to completion or until killed. Returns True if it finished the batch."""
+        breaker = get_circuit_breaker(website_url)
+        parent_conn, child_conn = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=self.worker_target,
+            args=(child_conn, website_url, accounts, run_state.path if run_state else None,
+                  breaker.export_state(), deadline),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        print(f"Started scrape worker pid {process.pid} for {len(accounts)} meters")
+
+        # Wall-clock limit on this worker (deadline is the run's budget, enforced inside the worker)
+        kill_at = time.monotonic() + self.timeout
+        # Every pid seen in the worker's tree, so orphans left behind can be killed and reaped
+        tracked = set()
+        finished = False
+        try:
+            while True:
+                if parent_conn.poll(self.poll_interval):
+                    try:
+                        message = parent_conn.recv()
+                    except EOFError:
+                        print(f"Scrape worker {process.pid} exited without finishing (exit code {process.exitcode})")
+                        break
+                    kind = message[0]
+                    if kind == 'meter':
+                        _, account_number, data = message
+                        results[account_number] = data
+                        if progress_callback:
+                            progress_callback(account_number, data)
+                    else:
+                        breaker.restore_state(message[2])
+                        if kind == 'done':
+                            self.skipped_meters.extend(message[1])
+                            self.deferred_meters.extend(message[3] if len(message) > 3 else [])
+                            finished = True
+                        else:
+                            print(f"Scrape worker {process.pid} failed: {message[1]}")
+                        break
+
+                if time.monotonic() > kill_at:
+                    print(f"Scrape worker {process.pid} exceeded {self.timeout:.0f}s timeout, killing it")
+                    break
+                tree = _process_tree(process.pid)
+                tracked.update(tree)
+                rss_mb = _rss_mb(tree)
+                if rss_mb > self.max_rss_mb:
+                    print(f"Scrape worker {process.pid} tree uses {rss_mb:.0f} MB (> {self.max_rss_mb:.0f} MB), killing it")
+                    break
+        finally:
+            parent_conn.close()
+            self._shutdown(process, graceful=finished, tracked=tracked)
+        return finished
+
+    def _shutdown(self, process, graceful, tracked=None):
+        """Stop the worker and everything it started (chromedriver, Chrome and its helpers)"""
+        tracked = set(tracked or ())
+        if graceful:
+            process.join(self.kill_grace_seconds)
+        # Once the worker has been reaped its pid may be reused, so only walk a live tree
+        tree = _process_tree(process.pid) if process.exitcode is None else []
+        tracked.update(tree)
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, AttributeError):
+            pass
+        for pid in tree:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        process.join(self.kill_grace_seconds)
+        if self.subreaper:
+            # Descendants orphaned before the kill were reparented to us; a tracked pid whose
+            # parent is now this process can only be one of them
+            orphans = [pid for pid in tracked - {process.pid} if _parent_pid(pid) == os.getpid()]
+            for pid in orphans:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+            reap_orphans(orphans)
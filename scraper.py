@@ -1,32 +1,41 @@
 from selenium import webdriver
+from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
 import json
 import os
+import re
+import shutil
 from datetime import datetime
+from urllib.parse import urlparse
+from circuit_breaker import get_circuit_breaker
+from selector_cache import get_selector_cache
+from session_cache import get_session_cache
+from meter_policy import get_policy_table
+from network_capture import BALANCE, RECHARGE, NetworkCapture, enable_performance_log, network_capture_enabled, reading_from_payloads
+from extraction import extract_fields
+from html_extraction import HttpElement, HttpPageParser, page_texts
+from snapshot_archive import get_snapshot_archive, snapshot_archive_enabled
+from models import METER_NICKNAMES, MeterReading, RechargeEvent, BalanceWarning, parse_amount, parse_datetime
 
-class ElectricityMeterScraper:
-    def __init__(self):
-        # Get account number from environment variable for security
-        self.account_number = os.getenv('ACCOUNT_NUMBER', '37226784')
-        self.driver = None
-        
-        # List of all meter numbers
-        self.all_meters = ['37226784', '37202772', '37195501', '37226785', '37202771']
-        
-        # Meter nicknames mapping
-        self.meter_nicknames = {
-            '37226784': 'Ayon',
-            '37202772': 'Arif', 
-            '37195501': 'Payel',
-            '37226785': 'Piyal',
-            '37202771': 'Solo'
-        }
-        
-    def setup_driver(self):
+
+class BrowserEngine:
+    """Creates the WebDriver-compatible driver used by ElectricityMeterScraper"""
+    name = None
+    # Engines without JavaScript can't drive the SPA login form
+    supports_javascript = True
+    
+    def create_driver(self):
+        raise NotImplementedError
+
+
+class ChromeEngine(BrowserEngine):
+    """Full Chromium via the system chromedriver (installed by replit.nix)"""
+    name = 'chrome'
+    
+    def build_options(self):
         options = webdriver.ChromeOptions()
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
@@ -45,11 +54,177 @@ class ElectricityMeterScraper:
         options.add_argument("--ignore-ssl-errors-spki-list")
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
-        
+        if network_capture_enabled():
+            enable_performance_log(options)
+        return options
+    
+    def create_driver(self):
         # Cloud deployment (Replit) - use system chromedriver
-        self.driver = webdriver.Chrome(options=options)
+        driver = webdriver.Chrome(options=self.build_options())
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return driver
+
+
+class ChromeHeadlessShellEngine(ChromeEngine):
+    """chrome-headless-shell: the old headless mode as a standalone, much smaller binary"""
+    name = 'chrome-headless-shell'
+    
+    def build_options(self):
+        options = super().build_options()
+        binary = os.getenv('CHROME_HEADLESS_SHELL_PATH') or shutil.which('chrome-headless-shell')
+        if not binary:
+            raise Exception("chrome-headless-shell not found; set CHROME_HEADLESS_SHELL_PATH")
+        options.binary_location = binary
+        return options
+
+
+class FirefoxEngine(BrowserEngine):
+    """Headless Firefox via geckodriver (listed in .replit)"""
+    name = 'firefox'
+    
+    def create_driver(self):
+        options = webdriver.FirefoxOptions()
+        options.add_argument("-headless")
+        options.add_argument("--width=1920")
+        options.add_argument("--height=1080")
+        options.accept_insecure_certs = True
+        # Skip images, like --disable-images for Chrome
+        options.set_preference("permissions.default.image", 2)
+        options.set_preference("dom.webdriver.enabled", False)
+        return webdriver.Firefox(options=options)
+
+
+class HttpEngine(BrowserEngine):
+    """Plain HTTP fetch + HTML parsing, for pages that render without JavaScript"""
+    name = 'http'
+    supports_javascript = False
+    
+    def create_driver(self):
+        return HttpDriver()
+
+
+class HttpDriver:
+    """Minimal WebDriver stand-in backed by requests, for HttpEngine"""
+    
+    def __init__(self):
+        import requests
+        import urllib3
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (X11; Linux x86_64) electricity-meter-bot'
+        # The portal's certificate chain is broken, same as the Chrome SSL bypass flags
+        self.session.verify = False
+        self.timeout = 60
+        self.page_source = ''
+        self.current_url = None
+        self.title = ''
+        self.root = HttpElement('#document', {})
+    
+    def set_page_load_timeout(self, seconds):
+        self.timeout = seconds
+    
+    def get(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        self.load_html(response.text, response.url)
+    
+    def load_html(self, html, url=None):
+        """Parse an HTML document as if it had just been navigated to"""
+        self.current_url = url
+        self.page_source = html
+        parser = HttpPageParser()
+        parser.feed(html)
+        parser.close()
+        self.root = parser.root
+        self.title = parser.title.strip()
+    
+    def find_elements(self, by, value):
+        if by == By.XPATH and value == "//*[text()]":
+            return [e for e in self.root.iter() if e.has_own_text and e is not self.root]
+        if by in (By.TAG_NAME, By.CSS_SELECTOR) and re.fullmatch(r'[a-zA-Z][a-zA-Z0-9]*', value):
+            return [e for e in self.root.iter() if e.tag_name == value.lower()]
+        # Anything richer needs a real browser
+        return []
+    
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
+    
+    def execute_script(self, script, *args):
+        return None
+    
+    def quit(self):
+        self.session.close()
+
+
+BROWSER_ENGINES = {
+    engine.name: engine
+    for engine in (ChromeEngine, ChromeHeadlessShellEngine, FirefoxEngine, HttpEngine)
+}
+
+def get_browser_engine(name=None):
+    """Return the engine selected by name or the BROWSER_ENGINE env var (default chrome)"""
+    name = (name or os.getenv('BROWSER_ENGINE', 'chrome')).strip().lower()
+    if name not in BROWSER_ENGINES:
+        print(f"Unknown BROWSER_ENGINE '{name}', using chrome. Options: {', '.join(BROWSER_ENGINES)}")
+        name = 'chrome'
+    return BROWSER_ENGINES[name]()
+
+class ElectricityMeterScraper:
+    def __init__(self):
+        # Get account number from environment variable for security
+        self.account_number = os.getenv('ACCOUNT_NUMBER', '37226784')
+        self.driver = None
+        
+        # Meters skipped by the last scrape_all_meters because the portal breaker was open
+        self.skipped_meters = []
+        # Meters the last scrape_all_meters didn't reach before its deadline
+        self.deferred_meters = []
         
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        # Per-meter retries: extra attempts after a failed scrape, with exponential backoff
+        self.max_retries = int(os.getenv('SCRAPE_MAX_RETRIES', '2'))
+        self.retry_base_delay = float(os.getenv('SCRAPE_RETRY_DELAY', '10'))
+        
+        # Wait for a remembered login selector before falling back to full discovery
+        self.cached_selector_timeout = float(os.getenv('CACHED_SELECTOR_TIMEOUT', '1'))
+        
+        # Restore the last login's cookies/localStorage instead of logging in again
+        self.reuse_sessions = os.getenv('SESSION_REUSE', 'true').lower() == 'true'
+        self.session_validate_timeout = float(os.getenv('SESSION_VALIDATE_TIMEOUT', '8'))
+        
+        # Read the dashboard's XHR JSON from Chrome's network log instead of the rendered text
+        self.capture_xhr = network_capture_enabled()
+        self.network_capture = None
+        
+        # How extract_data reads the page: per-element WebDriver calls, or one page_source parsed locally
+        self.extraction_engine = os.getenv('EXTRACTION_ENGINE', 'webdriver').strip().lower()
+        
+        # Keep a compressed copy of every dashboard read, for debugging and re-extraction
+        self.archive_snapshots = snapshot_archive_enabled()
+        # Run the current scrape belongs to (indexes archived snapshots)
+        self.run_id = None
+        
+        # Per-meter warning / critical / recharge thresholds (METER_POLICIES)
+        self.policies = get_policy_table()
+        
+        # Browser engine used by setup_driver (chrome, chrome-headless-shell, firefox, http)
+        self.engine = get_browser_engine()
+        
+        # List of all meter numbers
+        self.all_meters = list(METER_NICKNAMES)
+        
+        # Meter nicknames mapping
+        self.meter_nicknames = dict(METER_NICKNAMES)
+        
+    def setup_driver(self):
+        self.driver = self.engine.create_driver()
+        # Don't hang for the default 300s when the portal is down
+        self.driver.set_page_load_timeout(int(os.getenv('PAGE_LOAD_TIMEOUT', '60')))
+        self.network_capture = None
+        if self.capture_xhr and hasattr(self.driver, 'get_log'):
+            self.network_capture = NetworkCapture(self.driver, self.account_number)
         return True
     
     def debug_page_structure(self):
@@ -86,7 +261,20 @@ class ElectricityMeterScraper:
         except Exception as e:
             print(f"Debug failed: {str(e)}")
         
+    def find_login_button(self, selector):
+        """Return the first element matching selector whose text looks like a login button"""
+        try:
+            for btn in self.driver.find_elements(By.CSS_SELECTOR, selector):
+                if any(text in btn.text.lower() for text in ['login', 'submit', 'enter']):
+                    return btn
+        except:
+            pass
+        return None
+        
     def login(self, website_url):
+        if not self.engine.supports_javascript:
+            return self.open_static_dashboard(website_url)
+        
         try:
             print("Navigating to website...")
             self.driver.get(website_url)
@@ -95,9 +283,25 @@ class ElectricityMeterScraper:
             # Debug page structure
             self.debug_page_structure()
             
+            site = urlparse(website_url).hostname or website_url
+            selector_cache = get_selector_cache()
+            
             print("Looking for account input field...")
             account_input = None
             
+            # Try the selector that worked last time first, with a short timeout
+            cached_selector = selector_cache.get(site, 'account_input')
+            if cached_selector:
+                try:
+                    account_input = WebDriverWait(self.driver, self.cached_selector_timeout).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, cached_selector))
+                    )
+                    selector_cache.record_hit(site, 'account_input')
+                    print(f"Found input field with cached selector: {cached_selector}")
+                except:
+                    selector_cache.record_miss(site, 'account_input')
+                    print(f"Cached selector {cached_selector} missed, running full discovery")
+            
             # Try multiple selectors for the account input
             selectors = [
                 "input[placeholder*='Account']",
@@ -107,15 +311,18 @@ class ElectricityMeterScraper:
                 "input.form-control"
             ]
             
-            for selector in selectors:
-                try:
-                    account_input = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    print(f"Found input field with selector: {selector}")
-                    break
-                except:
-                    continue
+            if not account_input:
+                # The cached selector already had its chance; don't wait on it a second time
+                for selector in [selector for selector in selectors if selector != cached_selector]:
+                    try:
+                        account_input = WebDriverWait(self.driver, 5).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+                        )
+                        print(f"Found input field with selector: {selector}")
+                        selector_cache.remember(site, 'account_input', selector)
+                        break
+                    except:
+                        continue
             
             if not account_input:
                 print("Trying to find any input field...")
@@ -123,6 +330,7 @@ class ElectricityMeterScraper:
                 if inputs:
                     account_input = inputs[0]
                     print(f"Using first input field found")
+                    selector_cache.remember(site, 'account_input', "input")
                 else:
                     raise Exception("No input field found on the page")
             
@@ -143,18 +351,22 @@ class ElectricityMeterScraper:
                 "input[type='submit']"
             ]
             
-            for selector in button_selectors:
-                try:
-                    buttons = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for btn in buttons:
-                        if any(text in btn.text.lower() for text in ['login', 'submit', 'enter']):
-                            login_button = btn
-                            print(f"Found login button with text: {btn.text}")
-                            break
+            cached_button_selector = selector_cache.get(site, 'login_button')
+            if cached_button_selector:
+                login_button = self.find_login_button(cached_button_selector)
+                if login_button:
+                    selector_cache.record_hit(site, 'login_button')
+                    print(f"Found login button with cached selector: {cached_button_selector}")
+                else:
+                    selector_cache.record_miss(site, 'login_button')
+            
+            if not login_button:
+                for selector in [selector for selector in button_selectors if selector != cached_button_selector]:
+                    login_button = self.find_login_button(selector)
                     if login_button:
+                        print(f"Found login button with text: {login_button.text}")
+                        selector_cache.remember(site, 'login_button', selector)
                         break
-                except:
-                    continue
             
             if not login_button:
                 print("Trying to find any button...")
@@ -178,6 +390,73 @@ class ElectricityMeterScraper:
             print("Current URL:", self.driver.current_url)
             return False
     
+    def session_is_valid(self, driver):
+        """Cheap logged-in check: not bounced to the login route and the dashboard shows a balance"""
+        if 'login' in driver.current_url.lower():
+            return False
+        return bool(driver.find_elements(By.XPATH, "//*[contains(text(), 'Balance')]"))
+    
+    def restore_session(self, website_url):
+        """Reopen the dashboard with this account's saved session. Returns False to fall back to login()."""
+        if not self.reuse_sessions or not self.engine.supports_javascript:
+            return False
+        session_cache = get_session_cache()
+        session = session_cache.get(self.account_number)
+        if not session:
+            return False
+        
+        try:
+            print(f"Restoring saved session for {self.account_number}...")
+            # Cookies and storage can only be set on a page from the portal's origin
+            self.driver.get(website_url)
+            self.driver.delete_all_cookies()
+            for cookie in session['cookies']:
+                self.driver.add_cookie(cookie)
+            self.driver.execute_script(
+                "for (const [key, value] of Object.entries(arguments[0])) { window.localStorage.setItem(key, value); }",
+                session['local_storage']
+            )
+            self.driver.get(session['url'])
+            # The SPA only reads its stored auth on a real page load, not a hash change
+            self.driver.refresh()
+            WebDriverWait(self.driver, self.session_validate_timeout).until(self.session_is_valid)
+            session_cache.record(True)
+            print("Saved session is still valid, skipping login")
+            return True
+        except Exception as e:
+            print(f"Saved session rejected ({type(e).__name__}), logging in again")
+            session_cache.invalidate(self.account_number)
+            session_cache.record(False)
+            return False
+    
+    def save_session(self):
+        """Remember this browser's login for the next scrape of the same account"""
+        if not self.reuse_sessions or not self.engine.supports_javascript:
+            return
+        try:
+            if not self.session_is_valid(self.driver):
+                return
+            local_storage = self.driver.execute_script("return Object.assign({}, window.localStorage);")
+            get_session_cache().save(self.account_number, self.driver.get_cookies(), local_storage or {},
+                                     self.driver.current_url)
+        except Exception as e:
+            print(f"Could not save session for {self.account_number}: {str(e)}")
+    
+    def open_static_dashboard(self, website_url):
+        """Login for engines without JavaScript: fetch a server-rendered dashboard directly.
+
+        HTTP_ENGINE_URL may contain {account}, e.g. a proxy that renders the
+        dashboard for an account; it defaults to the website URL.
+        """
+        try:
+            url = os.getenv('HTTP_ENGINE_URL', website_url).replace('{account}', self.account_number)
+            print(f"Fetching static dashboard: {url}")
+            self.driver.get(url)
+            return True
+        except Exception as e:
+            print(f"Login failed: {str(e)}")
+            return False
+    
     def debug_logged_in_page(self):
         try:
             print("\n=== LOGGED-IN PAGE DEBUG ===")
@@ -218,26 +497,7 @@ class ElectricityMeterScraper:
     def extract_numeric_balance(self, balance_text):
         """Extract numeric balance value from balance text"""
         try:
-            if not balance_text or balance_text in ['Not found', 'Error']:
-                return None
-            
-            # Extract numbers from the balance text
-            import re
-            numbers = re.findall(r'[\d,]+\.?\d*', balance_text)
-            
-            for number in numbers:
-                try:
-                    # Clean and convert to float
-                    clean_number = number.replace(',', '')
-                    balance_value = float(clean_number)
-                    
-                    # Only consider reasonable balance values (between 0 and 10000)
-                    if 0 <= balance_value <= 10000:
-                        return balance_value
-                except:
-                    continue
-            
-            return None
+            return parse_amount(balance_text)
         except Exception as e:
             print(f"Error extracting numeric balance: {str(e)}")
             return None
@@ -246,10 +506,57 @@ class ElectricityMeterScraper:
         """Get the nickname for a meter account number"""
         return self.meter_nicknames.get(account_number, 'Unknown')
 
+    def extract_from_network(self):
+        """MeterReading from the captured balance/recharge XHRs, or None to fall back to the page text"""
+        try:
+            payloads = self.network_capture.wait()
+        except Exception as e:
+            print(f"Network capture failed: {str(e)}")
+            return None
+        if BALANCE not in payloads:
+            print("No balance response captured, falling back to page text")
+            return None
+        reading = reading_from_payloads(self.account_number, self.get_meter_nickname(self.account_number),
+                                        payloads[BALANCE], payloads.get(RECHARGE))
+        if reading:
+            print(f"Read {', '.join(sorted(payloads))} JSON from the network log")
+            self.archive_snapshot(xhr=payloads, html=False)
+        else:
+            print("Captured balance response had no balance, falling back to page text")
+        return reading
+
+    def archive_snapshot(self, texts=None, xhr=None, html=True):
+        """Store what this extraction read (page HTML, text elements, XHR JSON) in the snapshot archive
+
+        html is the page source already fetched, True to fetch it, or False to leave it out.
+        """
+        if not self.archive_snapshots:
+            return None
+        try:
+            snapshot = {"url": self.driver.current_url}
+            if isinstance(html, str):
+                snapshot["html"] = html
+            elif html:
+                snapshot["html"] = self.driver.page_source
+            if texts is not None:
+                snapshot["texts"] = texts
+            if xhr is not None:
+                snapshot["xhr"] = xhr
+            return get_snapshot_archive().put(self.account_number, snapshot, run_id=self.run_id)
+        except Exception as e:
+            print(f"Could not archive page snapshot: {str(e)}")
+            return None
+
     def extract_data(self):
+        if self.network_capture:
+            reading = self.extract_from_network()
+            if reading:
+                return reading
         try:
-            print("Waiting for page to load after login...")
-            time.sleep(5)
+            # Static pages are complete as soon as they are fetched
+            if self.engine.supports_javascript:
+                print("Waiting for page to load after login...")
+                time.sleep(5)
             
             # Debug the logged-in page structure
             self.debug_logged_in_page()
@@ -262,234 +569,117 @@ class ElectricityMeterScraper:
             }
             
             # Wait for any data elements to load
-            time.sleep(3)
-            
-            # Get all text elements on the page
-            all_elements = self.driver.find_elements(By.XPATH, "//*[text()]")
-            all_texts = []
+            if self.engine.supports_javascript:
+                time.sleep(3)
             
-            for element in all_elements:
-                try:
-                    text = element.text.strip()
-                    if text and len(text) > 0:
-                        all_texts.append(text)
-                except:
-                    continue
+            if self.extraction_engine == 'html':
+                # One WebDriver call for the whole page, then a local parse
+                html = self.driver.page_source
+                all_texts = page_texts(html)
+            else:
+                html = True
+                # Get all text elements on the page
+                all_elements = self.driver.find_elements(By.XPATH, "//*[text()]")
+                all_texts = []
+                
+                for element in all_elements:
+                    try:
+                        text = element.text.strip()
+                        if text and len(text) > 0:
+                            all_texts.append(text)
+                    except:
+                        continue
             
             print(f"Found {len(all_texts)} text elements")
+            self.archive_snapshot(texts=all_texts, html=html)
             
-            # Extract remaining balance (look for balance-related patterns)
-            try:
-                balance_found = False
-                for text in all_texts:
-                    # Look for current balance, remaining balance, etc.
-                    if ("balance" in text.lower() or "remaining" in text.lower()) and "BDT" in text:
-                        data["remaining_balance"] = text
-                        print(f"Found remaining balance: {text}")
-                        balance_found = True
-                        break
-                
-                if not balance_found:
-                    # Look for any BDT amount that might be the balance
-                    for text in all_texts:
-                        if "BDT" in text and any(char.isdigit() for char in text):
-                            # Skip if it looks like the recharge amount (3,000.00)
-                            if "3,000" not in text and "3000" not in text:
-                                data["remaining_balance"] = text
-                                print(f"Found potential balance: {text}")
-                                break
-                    else:
-                        data["remaining_balance"] = "Not found"
-                        print("Remaining balance not found")
-                
-                # Extract numeric balance for comparison
-                data["balance_numeric"] = self.extract_numeric_balance(data.get("remaining_balance"))
-            except Exception as e:
-                data["remaining_balance"] = "Error"
-                print(f"Error extracting balance: {str(e)}")
-            
-            # Extract reading time (look for dates that might be meter reading)
-            try:
-                reading_found = False
-                for text in all_texts:
-                    if ("reading" in text.lower() or "meter" in text.lower()) and any(month in text for month in ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']):
-                        data["reading_time"] = text
-                        print(f"Found reading time: {text}")
-                        reading_found = True
-                        break
-                
-                if not reading_found:
-                    # Look for any date that's not the recharge date (not July 10)
-                    for text in all_texts:
-                        if any(month in text for month in ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']) and ":" in text:
-                            if "10 Jul" not in text:  # Skip the recharge date
-                                data["reading_time"] = text
-                                print(f"Found potential reading time: {text}")
-                                break
-                    else:
-                        data["reading_time"] = "Not found"
-                        print("Reading time not found")
-            except Exception as e:
-                data["reading_time"] = "Error"
-                print(f"Error extracting reading time: {str(e)}")
-            
-            # Extract last recharge amount (look for any recharge amount)
-            try:
-                recharge_found = False
-                for text in all_texts:
-                    if ("recharge" in text.lower() or "last recharge" in text.lower()) and "BDT" in text:
-                        data["last_recharge_amount"] = text
-                        print(f"Found recharge amount: {text}")
-                        recharge_found = True
-                        break
-                
-                if not recharge_found:
-                    # Look for any BDT amount that might be a recharge (avoid balance amounts)
-                    for text in all_texts:
-                        if "BDT" in text and any(char.isdigit() for char in text):
-                            # Skip if it's clearly a balance (contains "balance" or "remaining")
-                            if "balance" not in text.lower() and "remaining" not in text.lower():
-                                # Look for larger amounts that are likely recharges
-                                numeric_amount = self.extract_numeric_balance(text)
-                                if numeric_amount and numeric_amount >= 500:  # Recharges are usually >= 500 BDT
-                                    data["last_recharge_amount"] = text
-                                    print(f"Found potential recharge amount: {text}")
-                                    recharge_found = True
-                                    break
-                
-                if not recharge_found:
-                    data["last_recharge_amount"] = "Not found"
-                    print("Recharge amount not found")
-            except Exception as e:
-                data["last_recharge_amount"] = "Error"
-                print(f"Error extracting recharge amount: {str(e)}")
-            
-            # Extract last recharge date (look for any recharge date)
-            try:
-                recharge_date_found = False
-                for text in all_texts:
-                    if ("recharge" in text.lower() or "last recharge" in text.lower()) and any(month in text for month in ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']):
-                        data["last_recharge_date"] = text
-                        print(f"Found recharge date: {text}")
-                        recharge_date_found = True
-                        break
-                
-                if not recharge_date_found:
-                    # Look for any recent date that's not the reading date
-                    current_date = datetime.now().strftime('%d %b')  # e.g., "17 Aug"
-                    for text in all_texts:
-                        if any(month in text for month in ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']) and ":" in text:
-                            # Skip if it's the balance reading time (usually has "00:00")
-                            if "00:00" not in text:
-                                data["last_recharge_date"] = text
-                                print(f"Found potential recharge date: {text}")
-                                recharge_date_found = True
-                                break
-                
-                if not recharge_date_found:
-                    data["last_recharge_date"] = "Not found"
-                    print("Recharge date not found")
-            except Exception as e:
-                data["last_recharge_date"] = "Error"
-                print(f"Error extracting recharge date: {str(e)}")
-            
-            return data
+            data.update(extract_fields(all_texts, log=print))
+            return MeterReading.from_dict(data)
             
         except Exception as e:
             print(f"Data extraction failed: {str(e)}")
-            return {
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "account_number": self.account_number,
-                "status": "error",
-                "remaining_balance": "Error",
-                "reading_time": "Error",
-                "last_recharge_amount": "Error",
-                "last_recharge_date": "Error",
-                "error_message": str(e)
-            }
+            return MeterReading(
+                account_number=self.account_number,
+                nickname=self.get_meter_nickname(self.account_number),
+                timestamp=datetime.now().replace(microsecond=0),
+                status="error",
+                balance_text="Error",
+                reading_time_text="Error",
+                recharge_amount_text="Error",
+                recharge_date_text="Error",
+                error_message=str(e)
+            )
 
     def parse_datetime_from_text(self, text):
         """Parse datetime from text like '17 Aug 2025 15:16' or 'Recharge time: 17 Aug 2025 15:16'"""
         try:
-            import re
-            from datetime import datetime
-            
-            # Extract date and time pattern (e.g., "17 Aug 2025 15:16")
-            pattern = r'(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{4})\s+(\d{1,2}):(\d{2})'
-            match = re.search(pattern, text)
-            
-            if match:
-                day, month_str, year, hour, minute = match.groups()
-                
-                # Convert month name to number
-                month_map = {
-                    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
-                    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
-                }
-                month = month_map.get(month_str)
-                
-                if month:
-                    return datetime(int(year), month, int(day), int(hour), int(minute))
-            
-            return None
+            return parse_datetime(text)
         except Exception as e:
             print(f"Error parsing datetime from '{text}': {str(e)}")
             return None
 
     def is_same_day_recharge_after_reading(self, balance_reading_text, recharge_date_text):
         """Check if recharge happened on same day as balance reading but after reading time"""
-        try:
-            balance_time = self.parse_datetime_from_text(balance_reading_text)
-            recharge_time = self.parse_datetime_from_text(recharge_date_text)
-            
-            if balance_time and recharge_time:
-                # Same day check
-                same_day = (balance_time.date() == recharge_time.date())
-                # Recharge after reading check
-                recharge_after = recharge_time > balance_time
-                
-                print(f"Balance time: {balance_time}, Recharge time: {recharge_time}")
-                print(f"Same day: {same_day}, Recharge after reading: {recharge_after}")
-                
-                return same_day and recharge_after
-            
-            return False
-        except Exception as e:
-            print(f"Error checking same-day recharge: {str(e)}")
-            return False
+        return self.is_same_day_recharge(
+            self.parse_datetime_from_text(balance_reading_text),
+            self.parse_datetime_from_text(recharge_date_text)
+        )
+
+    def is_same_day_recharge(self, balance_time, recharge_time):
+        """Same check on already-parsed datetimes"""
+        if balance_time and recharge_time:
+            # Same day check
+            same_day = (balance_time.date() == recharge_time.date())
+            # Recharge after reading check
+            recharge_after = recharge_time > balance_time
+            
+            print(f"Balance time: {balance_time}, Recharge time: {recharge_time}")
+            print(f"Same day: {same_day}, Recharge after reading: {recharge_after}")
+            
+            return same_day and recharge_after
+        
+        return False
 
     def apply_smart_recharge_logic(self, data):
-        """Apply smart logic to determine if meter should be considered recharged"""
+        """Apply smart logic to determine if meter should be considered recharged
+
+        Takes a MeterReading (returned updated) or, for older callers, the
+        scraper's dict format (updated in place and returned).
+        """
+        if isinstance(data, dict):
+            reading = self.apply_smart_recharge_logic(MeterReading.from_dict(data))
+            data['recharge_amount_numeric'] = reading.recharge_amount
+            data['recently_recharged'] = reading.recently_recharged
+            return data
+        
+        reading = data
         try:
-            balance_numeric = data.get('balance_numeric')
-            balance_reading = data.get('reading_time', '')
-            recharge_date = data.get('last_recharge_date', '')
-            recharge_amount_text = data.get('last_recharge_amount', '')
-            
-            # Extract recharge amount
-            recharge_amount = self.extract_numeric_balance(recharge_amount_text)
-            
-            data['recharge_amount_numeric'] = recharge_amount
-            data['recently_recharged'] = False
+            reading.recently_recharged = False
             
+            policy = self.policies.get(reading.account_number, reading.nickname)
             # Check if there's a same-day recharge after balance reading
-            if (balance_numeric is not None and balance_numeric < 100 and 
-                recharge_amount and recharge_amount >= 500):
+            if (reading.balance is not None and reading.balance < policy.warning_balance and 
+                reading.recharge_amount and reading.recharge_amount >= policy.recharge_minimum):
                 
-                if self.is_same_day_recharge_after_reading(balance_reading, recharge_date):
-                    data['recently_recharged'] = True
-                    print(f"RECHARGED: Meter {data['account_number']} ({data['nickname']}) recently recharged: {recharge_amount} BDT")
-                    return data
+                if self.is_same_day_recharge(reading.reading_at, reading.recharged_at):
+                    reading.recently_recharged = True
+                    print(f"RECHARGED: Meter {reading.account_number} ({reading.nickname}) recently recharged: {reading.recharge_amount} BDT")
+                    return reading
             
-            print(f"BALANCE CHECK: Meter {data['account_number']} ({data['nickname']}) balance: {balance_numeric} BDT")
-            return data
+            print(f"BALANCE CHECK: Meter {reading.account_number} ({reading.nickname}) balance: {reading.balance} BDT")
+            return reading
             
         except Exception as e:
             print(f"Error applying smart recharge logic: {str(e)}")
-            return data
+            return reading
     
     def scrape_account(self, account_number, website_url):
         """Scrape data for a specific account number"""
+        breaker = get_circuit_breaker(website_url)
+        if not breaker.allow_request():
+            print(f"SKIPPED: Portal circuit breaker open, not scraping {account_number}")
+            return None
+        
         try:
             print(f"\n=== Scraping Account: {account_number} ===")
             
@@ -501,13 +691,25 @@ class ElectricityMeterScraper:
                 self.account_number = original_account
                 return None
             
-            if not self.login(website_url):
+            restored = self.restore_session(website_url)
+            if not restored and not self.login(website_url):
+                breaker.record_failure(f"login failed for {account_number}")
                 self.account_number = original_account
+                if self.driver:
+                    self.driver.quit()
+                    self.driver = None
                 return None
+            breaker.record_success()
             
-            time.sleep(2)
+            # Captured XHRs are waited for directly, no need to let the page settle
+            if self.engine.supports_javascript and not self.network_capture:
+                time.sleep(2)
             data = self.extract_data()
             
+            # Only a login that produced a reading is worth reusing
+            if data and data.succeeded and not restored:
+                self.save_session()
+            
             # Apply smart recharge logic
             if data:
                 data = self.apply_smart_recharge_logic(data)
@@ -529,52 +731,99 @@ class ElectricityMeterScraper:
                 self.driver = None
             return None
     
-    def scrape_all_meters(self, website_url):
-        """Scrape all meters and return list of low balance warnings and recently recharged meters"""
+    def scrape_account_with_retries(self, account_number, website_url):
+        """scrape_account with bounded retries and exponential backoff between attempts"""
+        breaker = get_circuit_breaker(website_url)
+        
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                # No point retrying while the portal itself is down
+                if not breaker.allow_request():
+                    print(f"Not retrying {account_number}: portal circuit breaker open")
+                    return None
+                delay = self.retry_base_delay * (2 ** (attempt - 1))
+                print(f"RETRY {attempt}/{self.max_retries}: account {account_number} in {delay:.0f}s")
+                time.sleep(delay)
+            
+            data = self.scrape_account(account_number, website_url)
+            if data and data.succeeded:
+                return data
+        
+        return None
+    
+    def classify_meter_data(self, account_number, reading, low_balance_warnings, recently_recharged, all_data):
+        """Sort one MeterReading into the warning / recharged / all-data lists"""
+        if reading and reading.succeeded:
+            all_data.append(reading)
+            level = self.policies.get(account_number, reading.nickname).level(reading.balance)
+            
+            # Check if recently recharged (same day after balance reading)
+            if reading.recently_recharged:
+                recently_recharged.append(RechargeEvent.from_reading(reading))
+                print(f"RECENTLY RECHARGED: Account {account_number} ({reading.nickname}) - {reading.recharge_amount} BDT")
+            
+            # Check if balance is below the meter's warning threshold AND not recently recharged
+            elif level in ('low', 'critical'):
+                low_balance_warnings.append(BalanceWarning.from_reading(reading, level))
+                print(f"LOW BALANCE WARNING: Account {account_number} ({reading.nickname}) has {reading.balance} BDT")
+            else:
+                print(f"SUFFICIENT BALANCE: Account {account_number} ({reading.nickname}) has {reading.balance} BDT")
+        else:
+            print(f"FAILED: Failed to scrape account {account_number}")
+    
+    def scrape_all_meters(self, website_url, progress_callback=None, accounts=None, run_state=None, deadline=None):
+        """Scrape all meters and return list of low balance warnings and recently recharged meters
+
+        progress_callback, if given, is called as progress_callback(account_number, reading)
+        after each meter (reading is a MeterReading, or None when the scrape failed or was skipped).
+        accounts restricts the run to a subset of self.all_meters.
+        run_state (a RunState) supplies results already scraped before an interruption
+        and records each new success so a crashed run can be resumed.
+        deadline (a time.time() value) stops the run before a meter that wouldn't finish in
+        time; those meters are left in self.deferred_meters.
+        """
         low_balance_warnings = []
         recently_recharged = []
         all_data = []
+        self.skipped_meters = []
+        self.deferred_meters = []
+        self.run_id = run_state.run_id if run_state else None
+        breaker = get_circuit_breaker(website_url)
+        # Longest meter so far, as the estimate for the next one
+        slowest_meter = 0.0
         
-        for account_number in self.all_meters:
-            data = self.scrape_account(account_number, website_url)
-            
-            if data and data.get('status') == 'success':
-                all_data.append(data)
-                
-                balance_numeric = data.get('balance_numeric')
-                nickname = data.get('nickname', 'Unknown')
-                
-                # Check if recently recharged (same day after balance reading)
-                if data.get('recently_recharged', False):
-                    recharge_info = {
-                        'account_number': account_number,
-                        'nickname': nickname,
-                        'balance_numeric': balance_numeric,
-                        'recharge_amount': data.get('recharge_amount_numeric'),
-                        'recharge_date': data.get('last_recharge_date', 'N/A'),
-                        'timestamp': data.get('timestamp')
-                    }
-                    recently_recharged.append(recharge_info)
-                    print(f"RECENTLY RECHARGED: Account {account_number} ({nickname}) - {data.get('recharge_amount_numeric')} BDT")
-                
-                # Check if balance is low (less than 100 BDT) AND not recently recharged
-                elif balance_numeric is not None and balance_numeric < 100:
-                    warning = {
-                        'account_number': account_number,
-                        'nickname': nickname,
-                        'balance_text': data.get('remaining_balance', 'N/A'),
-                        'balance_numeric': balance_numeric,
-                        'timestamp': data.get('timestamp')
-                    }
-                    low_balance_warnings.append(warning)
-                    print(f"LOW BALANCE WARNING: Account {account_number} ({nickname}) has {balance_numeric} BDT")
-                else:
-                    print(f"SUFFICIENT BALANCE: Account {account_number} ({nickname}) has {balance_numeric} BDT")
+        for account_number in (accounts or self.all_meters):
+            resumed = run_state.get_completed(account_number) if run_state else None
+            if resumed:
+                print(f"RESUMED: Using result already scraped for account {account_number}")
+                data = resumed
+            elif deadline and (self.deferred_meters or time.time() + slowest_meter > deadline):
+                print(f"DEFERRED: Run time budget used up, leaving account {account_number} for a follow-up run")
+                self.deferred_meters.append(account_number)
+                continue
             else:
-                print(f"FAILED: Failed to scrape account {account_number}")
+                # Portal is down - don't launch Chrome for the remaining meters
+                if not breaker.allow_request():
+                    print(f"SKIPPED: Circuit breaker open, skipping account {account_number}")
+                    self.skipped_meters.append(account_number)
+                    if progress_callback:
+                        progress_callback(account_number, None)
+                    continue
+                
+                meter_started = time.time()
+                data = self.scrape_account_with_retries(account_number, website_url)
+                slowest_meter = max(slowest_meter, time.time() - meter_started)
+                if run_state:
+                    run_state.record_result(account_number, data)
+            
+            self.classify_meter_data(account_number, data, low_balance_warnings, recently_recharged, all_data)
+            
+            if progress_callback:
+                progress_callback(account_number, data)
             
             # Small delay between accounts
-            time.sleep(2)
+            if not resumed:
+                time.sleep(2)
         
         return low_balance_warnings, recently_recharged, all_data
     
@@ -600,10 +849,10 @@ class ElectricityMeterScraper:
             data = self.extract_data()
             
             if data:
-                self.save_data(data)
+                self.save_data(data.to_dict())
                 print("Scraping completed successfully!")
-                print(f"Remaining Balance: {data.get('remaining_balance', 'N/A')}")
-                print(f"Reading Time: {data.get('reading_time', 'N/A')}")
+                print(f"Remaining Balance: {data.balance_text or 'N/A'}")
+                print(f"Reading Time: {data.reading_time_text or 'N/A'}")
                 return True
             else:
                 print("Failed to extract data")
@@ -0,0 +1,72 @@
+import os
+import threading
+
+from json_store import load_json, save_json
+
+
+class SelectorCache:
+    """Remembers which CSS selector found each login element, per site.
+
+    login() tries the remembered selector first with a short timeout and only
+    falls back to the full discovery list on a miss. Hit/miss counts are kept
+    alongside so we can see how often discovery still runs.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('SELECTOR_CACHE_PATH', 'selector_cache.json')
+        self._lock = threading.Lock()
+        self.entries = load_json(self.path, 'selector cache', {})
+
+    def _save(self):
+        try:
+            save_json(self.path, self.entries)
+        except Exception as e:
+            print(f"Failed to save selector cache: {str(e)}")
+
+    def _field(self, site, field):
+        site_entry = self.entries.setdefault(site, {})
+        return site_entry.setdefault(field, {"selector": None, "hits": 0, "misses": 0})
+
+    def get(self, site, field):
+        """Return the remembered selector for a field on a site, or None"""
+        return self.entries.get(site, {}).get(field, {}).get("selector")
+
+    def record_hit(self, site, field):
+        with self._lock:
+            self._field(site, field)["hits"] += 1
+            self._save()
+
+    def record_miss(self, site, field):
+        """The remembered selector no longer works - forget it until rediscovered"""
+        with self._lock:
+            entry = self._field(site, field)
+            entry["misses"] += 1
+            entry["selector"] = None
+            self._save()
+
+    def remember(self, site, field, selector):
+        with self._lock:
+            entry = self._field(site, field)
+            if entry["selector"] != selector:
+                entry["selector"] = selector
+                self._save()
+
+    def stats(self):
+        """Return {site: {field: {"selector", "hits", "misses", "hit_rate"}}}"""
+        result = {}
+        for site, fields in self.entries.items():
+            result[site] = {}
+            for field, entry in fields.items():
+                lookups = entry["hits"] + entry["misses"]
+                result[site][field] = dict(entry, hit_rate=round(entry["hits"] / lookups, 3) if lookups else None)
+        return result
+
+
+_selector_cache = None
+
+def get_selector_cache():
+    """Return the process-wide SelectorCache, loading it on first use"""
+    global _selector_cache
+    if _selector_cache is None:
+        _selector_cache = SelectorCache()
+    return _selector_cache
@@ -0,0 +1,100 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from json_store import load_json, update_json
+
+
+class SessionCache:
+    """Saved portal logins (cookies + localStorage) per account.
+
+    After a successful login the scraper stores the browser's cookies, the
+    SPA's localStorage and the dashboard URL; the next scrape of that account
+    restores them and only runs the full login flow if the dashboard doesn't
+    come up. The file holds live auth tokens, so it is written owner-only.
+
+    Several scraper processes can share the file, so every write reloads it
+    under a file lock and changes only the one account being saved or
+    invalidated.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('SESSION_CACHE_PATH', 'session_cache.json')
+        self.max_age = timedelta(hours=float(os.getenv('SESSION_MAX_AGE_HOURS', '12')))
+        self._lock = threading.Lock()
+        self.sessions = load_json(self.path, 'session cache', {})
+        self.hits = 0
+        self.misses = 0
+
+    def _update(self, merge):
+        """Apply merge to the sessions on disk and keep the merged result"""
+        try:
+            self.sessions = update_json(self.path, 'session cache', merge, {}, mode=0o600)
+        except Exception as e:
+            print(f"Failed to save session cache: {str(e)}")
+
+    def get(self, account_number, now=None):
+        """Stored session for an account, or None if there is none or it is older than SESSION_MAX_AGE_HOURS"""
+        now = now or datetime.now()
+        session = self.sessions.get(account_number)
+        if session and now - datetime.fromisoformat(session['saved_at']) <= self.max_age:
+            return session
+        return None
+
+    def save(self, account_number, cookies, local_storage, url, now=None):
+        now = now or datetime.now()
+        session = {
+            "cookies": cookies,
+            "local_storage": local_storage,
+            "url": url,
+            "saved_at": now.isoformat(timespec='seconds'),
+        }
+
+        def merge(sessions):
+            sessions[account_number] = session
+            return sessions
+
+        with self._lock:
+            self.sessions[account_number] = session
+            self._update(merge)
+
+    def invalidate(self, account_number):
+        """The portal rejected the stored session - log in properly next time"""
+        with self._lock:
+            rejected = self.sessions.pop(account_number, None)
+            if rejected is None:
+                return
+
+            def merge(sessions):
+                # Keep a newer login another process saved meanwhile
+                if sessions.get(account_number, {}).get('saved_at') == rejected['saved_at']:
+                    del sessions[account_number]
+                return sessions
+
+            self._update(merge)
+
+    def record(self, restored):
+        with self._lock:
+            if restored:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self.sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+_session_cache = None
+
+def get_session_cache():
+    """Return the process-wide SessionCache, loading it on first use"""
+    global _session_cache
+    if _session_cache is None:
+        _session_cache = SessionCache()
+    return _session_cache
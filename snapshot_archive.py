@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+# In requirements.txt; optional here only so the scraper still imports with SNAPSHOT_ARCHIVE off
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def snapshot_archive_enabled():
+    return os.getenv('SNAPSHOT_ARCHIVE', 'false').lower() == 'true'
+
+
+class SnapshotArchive:
+    """Content-addressed archive of the dashboard pages the scraper read.
+
+    Each snapshot (page HTML, the text elements extraction saw, any captured
+    XHR JSON) is stored once under the sha256 of its content, compressed with
+    zstd (zlib blobs from older archives are still read); a dashboard that
+    hasn't changed since the last run costs one index row.
+    The SQLite index maps account / run / capture time to content hashes, and
+    prune() drops days older than SNAPSHOT_RETENTION_DAYS plus any blob no
+    longer referenced and untouched for SNAPSHOT_PRUNE_GRACE_SECONDS.
+    """
+
+    def __init__(self, root=None, retention_days=None):
+        self.root = root or os.getenv('SNAPSHOT_DIR', 'snapshots')
+        self.retention_days = int(retention_days if retention_days is not None
+                                  else os.getenv('SNAPSHOT_RETENTION_DAYS', '14'))
+        # Another process may have written a blob it hasn't indexed yet; only older orphans are deleted
+        self.prune_grace_seconds = float(os.getenv('SNAPSHOT_PRUNE_GRACE_SECONDS', '3600'))
+        self.objects_dir = os.path.join(self.root, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        # Day (YYYY-MM-DD) of the last prune(), so a long-running process prunes once a day
+        self.pruned_day = None
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.root, 'index.db'), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    account_number TEXT NOT NULL,
+                    run_id TEXT,
+                    captured_at TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_account ON snapshots (account_number, captured_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_run ON snapshots (run_id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_day ON snapshots (day)")
+            self.conn.commit()
+
+    codec = 'zst'
+
+    def _path(self, sha256, codec):
+        return os.path.join(self.objects_dir, sha256[:2], f"{sha256[2:]}.{codec}")
+
+    def _find_blob(self, sha256):
+        for codec in ('zst', 'zz'):
+            path = self._path(sha256, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None, None
+
+    def _write_blob(self, sha256, content):
+        """Store content under its hash unless already there; returns the compressed size"""
+        path, _ = self._find_blob(sha256)
+        if path:
+            # Fresh mtime, so a concurrent prune() doesn't delete it before it is indexed again
+            os.utime(path)
+            return os.path.getsize(path)
+        if not zstandard:
+            raise RuntimeError("Archiving snapshots needs the zstandard package (pip install -r requirements.txt)")
+        compressed = zstandard.ZstdCompressor(level=10).compress(content)
+        path = self._path(sha256, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        return len(compressed)
+
+    def put(self, account_number, snapshot, run_id=None, captured_at=None):
+        """Archive one page snapshot (a JSON-serializable dict); returns its content hash"""
+        captured_at = (captured_at or datetime.now()).replace(microsecond=0)
+        content = json.dumps(snapshot, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        sha256 = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            stored_size = self._write_blob(sha256, content)
+            self.conn.execute("""
+                INSERT INTO snapshots (account_number, run_id, captured_at, day, sha256, size, stored_size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (account_number, run_id, captured_at.isoformat(sep=' '), captured_at.date().isoformat(),
+                  sha256, len(content), stored_size))
+            self.conn.commit()
+        return sha256
+
+    def get(self, sha256):
+        """The snapshot dict stored under a content hash"""
+        path, codec = self._find_blob(sha256)
+        if not path:
+            raise KeyError(sha256)
+        with open(path, 'rb') as f:
+            compressed = f.read()
+        if codec == 'zst':
+            if not zstandard:
+                raise RuntimeError(f"Snapshot {sha256} is zstd-compressed but zstandard is not installed")
+            content = zstandard.ZstdDecompressor().decompress(compressed)
+        else:
+            content = zlib.decompress(compressed)
+        return json.loads(content)
+
+    def entries(self, account_number=None, run_id=None, since=None, until=None):
+        """Index rows (dicts, oldest first) filtered by account, run and capture time"""
+        query = "SELECT * FROM snapshots WHERE 1 = 1"
+        params = []
+        if account_number:
+            query += " AND account_number = ?"
+            params.append(account_number)
+        if run_id:
+            query += " AND run_id = ?"
+            params.append(run_id)
+        if since:
+            query += " AND captured_at >= ?"
+            params.append(since.isoformat(sep=' '))
+        if until:
+            query += " AND captured_at < ?"
+            params.append(until.isoformat(sep=' '))
+        with self._lock:
+            rows = self.conn.execute(query + " ORDER BY captured_at, id", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def prune(self, now=None):
+        """Forget snapshots from days past the retention window and delete unreferenced blobs.
+
+        Blobs are written before their index row, possibly by another process
+        sharing SNAPSHOT_DIR, so an unreferenced blob modified within
+        prune_grace_seconds is left for a later prune.
+        """
+        self.pruned_day = datetime.now().date().isoformat()
+        if self.retention_days <= 0:
+            return 0, 0
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).date().isoformat()
+        with self._lock:
+            removed = self.conn.execute("DELETE FROM snapshots WHERE day < ?", (cutoff,)).rowcount
+            self.conn.commit()
+            referenced = {row[0] for row in self.conn.execute("SELECT DISTINCT sha256 FROM snapshots")}
+            blobs_removed = 0
+            settled_before = time.time() - self.prune_grace_seconds
+            for prefix in os.listdir(self.objects_dir):
+                directory = os.path.join(self.objects_dir, prefix)
+                for name in os.listdir(directory):
+                    if name.endswith('.tmp') or prefix + name.split('.')[0] in referenced:
+                        continue
+                    path = os.path.join(directory, name)
+                    try:
+                        if os.path.getmtime(path) > settled_before:
+                            continue
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                    blobs_removed += 1
+        if removed:
+            print(f"Pruned {removed} snapshots older than {cutoff} ({blobs_removed} blobs)")
+        return removed, blobs_removed
+
+    def stats(self):
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT COUNT(*) AS snapshots, COUNT(DISTINCT sha256) AS blobs, COALESCE(SUM(size), 0) AS raw_bytes
+                FROM snapshots
+            """).fetchone()
+            stored = self.conn.execute("""
+                SELECT COALESCE(SUM(stored_size), 0) FROM (SELECT DISTINCT sha256, stored_size FROM snapshots)
+            """).fetchone()[0]
+        return {
+            "snapshots": row['snapshots'],
+            "blobs": row['blobs'],
+            "raw_bytes": row['raw_bytes'],
+            "stored_bytes": stored,
+            "codec": self.codec,
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+_snapshot_archive = None
+_snapshot_archive_lock = threading.Lock()
+
+def get_snapshot_archive():
+    """Return the process-wide SnapshotArchive, pruning old days when it is opened and then once a day"""
+    global _snapshot_archive
+    with _snapshot_archive_lock:
+        if _snapshot_archive is None:
+            _snapshot_archive = SnapshotArchive()
+        if _snapshot_archive.pruned_day != datetime.now().date().isoformat():
+            try:
+                _snapshot_archive.prune()
+            except Exception as e:
+                print(f"Snapshot pruning failed: {str(e)}")
+        return _snapshot_archive
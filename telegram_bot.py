@@ -1,9 +1,11 @@
-import requests
 import json
 import os
 from datetime import datetime
 import pytz
 
+from meter_policy import get_policy_table
+from models import MeterReading, RechargeEvent, BalanceWarning, format_timestamp
+
 class TelegramBot:
     def __init__(self, bot_token=None, chat_id=None):
         self.bot_token = bot_token or os.getenv('TELEGRAM_BOT_TOKEN')
@@ -12,6 +14,9 @@ class TelegramBot:
         
         # Set up Bangladesh timezone
         self.bd_timezone = pytz.timezone('Asia/Dhaka')
+        
+        # Per-meter balance thresholds for the emoji bands
+        self.policies = get_policy_table()
     
     def get_bangladesh_time(self):
         """Get current time in Bangladesh timezone"""
@@ -34,6 +39,8 @@ class TelegramBot:
                 'text': message,
                 'parse_mode': 'HTML'
             }
+            # Imported here so commands that never send (cached reports, serve) start fast
+            import requests
             response = requests.post(url, data=data)
             
             if response.status_code == 200:
@@ -47,38 +54,57 @@ class TelegramBot:
             print(f"Error sending Telegram message: {str(e)}")
             return False
     
+    def send_photo(self, photo, caption=None):
+        """Send PNG bytes as a photo (caption is HTML, max 1024 characters)"""
+        try:
+            url = f"{self.base_url}/sendPhoto"
+            data = {'chat_id': self.chat_id}
+            if caption:
+                data['caption'] = caption
+                data['parse_mode'] = 'HTML'
+            import requests
+            response = requests.post(url, data=data, files={'photo': ('chart.png', photo, 'image/png')})
+            
+            if response.status_code == 200:
+                print("Photo sent successfully to Telegram!")
+                return True
+            else:
+                print(f"Failed to send photo: {response.text}")
+                return False
+                
+        except Exception as e:
+            print(f"Error sending Telegram photo: {str(e)}")
+            return False
+    
     def format_meter_data(self, data):
         if not data:
             return "❌ Failed to retrieve electricity meter data"
         
-        status_emoji = "✅" if data.get('status') == 'success' else "❌"
+        # data.json holds the dict form; scraper results are already MeterReading
+        reading = MeterReading.from_dict(data) if isinstance(data, dict) else data
         
-        # Format remaining balance with status indicator
-        balance = data.get('remaining_balance', 'N/A')
-        balance_emoji = "💰"
+        status_emoji = "✅" if reading.succeeded else "❌"
         
-        if balance != 'N/A' and balance != 'Error':
-            try:
-                balance_num = float(balance.replace('BDT', '').replace(',', '').strip())
-                if balance_num < 100:
-                    balance_emoji = "🚨"  # Critical
-                elif balance_num < 500:
-                    balance_emoji = "⚠️"   # Warning
-            except:
-                pass
+        # Format remaining balance with status indicator, using the meter's thresholds
+        level = self.policies.get(reading.account_number, reading.nickname).level(reading.balance)
+        balance_emoji = "💰"
+        if level in ('low', 'critical'):
+            balance_emoji = "🚨"  # Critical
+        elif level == 'notice':
+            balance_emoji = "⚠️"   # Warning
         
         message = f"""
 {status_emoji} <b>Electricity Meter Report</b>
 📅 <b>Date:</b> {datetime.now().strftime('%d %B %Y, %I:%M %p')}
 
-{balance_emoji} <b>Remaining Balance:</b> {balance}
-⏰ <b>Last Reading:</b> {data.get('reading_time', 'N/A')}
+{balance_emoji} <b>Remaining Balance:</b> {reading.balance_text or 'N/A'}
+⏰ <b>Last Reading:</b> {reading.reading_time_text or 'N/A'}
 
-💳 <b>Last Recharge:</b> {data.get('last_recharge_amount', 'N/A')}
-📆 <b>Recharge Date:</b> {data.get('last_recharge_date', 'N/A')}
+💳 <b>Last Recharge:</b> {reading.recharge_amount_text or 'N/A'}
+📆 <b>Recharge Date:</b> {reading.recharge_date_text or 'N/A'}
 
-🏠 <b>Account:</b> {data.get('account_number', 'N/A')}
-🔄 <b>Updated:</b> {data.get('timestamp', 'N/A')}
+🏠 <b>Account:</b> {reading.account_number or 'N/A'}
+🔄 <b>Updated:</b> {format_timestamp(reading.timestamp) or 'N/A'}
 """
         
         # Add low balance warning
@@ -110,6 +136,10 @@ class TelegramBot:
             if not warnings and not recently_recharged:
                 return True  # No updates to send
             
+            # Older callers pass the dict form
+            warnings = [BalanceWarning.from_dict(w) if isinstance(w, dict) else w for w in warnings]
+            recently_recharged = [RechargeEvent.from_dict(r) if isinstance(r, dict) else r for r in recently_recharged]
+            
             # Create status message with correct Bangladesh time
             bd_time = self.get_bangladesh_time()
             timestamp = bd_time.strftime('%d %B %Y, %I:%M %p')
@@ -121,10 +151,11 @@ class TelegramBot:
                 
                 # Add each warning with nickname
                 for warning in warnings:
-                    account = warning['account_number']
-                    nickname = warning['nickname']
-                    balance = warning['balance_numeric']
-                    message += f"❌ <b>Meter {account} ({nickname}):</b> {balance:.2f} BDT\n"
+                    account = warning.account_number
+                    nickname = warning.nickname
+                    balance = warning.balance
+                    emoji = "🆘" if warning.level == 'critical' else "❌"
+                    message += f"{emoji} <b>Meter {account} ({nickname}):</b> {balance:.2f} BDT\n"
             else:
                 message = f"📋 <b>METER STATUS UPDATE</b>\n"
                 message += f"📅 <b>Date:</b> {timestamp}\n\n"
@@ -133,9 +164,9 @@ class TelegramBot:
             if recently_recharged:
                 message += f"\n📋 <b>Recent Activity:</b>\n"
                 for recharge in recently_recharged:
-                    account = recharge['account_number']
-                    nickname = recharge['nickname']
-                    amount = recharge['recharge_amount']
+                    account = recharge.account_number
+                    nickname = recharge.nickname
+                    amount = recharge.amount
                     message += f"🔄 <b>Meter {account} ({nickname}):</b> Recently recharged ({amount:.2f} BDT)\n"
             
             # Add summary
@@ -149,9 +180,9 @@ class TelegramBot:
             
             # Add timestamp
             if warnings:
-                message += f"\n🔄 <b>Updated:</b> {warnings[0]['timestamp']}"
+                message += f"\n🔄 <b>Updated:</b> {format_timestamp(warnings[0].timestamp)}"
             elif recently_recharged:
-                message += f"\n🔄 <b>Updated:</b> {recently_recharged[0]['timestamp']}"
+                message += f"\n🔄 <b>Updated:</b> {format_timestamp(recently_recharged[0].timestamp)}"
             
             return self.send_message(message)
             
@@ -159,6 +190,23 @@ class TelegramBot:
             error_msg = f"❌ Error sending meter status update: {str(e)}"
             return self.send_message(error_msg)
 
+    def send_anomaly_alerts(self, anomalies, nicknames=None):
+        """Send consumption spikes, overdrawn balances and stale meters found by AnomalyDetector"""
+        if not anomalies:
+            return True  # Nothing to report
+        nicknames = nicknames or {}
+        emojis = {'spike': '📈', 'overdraw': '🔻', 'stale': '⏸️'}
+        titles = {'spike': 'Consumption spike', 'overdraw': 'Overdrawn', 'stale': 'Stale reading'}
+        
+        timestamp = self.get_bangladesh_time().strftime('%d %B %Y, %I:%M %p')
+        message = f"🔍 <b>METER ANOMALIES</b>\n"
+        message += f"📅 <b>Date:</b> {timestamp}\n\n"
+        for anomaly in anomalies:
+            nickname = nicknames.get(anomaly.account_number, 'Unknown')
+            message += (f"{emojis.get(anomaly.kind, '⚠️')} <b>Meter {anomaly.account_number} ({nickname}):</b> "
+                        f"{titles.get(anomaly.kind, anomaly.kind)} - {anomaly.detail}\n")
+        return self.send_message(message)
+
     def send_low_balance_warnings(self, warnings):
         """Legacy method - redirects to new comprehensive method"""
         return self.send_meter_status_update(warnings, [])
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test adaptive per-meter polling intervals and the daily browser-time budget
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from adaptive_scheduler import AdaptiveScheduler, MeterOutlook, fit_budget
+from history_store import MeterHistory
+from meter_policy import PolicyTable
+from models import MeterReading
+
+NOW = datetime(2025, 8, 17, 10, 0)
+# account: (balance today, BDT used per day)
+METERS = {
+    '37226784': (60.0, 50.0),     # nearly empty
+    '37202772': (400.0, 40.0),    # ~10 days left
+    '37195501': (2000.0, 20.0),   # ~100 days left
+}
+
+def build_history():
+    directory = tempfile.mkdtemp()
+    history = MeterHistory(os.path.join(directory, 'history.db'))
+    readings = []
+    for account_number, (balance, burn) in METERS.items():
+        for days_ago in range(15, -1, -1):
+            readings.append(MeterReading(
+                account_number=account_number, nickname='Test', status='success',
+                balance=balance + burn * days_ago, timestamp=NOW - timedelta(days=days_ago, hours=2),
+            ))
+    history.record_readings(readings)
+    return history, directory
+
+def test_intervals_follow_balance_and_burn():
+    print("=== Testing Adaptive Intervals ===")
+    history, directory = build_history()
+    scheduler = AdaptiveScheduler(history, PolicyTable({}), os.path.join(directory, 'poll_state.json'))
+    scheduler.budget_minutes = 1000
+    outlooks, minutes = scheduler.plan(list(METERS), NOW)
+    intervals = {o.account_number: round(o.interval_hours, 1) for o in outlooks}
+    print(f"Intervals: {intervals}, ~{minutes:.1f} browser-min/day")
+    assert outlooks[1].burn_per_day == 40.0
+    assert intervals == {'37226784': 1.0, '37202772': 60.0, '37195501': 72.0}
+    history.close()
+    print("✅ PASS")
+
+def test_budget_stretches_healthy_meters_first():
+    print("\n=== Testing Browser-Time Budget ===")
+    history, directory = build_history()
+    scheduler = AdaptiveScheduler(history, PolicyTable({}), os.path.join(directory, 'poll_state.json'))
+    scheduler.max_hours = 24
+    scheduler.minutes_per_check = 1.0
+    # The low meter alone needs 24 checks/day; the other two 1 each
+    scheduler.budget_minutes = 25
+    outlooks, minutes = scheduler.plan(list(METERS), NOW)
+    intervals = {o.account_number: round(o.interval_hours, 1) for o in outlooks}
+    print(f"Intervals within a 25 min budget: {intervals} (~{minutes:.1f} min/day)")
+    assert intervals['37226784'] == 1.0
+    assert intervals['37202772'] == 24.0 and intervals['37195501'] == 24.0
+    assert minutes <= 26
+
+    scheduler.budget_minutes = 12
+    outlooks, minutes = scheduler.plan(list(METERS), NOW)
+    print(f"Over budget even for the low meter: {outlooks[0].interval_hours:.1f}h (~{minutes:.1f} min/day)")
+    assert outlooks[0].interval_hours == 2.0
+    history.close()
+    print("✅ PASS")
+
+def test_due_meters_and_persistence():
+    print("\n=== Testing Due Meters ===")
+    history, directory = build_history()
+    path = os.path.join(directory, 'poll_state.json')
+    scheduler = AdaptiveScheduler(history, PolicyTable({}), path)
+    scheduler.budget_minutes = 1000
+    assert scheduler.due(list(METERS), NOW) == list(METERS)
+    scheduler.mark_checked(list(METERS), NOW)
+
+    restarted = AdaptiveScheduler(history, PolicyTable({}), path)
+    restarted.budget_minutes = 1000
+    assert restarted.due(list(METERS), NOW + timedelta(minutes=30)) == []
+    assert restarted.due(list(METERS), NOW + timedelta(hours=2)) == ['37226784']
+    later = restarted.due(list(METERS), NOW + timedelta(hours=80))
+    print(f"Due after 80h: {later}")
+    assert later == ['37226784', '37202772', '37195501']
+    history.close()
+    print("✅ PASS")
+
+def fixed_outlooks(levels):
+    """Replacement for AdaptiveScheduler.outlooks: {account: level} with no balance history"""
+    return lambda accounts, now=None: [MeterOutlook(account, level=levels[account]) for account in accounts]
+
+def test_budget_overrun_defers_to_next_day():
+    print("\n=== Testing Budget Overrun ===")
+    # 200 healthy meters even at 72h need 100 browser-min/day against a 60 min budget
+    outlooks = [MeterOutlook(str(i), level='ok', interval_hours=72.0) for i in range(200)]
+    minutes = fit_budget(outlooks, 60, 1.5, 72)
+    print(f"200 ok meters: ~{minutes:.1f} min/day planned")
+    assert round(minutes, 1) == 100.0
+
+    directory = tempfile.mkdtemp()
+    scheduler = AdaptiveScheduler(None, PolicyTable({}), os.path.join(directory, 'poll_state.json'))
+    accounts = [outlook.account_number for outlook in outlooks]
+    scheduler.outlooks = fixed_outlooks({account: 'ok' for account in accounts})
+    first = scheduler.due(accounts, NOW)
+    assert len(first) == 40 and len(scheduler.over_budget) == 160
+    scheduler.mark_checked(first, NOW)
+    assert scheduler.due(accounts, NOW + timedelta(hours=1)) == []
+    assert len(scheduler.over_budget) == 160
+
+    # The budget spent survives a restart, and resets the next day
+    restarted = AdaptiveScheduler(None, PolicyTable({}), os.path.join(directory, 'poll_state.json'))
+    restarted.outlooks = scheduler.outlooks
+    assert restarted.due(accounts, NOW + timedelta(hours=2)) == []
+    tomorrow = restarted.due(accounts, NOW + timedelta(days=1))
+    assert len(tomorrow) == 40 and not set(tomorrow) & set(first)
+    print("✅ PASS")
+
+def test_budget_holds_over_a_day_of_ticks():
+    print("\n=== Testing Budget Over a Day of Ticks ===")
+    levels = {f'low-{i}': 'low' for i in range(5)}
+    levels.update({f'ok-{i}': 'ok' for i in range(5)})
+    directory = tempfile.mkdtemp()
+    scheduler = AdaptiveScheduler(None, PolicyTable({}), os.path.join(directory, 'poll_state.json'))
+    scheduler.outlooks = fixed_outlooks(levels)
+    accounts = list(levels)
+    _, minutes = scheduler.plan(accounts, NOW)
+    print(f"5 low + 5 ok meters: ~{minutes:.1f} min/day planned")
+    assert round(minutes, 1) == 62.5
+
+    start = datetime(2025, 8, 17)
+    checks = {}
+    for tick in range(2 * 24 * 4):
+        now = start + timedelta(minutes=15 * tick)
+        due = scheduler.due(accounts, now)
+        if tick == 0:
+            # Low meters go first when not everything fits
+            assert due[:5] == [f'low-{i}' for i in range(5)]
+        scheduler.mark_checked(due, now)
+        checks[now.date()] = checks.get(now.date(), 0) + len(due)
+    print(f"Checks per day: {checks}")
+    assert all(count * scheduler.minutes_per_check <= scheduler.budget_minutes for count in checks.values())
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Adaptive Scheduler Test")
+    print("=" * 40)
+
+    test_intervals_follow_balance_and_burn()
+    test_budget_stretches_healthy_meters_first()
+    test_due_meters_and_persistence()
+    test_budget_overrun_defers_to_next_day()
+    test_budget_holds_over_a_day_of_ticks()
+
+    print("\n🎉 All adaptive scheduler tests passed!")
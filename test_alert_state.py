@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test alert deduplication and escalation across scheduled runs
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alert_state import AlertState
+from meter_policy import PolicyTable
+from models import BalanceWarning, MeterReading, RechargeEvent
+
+def run(state, balance, now, recharged=False, sent=True):
+    """One scheduled run for one meter; returns (warnings sent, recharges sent)"""
+    reading = MeterReading(account_number='37226784', nickname='Ayon', balance=balance,
+                           recharge_amount=1000.0, recently_recharged=recharged, timestamp=now)
+    warnings = [BalanceWarning.from_reading(reading)] if balance < 100 and not recharged else []
+    recharges = [RechargeEvent.from_reading(reading)] if recharged else []
+    to_warn, to_recharge = state.filter_notifications([reading], warnings, recharges, now)
+    state.mark_notified([w.account_number for w in to_warn] + [e.account_number for e in to_recharge], sent, now)
+    return to_warn, to_recharge
+
+def test_only_transitions_and_reminders_are_sent():
+    print("=== Testing Alert State Machine ===")
+    path = os.path.join(tempfile.mkdtemp(), 'alert_state.json')
+    state = AlertState(path, PolicyTable({}))
+    state.reminders[AlertState.LOW] = timedelta(hours=24)
+    start = datetime(2025, 8, 17, 8, 0)
+
+    assert run(state, 300, start) == ([], [])
+    warnings, _ = run(state, 90, start + timedelta(hours=4))
+    assert [w.level for w in warnings] == ['low']
+    # Still low at the next two schedule times: nothing sent
+    assert run(state, 85, start + timedelta(hours=8)) == ([], [])
+    assert run(state, 80, start + timedelta(hours=12)) == ([], [])
+    # Escalation is always sent
+    warnings, _ = run(state, 40, start + timedelta(hours=16))
+    assert [w.level for w in warnings] == ['critical']
+    # Recharge is sent once, then back to ok quietly
+    _, recharges = run(state, 40, start + timedelta(hours=20), recharged=True)
+    assert len(recharges) == 1
+    assert run(state, 40, start + timedelta(hours=22), recharged=True) == ([], [])
+    assert run(state, 1040, start + timedelta(hours=30)) == ([], [])
+    assert state.get('37226784') == AlertState.OK
+    print("✅ PASS")
+
+def test_reminder_and_persistence():
+    print("\n=== Testing Reminders Across Restarts ===")
+    path = os.path.join(tempfile.mkdtemp(), 'alert_state.json')
+    start = datetime(2025, 8, 17, 8, 0)
+    state = AlertState(path, PolicyTable({}))
+    state.reminders[AlertState.LOW] = timedelta(hours=24)
+    assert len(run(state, 90, start)[0]) == 1
+
+    # A restarted bot remembers the meter was already reported
+    restarted = AlertState(path, PolicyTable({}))
+    restarted.reminders[AlertState.LOW] = timedelta(hours=24)
+    assert restarted.get('37226784') == AlertState.LOW
+    assert run(restarted, 88, start + timedelta(hours=6)) == ([], [])
+    reminder, _ = run(restarted, 70, start + timedelta(hours=24))
+    print(f"Reminder after 24h: {[w.to_dict() for w in reminder]}")
+    assert len(reminder) == 1
+    print("✅ PASS")
+
+def test_quiet_hours_defer_alerts():
+    print("\n=== Testing Quiet Hours ===")
+    path = os.path.join(tempfile.mkdtemp(), 'alert_state.json')
+    policies = PolicyTable({"Ayon": {"quiet_hours": "22:00-07:00"}})
+    state = AlertState(path, policies)
+
+    # Low, but it's 23:30 in Ayon's quiet hours - held back
+    assert run(state, 90, datetime(2025, 8, 17, 23, 30)) == ([], [])
+    warnings, _ = run(state, 88, datetime(2025, 8, 18, 8, 0))
+    print(f"Sent after quiet hours: {[w.to_dict() for w in warnings]}")
+    assert [w.level for w in warnings] == ['low']
+    assert run(state, 85, datetime(2025, 8, 18, 12, 0)) == ([], [])
+    print("✅ PASS")
+
+def test_failed_send_is_retried():
+    print("\n=== Testing Failed Telegram Send ===")
+    path = os.path.join(tempfile.mkdtemp(), 'alert_state.json')
+    start = datetime(2025, 8, 17, 8, 0)
+    state = AlertState(path, PolicyTable({}))
+    state.reminders[AlertState.LOW] = timedelta(hours=24)
+
+    # Telegram is down when the meter first goes low: the same alert goes out next run
+    assert len(run(state, 90, start, sent=False)[0]) == 1
+    restarted = AlertState(path, PolicyTable({}))
+    warnings, _ = run(restarted, 88, start + timedelta(hours=4))
+    assert [w.level for w in warnings] == ['low']
+    assert run(restarted, 85, start + timedelta(hours=8)) == ([], [])
+
+    # A recharge alert that failed is not lost either
+    assert len(run(restarted, 40, start + timedelta(hours=12), recharged=True, sent=False)[1]) == 1
+    _, recharges = run(restarted, 40, start + timedelta(hours=16), recharged=True)
+    print(f"Recharge re-sent: {[e.to_dict() for e in recharges]}")
+    assert len(recharges) == 1
+    assert run(restarted, 40, start + timedelta(hours=20), recharged=True) == ([], [])
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Alert State Test")
+    print("=" * 40)
+
+    test_only_transitions_and_reminders_are_sent()
+    test_reminder_and_persistence()
+    test_quiet_hours_defer_alerts()
+    test_failed_send_is_retried()
+
+    print("\n🎉 All alert state tests passed!")
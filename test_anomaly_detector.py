@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test spike, overdraw and stale-reading detection over stored history
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from anomaly_detector import AnomalyDetector, rolling_spikes
+from history_store import MeterHistory
+from models import MeterReading
+
+def test_rolling_spikes():
+    print("=== Testing Rolling Median/MAD ===")
+    series = [50, 52, 48, 51, 49, 50, 53, 47, 180, 51]
+    spikes = rolling_spikes(series, window=28, threshold=3.5, min_history=7, min_spread=5)
+    print(f"Spikes: {spikes}")
+    assert [index for index, _, _ in spikes] == [8]
+    # A perfectly steady meter doesn't flag a tiny wobble
+    assert rolling_spikes([40.0] * 10 + [43.0], 28, 3.5, 7, 5) == []
+    print("✅ PASS")
+
+def test_detects_all_kinds_once():
+    print("\n=== Testing Batch Detection ===")
+    history = MeterHistory(os.path.join(tempfile.mkdtemp(), 'history.db'))
+    start = datetime(2025, 8, 1, 8, 0)
+    readings = []
+    balance = 3000.0
+    for day in range(15):
+        # Ayon uses ~50 BDT/day, then 400 BDT on the last day
+        balance -= 400 if day == 14 else 50 + (day % 3)
+        readings.append(MeterReading(account_number='37226784', balance=balance, timestamp=start + timedelta(days=day)))
+    now = start + timedelta(days=14, hours=1)
+    # Arif is overdrawn and the portal has shown the same reading time for 3 days
+    readings.append(MeterReading(account_number='37202772', balance=-36.3, timestamp=now,
+                                 reading_time_text='Reading time: 12 Aug 2025 00:00'))
+    history.record_readings(readings)
+
+    detector = AnomalyDetector(history)
+    findings = detector.run(now)
+    print(f"Findings: {[f.to_dict() for f in findings]}")
+    kinds = sorted((f.account_number, f.kind) for f in findings)
+    assert kinds == [('37202772', 'overdraw'), ('37202772', 'stale'), ('37226784', 'spike')]
+    spike = [f for f in findings if f.kind == 'spike'][0]
+    assert spike.day == '2025-08-15' and spike.value == 400.0
+
+    # The next run the same day reports nothing new
+    assert detector.run(now + timedelta(hours=4)) == []
+    history.close()
+    print("✅ PASS")
+
+def test_missing_days_are_not_spikes():
+    print("\n=== Testing Gap in Scraping ===")
+    history = MeterHistory(os.path.join(tempfile.mkdtemp(), 'history.db'))
+    start = datetime(2025, 8, 1, 8, 0)
+    readings = []
+    balance = 3000.0
+    for day in range(15):
+        balance -= 50 + (day % 3)
+        # No scrape on days 12 and 13: day 14's reading covers three days of use
+        if day not in (12, 13):
+            readings.append(MeterReading(account_number='37226784', balance=balance, timestamp=start + timedelta(days=day)))
+    history.record_readings(readings)
+    now = start + timedelta(days=14, hours=1)
+    assert history.get_rollups('37226784', 'daily', '2025-08-15')[0]['consumption'] == 153.0
+    assert AnomalyDetector(history).detect(now) == []
+
+    # A real spike after a gap is still caught, per day
+    history.record_readings([MeterReading(account_number='37226784', balance=balance - 900,
+                                          timestamp=start + timedelta(days=16))])
+    findings = AnomalyDetector(history).detect(now + timedelta(days=2))
+    print(f"Findings: {[f.to_dict() for f in findings]}")
+    assert [(f.kind, f.day, f.value) for f in findings] == [('spike', '2025-08-17', 450.0)]
+    assert "over 2 days" in findings[0].detail
+    history.close()
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Anomaly Detection Test")
+    print("=" * 40)
+
+    test_rolling_spikes()
+    test_detects_all_kinds_once()
+    test_missing_days_are_not_spikes()
+
+    print("\n🎉 All anomaly tests passed!")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test browser engine selection and the pure-HTTP engine's HTML parsing/extraction
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from selenium.webdriver.common.by import By
+
+from scraper import ElectricityMeterScraper, HttpDriver, get_browser_engine
+
+DASHBOARD_HTML = """
+<html>
+<head><title>DESCO Customer Portal</title><script>var x = "ignored 999 BDT";</script></head>
+<body>
+  <div class="card">
+    <span data-v-1>Remaining Balance: 135.25 BDT</span>
+    <span data-v-1>Reading time: 17 Aug 2025 00:00</span>
+  </div>
+  <div class="card">
+    <p>Last Recharge: <b>1,000.00 BDT</b></p>
+    <p>Recharge time: 16 Aug 2025 15:16</p>
+  </div>
+  <input type="text" placeholder="Account No">
+  <button class="btn btn-primary">Login</button>
+</body>
+</html>
+"""
+
+def test_engine_selection():
+    print("=== Testing Engine Selection ===")
+    for name in ['chrome', 'chrome-headless-shell', 'firefox', 'http']:
+        engine = get_browser_engine(name)
+        print(f"{name} -> {type(engine).__name__}, javascript={engine.supports_javascript}")
+        assert engine.name == name
+    assert get_browser_engine('netscape').name == 'chrome'
+    print("✅ PASS")
+
+def test_http_driver_parsing():
+    print("\n=== Testing HTTP Driver Parsing ===")
+    driver = HttpDriver()
+    driver.load_html(DASHBOARD_HTML, 'https://example.test/dashboard')
+
+    texts = [e.text for e in driver.find_elements(By.XPATH, "//*[text()]")]
+    print(f"Title: {driver.title}")
+    print(f"Text elements: {texts}")
+    assert driver.title == 'DESCO Customer Portal'
+    assert 'Remaining Balance: 135.25 BDT' in texts
+    assert 'Last Recharge: 1,000.00 BDT' in texts
+    assert not any('ignored' in text for text in texts)
+    assert driver.find_element(By.TAG_NAME, 'input').get_attribute('placeholder') == 'Account No'
+    assert driver.find_elements(By.CSS_SELECTOR, 'button')[0].text == 'Login'
+    driver.quit()
+    print("✅ PASS")
+
+def test_extract_data_with_http_engine():
+    print("\n=== Testing extract_data on the HTTP Engine ===")
+    scraper = ElectricityMeterScraper()
+    scraper.engine = get_browser_engine('http')
+    scraper.driver = HttpDriver()
+    scraper.driver.load_html(DASHBOARD_HTML, 'https://example.test/dashboard')
+
+    data = scraper.extract_data()
+    print(f"Extracted: {data}")
+    assert data.succeeded
+    assert data.balance == 135.25
+    assert data.reading_time_text == 'Reading time: 17 Aug 2025 00:00'
+    assert data.recharge_amount_text == 'Last Recharge: 1,000.00 BDT'
+    assert data.recharge_date_text == 'Recharge time: 16 Aug 2025 15:16'
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Browser Engine Test")
+    print("=" * 40)
+
+    test_engine_selection()
+    test_http_driver_parsing()
+    test_extract_data_with_http_engine()
+
+    print("\nTest completed!")
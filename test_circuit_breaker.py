@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test the portal circuit breaker and its short-circuiting of multi-meter runs
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from circuit_breaker import CircuitBreaker
+import circuit_breaker
+from scraper import ElectricityMeterScraper
+
+def test_breaker_trips_and_recovers():
+    print("=== Testing Breaker State Transitions ===")
+    breaker = CircuitBreaker('portal.test', failure_threshold=2, base_cooldown=0.05, max_cooldown=1, jitter=0)
+
+    breaker.record_failure('login failed')
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    breaker.record_failure('login failed')
+    print(f"After 2 failures: {breaker.to_dict()}")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # A failed trial re-opens with a doubled cooldown
+    breaker.record_failure('still down')
+    print(f"After failed trial: trips={breaker.trips}, retry_in={breaker.retry_in():.3f}s")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_in() > 0.06
+
+    time.sleep(0.11)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.trips == 0
+    print("✅ PASS")
+
+def test_backoff_is_capped_with_jitter():
+    print("\n=== Testing Backoff Cap and Jitter ===")
+    breaker = CircuitBreaker('portal.test', failure_threshold=1, base_cooldown=10, max_cooldown=40, jitter=0.2)
+    cooldowns = []
+    for _ in range(5):
+        breaker.record_failure()
+        cooldowns.append(breaker.retry_in())
+    print(f"Cooldowns: {[round(c, 1) for c in cooldowns]}")
+    assert 8 <= cooldowns[0] <= 12
+    assert all(c <= 40 * 1.2 + 0.1 for c in cooldowns)
+    print("✅ PASS")
+
+def test_half_open_allows_one_trial():
+    print("\n=== Testing Single Half-Open Trial ===")
+    breaker = CircuitBreaker('portal.test', failure_threshold=1, base_cooldown=0.01, max_cooldown=1, jitter=0)
+    breaker.record_failure('down')
+    time.sleep(0.02)
+
+    allowed = []
+    barrier = threading.Barrier(5)
+
+    def probe():
+        barrier.wait()
+        allowed.append(breaker.allow_request())
+
+    threads = [threading.Thread(target=probe) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Concurrent half-open callers allowed: {allowed}")
+    assert allowed.count(True) == 1
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # Only the trial's own thread may check again; a result frees the breaker for everyone
+    assert not breaker.allow_request()
+    breaker.trial_owner = threading.get_ident()
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.allow_request() and breaker.trial_owner is None
+    print("✅ PASS")
+
+class FailingScraper(ElectricityMeterScraper):
+    """Simulates a portal that rejects every login"""
+
+    def __init__(self):
+        super().__init__()
+        self.attempted = []
+
+    def scrape_account(self, account_number, website_url):
+        self.attempted.append(account_number)
+        circuit_breaker.get_circuit_breaker(website_url).record_failure('login failed')
+        return None
+
+def test_scrape_all_meters_short_circuits():
+    print("\n=== Testing Multi-Meter Short Circuit ===")
+    url = 'https://portal.breaker-test.invalid/login'
+    circuit_breaker._breakers.clear()
+    scraper = FailingScraper()
+    progress = []
+
+    original_sleep = time.sleep
+    time.sleep = lambda seconds: None
+    try:
+        warnings, recharged, all_data = scraper.scrape_all_meters(
+            url, progress_callback=lambda account, data: progress.append(account)
+        )
+    finally:
+        time.sleep = original_sleep
+
+    print(f"Attempted: {scraper.attempted}")
+    print(f"Skipped: {scraper.skipped_meters}")
+    # The first meter's retry trips the breaker; retries stop and the rest are skipped
+    assert scraper.attempted == ['37226784', '37226784']
+    assert len(scraper.skipped_meters) == 4
+    assert progress == scraper.all_meters
+    assert all_data == []
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Circuit Breaker Test")
+    print("=" * 40)
+
+    test_breaker_trips_and_recovers()
+    test_backoff_is_capped_with_jitter()
+    test_half_open_allows_one_trial()
+    test_scrape_all_meters_short_circuits()
+
+    print("\nTest completed!")
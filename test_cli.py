@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test the CLI entry point and benchmark its start-up imports with python -X importtime
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cli import build_parser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Start-up budget for commands that never launch a browser, on top of the bare interpreter
+MAX_IMPORT_MS = 100
+
+def import_times(args, env=None):
+    """{top-level module: cumulative import microseconds} for one python -X importtime run"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + args, cwd=HERE, env=env,
+        capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Nested imports are indented under the module that triggered them
+        if not name.startswith('  '):
+            modules[name.strip()] = int(cumulative)
+    return modules, result.stdout
+
+def test_parser():
+    print("=== Testing CLI Commands ===")
+    parser = build_parser()
+    args = parser.parse_args(['report', 'monthly', '--print', '--date', '2025-09-01'])
+    assert args.func.__name__ == 'cmd_report' and args.kind == 'monthly' and args.print
+    assert parser.parse_args(['scrape', '--accounts', '37226784']).accounts == '37226784'
+    for command in ('schedule', 'serve', 'diagnose'):
+        assert parser.parse_args([command]).func.__name__ == f'cmd_{command}'
+    print("✅ PASS")
+
+def test_report_starts_without_browser_stack():
+    print("\n=== Benchmarking Start-up Imports ===")
+    env = dict(os.environ, HISTORY_DB_PATH=os.path.join(tempfile.mkdtemp(), 'history.db'))
+    baseline, _ = import_times(['-c', 'pass'], env)
+    modules, output = import_times(['cli.py', 'report', 'weekly', '--print', '--date', '2025-08-18'], env)
+    assert "WEEKLY DIGEST" in output
+
+    added = {name: micros for name, micros in modules.items() if name not in baseline}
+    total_ms = sum(added.values()) / 1000
+    slowest = sorted(added.items(), key=lambda item: -item[1])[:5]
+    print(f"`cli.py report --print` imports: {total_ms:.1f} ms "
+          f"(slowest: {', '.join(f'{name} {micros / 1000:.1f}ms' for name, micros in slowest)})")
+    for heavy in ('selenium', 'flask', 'requests'):
+        assert heavy not in added, f"{heavy} imported at start-up"
+    assert total_ms < MAX_IMPORT_MS
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("CLI Test")
+    print("=" * 40)
+
+    test_parser()
+    test_report_starts_without_browser_stack()
+
+    print("\n🎉 All CLI tests passed!")
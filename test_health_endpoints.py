@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the /health and /ready endpoints backed by the scheduler status snapshot
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import MeterReading
+from run_status import RunStatus
+import keep_alive
+
+def use_fresh_status():
+    status = RunStatus()
+    keep_alive.run_status = status
+    return status, keep_alive.app.test_client()
+
+def test_not_ready_before_scheduler_starts():
+    print("=== Testing /ready Before Scheduler Start ===")
+    status, client = use_fresh_status()
+
+    response = client.get('/ready')
+    print(f"Status code: {response.status_code}, body: {response.get_json()}")
+    assert response.status_code == 503
+
+    status.mark_scheduler_started(2)
+    response = client.get('/ready')
+    print(f"After start: {response.status_code}")
+    assert response.status_code == 200
+    print("✅ PASS")
+
+def test_health_reports_run_results():
+    print("\n=== Testing /health Run Results ===")
+    status, client = use_fresh_status()
+
+    status.run_started(2)
+    status.record_meter_result('37226784', MeterReading(account_number='37226784', nickname='Ayon'))
+    assert status.snapshot()['queue']['pending_meters'] == 1
+    status.record_meter_result('37202772', None)
+    status.run_finished('partial')
+
+    body = client.get('/health').get_json()
+    print(f"Health: {body['status']}, meters: {body['meters']}")
+    assert body['status'] == 'healthy'
+    assert body['meters']['37226784']['success'] is True
+    assert body['meters']['37202772']['success'] is False
+    assert body['last_run_duration_seconds'] is not None
+
+    status.run_started(5)
+    status.run_finished('failed', 'Scraping failed for all meters')
+    response = client.get('/health')
+    print(f"After failed run: {response.status_code} {response.get_json()['problems']}")
+    assert response.status_code == 503
+    print("✅ PASS")
+
+def test_stalled_run_is_unhealthy():
+    print("\n=== Testing Stalled Run Detection ===")
+    status, client = use_fresh_status()
+    status.mark_scheduler_started(1)
+    status.stall_seconds = -1  # any running scrape counts as wedged
+    status.run_started(5)
+
+    health = client.get('/health')
+    ready = client.get('/ready')
+    print(f"Health: {health.status_code}, Ready: {ready.status_code}")
+    assert health.status_code == 503
+    assert ready.status_code == 503
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Health Endpoint Test")
+    print("=" * 40)
+
+    test_not_ready_before_scheduler_starts()
+    test_health_reports_run_results()
+    test_stalled_run_is_unhealthy()
+
+    print("\nTest completed!")
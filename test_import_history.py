@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test streaming CSV/JSON history import with deduplication
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import import_history
+from history_store import MeterHistory
+
+def write_file(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+def test_json_formats_stream():
+    print("=== Testing Streaming JSON Parsing ===")
+    directory = tempfile.mkdtemp()
+    original_size = import_history.READ_BUFFER_SIZE
+    # Tiny reads so values straddle buffer boundaries
+    import_history.READ_BUFFER_SIZE = 5
+    try:
+        array = write_file(directory, 'a.json', '[ {"n": 1}, {"n": [2, 3]} ,{"n": "x,]"} ]')
+        lines = write_file(directory, 'b.jsonl', '{"n": 1}\n{"n": 22}\n\n')
+        single = write_file(directory, 'data.json', '{"n": 12345}')
+        assert list(import_history.iter_json_records(array)) == [{"n": 1}, {"n": [2, 3]}, {"n": "x,]"}]
+        assert list(import_history.iter_json_records(lines)) == [{"n": 1}, {"n": 22}]
+        assert list(import_history.iter_json_records(single)) == [{"n": 12345}]
+    finally:
+        import_history.READ_BUFFER_SIZE = original_size
+    print("✅ PASS")
+
+def test_import_deduplicates():
+    print("\n=== Testing Import and Deduplication ===")
+    directory = tempfile.mkdtemp()
+    history = MeterHistory(os.path.join(directory, 'history.db'))
+
+    csv_path = write_file(directory, 'statement.csv',
+                          "Account,Date,Balance\n"
+                          "37226784,2025-08-01 08:00:00,250.5\n"
+                          "37226784,2025-08-02,200\n"
+                          "37226784,2025-08-02,200\n"
+                          ",2025-08-03,150\n")
+    snapshots = [
+        {"account_number": "37226784", "timestamp": "2025-08-01 08:00:00", "remaining_balance": "250.50 BDT"},
+        {"account_number": "37202772", "timestamp": "2025-08-01 09:00:00",
+         "remaining_balance": "Remaining Balance: 89.50 BDT", "reading_time": "Reading time: 1 Aug 2025 00:00"},
+    ]
+    json_path = write_file(directory, 'snapshots.json', json.dumps(snapshots))
+
+    read, inserted, invalid = import_history.import_file(history, csv_path, chunk_size=2)
+    print(f"CSV: read={read} inserted={inserted} invalid={invalid}")
+    assert (read, inserted, invalid) == (4, 2, 1)
+
+    read, inserted, invalid = import_history.import_file(history, json_path, chunk_size=2)
+    print(f"JSON: read={read} inserted={inserted} invalid={invalid}")
+    assert (read, inserted, invalid) == (2, 1, 0)
+
+    rows = history.get_history('37226784')
+    assert [row['timestamp'] for row in rows] == ['2025-08-01 08:00:00', '2025-08-02 00:00:00']
+    assert rows[1]['balance_numeric'] == 200.0
+    assert history.get_latest('37202772')['balance_numeric'] == 89.5
+    history.close()
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("History Import Test")
+    print("=" * 40)
+
+    test_json_formats_stream()
+    test_import_deduplicates()
+
+    print("\n🎉 All import tests passed!")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the read-only meter API (latest values, history, ETags and pagination)
+"""
+
+import os
+import sys
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import history_store
+from history_store import MeterHistory
+import keep_alive
+
+def make_reading(account, timestamp, balance):
+    return {
+        'account_number': account,
+        'nickname': 'Ayon',
+        'timestamp': timestamp,
+        'status': 'success',
+        'remaining_balance': f'Remaining Balance: {balance} BDT',
+        'balance_numeric': balance,
+        'reading_time': 'Reading time: 17 Aug 2025 00:00',
+        'recently_recharged': False,
+    }
+
+def setup_store():
+    db_path = os.path.join(tempfile.mkdtemp(), 'history.db')
+    store = MeterHistory(db_path)
+    history_store._history = store
+    return store, keep_alive.app.test_client()
+
+def test_latest_values_and_etag():
+    print("=== Testing /meters and ETags ===")
+    store, client = setup_store()
+    store.record_readings([
+        make_reading('37226784', '2025-08-16 08:00:00', 150.0),
+        make_reading('37226784', '2025-08-17 08:00:00', 120.0),
+    ])
+
+    response = client.get('/meters')
+    body = response.get_json()
+    print(f"Meters: {body}")
+    assert body['count'] == 1
+    assert body['meters'][0]['balance_numeric'] == 120.0
+
+    etag = response.headers['ETag']
+    cached = client.get('/meters', headers={'If-None-Match': etag})
+    print(f"Conditional request status: {cached.status_code}")
+    assert cached.status_code == 304
+
+    store.record_reading(make_reading('37226784', '2025-08-18 08:00:00', 90.0))
+    fresh = client.get('/meters/37226784', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.get_json()['balance_numeric'] == 90.0
+
+    assert client.get('/meters/00000000').status_code == 404
+    print("✅ PASS")
+
+def test_history_pagination():
+    print("\n=== Testing /meters/<account>/history ===")
+    store, client = setup_store()
+    store.record_readings([
+        make_reading('37202772', f'2025-08-{day:02d} 08:00:00', 500.0 - day * 10)
+        for day in range(1, 11)
+    ])
+    # Duplicate (account, timestamp) rows are ignored
+    assert store.record_reading(make_reading('37202772', '2025-08-01 08:00:00', 1.0)) is False
+
+    page = client.get('/meters/37202772/history?from=2025-08-03&to=2025-08-08&limit=4').get_json()
+    print(f"Page 1: total={page['total']} count={len(page['readings'])} next={page['next']}")
+    assert page['total'] == 6
+    assert len(page['readings']) == 4
+    assert page['readings'][0]['timestamp'] == '2025-08-03 08:00:00'
+
+    second = client.get(page['next']).get_json()
+    print(f"Page 2: count={len(second['readings'])} next={second['next']}")
+    assert len(second['readings']) == 2
+    assert second['next'] is None
+
+    assert client.get('/meters/37202772/history?limit=abc').status_code == 400
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Meter API Test")
+    print("=" * 40)
+
+    test_latest_values_and_etag()
+    test_history_pagination()
+
+    print("\nTest completed!")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test per-meter policies in classification, recharge detection and message formatting
+"""
+
+import os
+import sys
+from datetime import datetime
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import meter_policy
+from meter_policy import PolicyTable, parse_quiet_hours
+from models import MeterReading
+from scraper import ElectricityMeterScraper
+from telegram_bot import TelegramBot
+
+CONFIG = {
+    "default": {"warning": 100, "critical": 40, "quiet_hours": "23:00-06:30"},
+    "Piyal": {"warning": 250, "notice": 800, "recharge_min": 1000},
+    "37202772": {"critical": 0},
+}
+
+def test_policy_lookup():
+    print("=== Testing Policy Table ===")
+    table = PolicyTable(CONFIG)
+    piyal = table.get('37226785', 'Piyal')
+    print(f"Piyal: {piyal}")
+    assert piyal.warning_balance == 250 and piyal.critical_balance == 40
+    assert table.get('37202772').critical_balance == 0
+    assert table.get('37195501', 'Payel') is table.default
+    assert parse_quiet_hours("23:00-06:30") == (1380, 390)
+    assert table.default.is_quiet(datetime(2025, 8, 17, 2, 0))
+    assert not table.default.is_quiet(datetime(2025, 8, 17, 6, 30))
+    assert [piyal.level(b) for b in (30, 200, 700, 900, None)] == ['critical', 'low', 'notice', 'ok', None]
+    print("✅ PASS")
+
+def test_policies_applied_everywhere():
+    print("\n=== Testing Policies in Scraper and Telegram ===")
+    original = meter_policy._policy_table
+    meter_policy._policy_table = PolicyTable(CONFIG)
+    try:
+        scraper = ElectricityMeterScraper()
+        bot = TelegramBot()
+        piyal = MeterReading(account_number='37226785', nickname='Piyal', balance=200.0,
+                             timestamp=datetime(2025, 8, 17, 10, 0), balance_text='200.00 BDT')
+        payel = MeterReading(account_number='37195501', nickname='Payel', balance=200.0,
+                             timestamp=datetime(2025, 8, 17, 10, 0), balance_text='200.00 BDT')
+        warnings, recharged, all_data = [], [], []
+        scraper.classify_meter_data('37226785', piyal, warnings, recharged, all_data)
+        scraper.classify_meter_data('37195501', payel, warnings, recharged, all_data)
+        assert [w.account_number for w in warnings] == ['37226785']
+
+        assert "🚨" in bot.format_meter_data(piyal)
+        assert "⚠️" in bot.format_meter_data(payel)
+
+        # Piyal only counts recharges of 1000+ BDT
+        small = MeterReading(account_number='37226785', nickname='Piyal', balance=80.0, recharge_amount=600.0,
+                             reading_at=datetime(2025, 8, 17, 0, 0), recharged_at=datetime(2025, 8, 17, 15, 0))
+        assert not scraper.apply_smart_recharge_logic(small).recently_recharged
+        small.recharge_amount = 1000.0
+        assert scraper.apply_smart_recharge_logic(small).recently_recharged
+    finally:
+        meter_policy._policy_table = original
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Meter Policy Test")
+    print("=" * 40)
+
+    test_policy_lookup()
+    test_policies_applied_everywhere()
+
+    print("\n🎉 All policy tests passed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test the typed meter result records
+"""
+
+import os
+import pickle
+import sys
+from datetime import datetime
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import MeterReading, RechargeEvent, BalanceWarning, parse_amount, parse_datetime
+from scraper import ElectricityMeterScraper
+
+LEGACY_DATA = {
+    "timestamp": "2025-08-17 10:30:00",
+    "account_number": "37226784",
+    "nickname": "Ayon",
+    "status": "success",
+    "remaining_balance": "Remaining Balance: -36.3 BDT",
+    "reading_time": "Reading time: 17 Aug 2025 00:00",
+    "last_recharge_amount": "Last Recharge: 1,000.00 BDT",
+    "last_recharge_date": "Recharge time: 17 Aug 2025 15:16",
+}
+
+def test_parsing_happens_once():
+    print("=== Testing MeterReading Parsing ===")
+    reading = MeterReading.from_dict(LEGACY_DATA)
+    print(f"Reading: {reading}")
+    assert reading.balance == -36.3
+    assert reading.recharge_amount == 1000.0
+    assert reading.reading_at == datetime(2025, 8, 17, 0, 0)
+    assert reading.recharged_at == datetime(2025, 8, 17, 15, 16)
+    assert reading.timestamp == datetime(2025, 8, 17, 10, 30)
+    assert parse_amount("Not found") is None
+    assert parse_datetime("no date here") is None
+    assert not hasattr(reading, '__dict__')
+    print("✅ PASS")
+
+def test_negative_balances():
+    print("\n=== Testing Negative Balance Parsing ===")
+    assert parse_amount("Remaining Balance: -36.3 BDT") == -36.3
+    assert parse_amount("-1,250.50 BDT") == -1250.5
+    assert parse_amount("Remaining Balance: 36.3 BDT") == 36.3
+    # A hyphen joined to a word is a separator, not a sign
+    assert parse_amount("Jul-2025 usage") == 2025.0
+    assert parse_amount("Balance - 36.3 BDT") == 36.3
+    # Implausible amounts are skipped in either direction
+    assert parse_amount("-25000 BDT then -12 BDT") == -12.0
+    reading = MeterReading.from_dict(dict(LEGACY_DATA, remaining_balance="Remaining Balance: -5.00 BDT"))
+    assert reading.balance == -5.0 and reading.to_dict()["balance_numeric"] == -5.0
+    print("✅ PASS")
+
+def test_round_trip_keeps_legacy_keys():
+    print("\n=== Testing data.json Round Trip ===")
+    reading = MeterReading.from_dict(LEGACY_DATA)
+    data = reading.to_dict()
+    for key, value in LEGACY_DATA.items():
+        assert data[key] == value, key
+    assert data["balance_numeric"] == -36.3
+    assert MeterReading.from_dict(data) == reading
+    assert pickle.loads(pickle.dumps(reading)) == reading
+    print("✅ PASS")
+
+def test_smart_recharge_and_classification():
+    print("\n=== Testing Classification With Records ===")
+    scraper = ElectricityMeterScraper()
+    reading = scraper.apply_smart_recharge_logic(MeterReading.from_dict(LEGACY_DATA))
+    assert reading.recently_recharged
+
+    low = MeterReading(account_number="37202772", nickname="Arif", balance=45.2,
+                       balance_text="45.20 BDT", timestamp=datetime(2025, 8, 17, 10, 30))
+    warnings, recharged, all_data = [], [], []
+    scraper.classify_meter_data("37226784", reading, warnings, recharged, all_data)
+    scraper.classify_meter_data("37202772", low, warnings, recharged, all_data)
+    scraper.classify_meter_data("37195501", None, warnings, recharged, all_data)
+
+    assert recharged == [RechargeEvent.from_reading(reading)]
+    assert warnings == [BalanceWarning.from_reading(low, 'critical')]
+    assert all_data == [reading, low]
+    assert BalanceWarning.from_dict(warnings[0].to_dict()) == warnings[0]
+    assert recharged[0].to_dict()["recharge_amount"] == 1000.0
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Meter Record Test")
+    print("=" * 40)
+
+    test_parsing_happens_once()
+    test_negative_balances()
+    test_round_trip_keeps_legacy_keys()
+    test_smart_recharge_and_classification()
+
+    print("\n🎉 All record tests passed!")
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Test concurrent scraping in isolated browser contexts of one shared browser
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import circuit_breaker
+from models import MeterReading
+from multi_context import MultiContextScraper, SharedBrowser
+from network_capture import BALANCE, NetworkCapture
+from scraper import BrowserEngine, ElectricityMeterScraper
+
+URL = 'https://portal.context-test.invalid/login'
+PAGE_SECONDS = 0.2
+
+class FakeElement:
+    def __init__(self, driver, handle, text):
+        self.driver = driver
+        self.handle = handle
+        self.id = f"{handle}-element"
+        self._text = text
+
+    @property
+    def text(self):
+        # A real WebDriver can't reach an element in a window other than the current one
+        if self.driver.current_window_handle != self.handle:
+            raise Exception("stale element reference: element is not in the current window")
+        return self._text
+
+    def get_attribute(self, name):
+        return None
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+class FakeChrome:
+    """One browser process: windows belong to CDP browser contexts with their own cookies"""
+
+    def __init__(self):
+        self.current_window_handle = 'main'
+        self.switch_to = FakeSwitchTo(self)
+        self.urls = {}
+        self.cookies = {}
+        self.contexts = set()
+        self.closed = []
+        self.quit_called = False
+        self.loaded_at = {}
+
+    def execute_cdp_cmd(self, command, params):
+        if command in ('Page.navigate', 'Page.reload'):
+            # Returns at once; the page finishes loading PAGE_SECONDS later
+            handle = self.current_window_handle
+            self.urls[handle] = params.get('url', self.urls.get(handle))
+            self.loaded_at[handle] = time.monotonic() + PAGE_SECONDS
+            return {'frameId': handle}
+        if command == 'Target.createBrowserContext':
+            context_id = f"context-{len(self.contexts) + len(self.closed)}"
+            self.contexts.add(context_id)
+            return {'browserContextId': context_id}
+        if command == 'Target.createTarget':
+            return {'targetId': f"tab-{params['browserContextId']}"}
+        if command == 'Target.disposeBrowserContext':
+            self.contexts.discard(params['browserContextId'])
+            self.closed.append(params['browserContextId'])
+        return {}
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        # Like WebDriver: blocks until the page has loaded
+        time.sleep(PAGE_SECONDS)
+        self.urls[self.current_window_handle] = url
+
+    def add_cookie(self, cookie):
+        self.cookies[self.current_window_handle] = cookie['value']
+
+    def execute_script(self, script, *args):
+        if script == "return document.readyState":
+            return 'complete' if time.monotonic() >= self.loaded_at.get(self.current_window_handle, 0) else 'loading'
+        return None
+
+    def find_elements(self, by, value):
+        handle = self.current_window_handle
+        return [FakeElement(self, handle, f"{self.urls.get(handle)} as {self.cookies.get(handle)}")]
+
+    def quit(self):
+        self.quit_called = True
+
+class FakeChromeEngine(BrowserEngine):
+    name = 'fake-chrome'
+
+    def __init__(self):
+        self.browser = None
+
+    def create_driver(self):
+        self.browser = FakeChrome()
+        return self.browser
+
+class TabScraper(ElectricityMeterScraper):
+    """scrape_account against whatever driver the engine hands out, with a page load that takes real time"""
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def scrape_account(self, account_number, website_url):
+        self.account_number = account_number
+        self.setup_driver()
+        try:
+            self.driver.get(f"{website_url}?account={account_number}")
+            self.driver.add_cookie({'name': 'session', 'value': account_number})
+            with TabScraper.lock:
+                TabScraper.active += 1
+                TabScraper.peak = max(TabScraper.peak, TabScraper.active)
+            time.sleep(PAGE_SECONDS)
+            with TabScraper.lock:
+                TabScraper.active -= 1
+            page = self.driver.find_elements('xpath', '//*')[0].text
+            assert page == f"{website_url}?account={account_number} as {account_number}", page
+            return MeterReading(account_number=account_number, nickname=self.get_meter_nickname(account_number),
+                                balance=300.0, timestamp=datetime(2025, 8, 17, 8, 0))
+        finally:
+            self.driver.quit()
+            self.driver = None
+
+class CapturingChrome(FakeChrome):
+    """A FakeChrome whose one performance log holds every tab's network events, tagged with the tab's target id"""
+
+    def __init__(self):
+        super().__init__()
+        self.performance_log = []
+        self.bodies = {}
+
+    def respond(self, handle, request_id, url, body):
+        for method, params in (
+            ('Network.responseReceived', {'requestId': request_id, 'response': {'url': url, 'status': 200}}),
+            ('Network.loadingFinished', {'requestId': request_id}),
+        ):
+            message = {'message': {'method': method, 'params': params}, 'webview': handle}
+            self.performance_log.append({'level': 'INFO', 'message': json.dumps(message)})
+        # Request ids are only unique within a tab
+        self.bodies[(handle, request_id)] = body
+
+    def get_log(self, log_type):
+        entries, self.performance_log = self.performance_log, []
+        return entries
+
+    def execute_cdp_cmd(self, command, params):
+        if command == 'Network.getResponseBody':
+            return {'body': json.dumps(self.bodies[(self.current_window_handle, params['requestId'])])}
+        return super().execute_cdp_cmd(command, params)
+
+class CapturingChromeEngine(FakeChromeEngine):
+    def create_driver(self):
+        self.browser = CapturingChrome()
+        return self.browser
+
+def test_network_capture_per_tab():
+    print("\n=== Testing Network Capture in Two Tabs ===")
+    engine = CapturingChromeEngine()
+    browser = SharedBrowser(engine)
+    chrome = engine.browser
+    tabs = {account: browser.open_context() for account in ('37226784', '37202772')}
+    captures = {account: NetworkCapture(tab, account) for account, tab in tabs.items()}
+    url = 'https://portal.context-test.invalid/api/tkdes/customer/getBalance?accountNo={}'
+
+    # Both dashboards load at once; the first tab drains the log before the second looks
+    chrome.respond(tabs['37226784'].handle, '1.1', url.format('37226784'), {'balance': 86.5})
+    chrome.respond(tabs['37202772'].handle, '1.1', url.format('37202772'), {'balance': 412.0})
+    assert BALANCE in captures['37226784'].poll()
+    chrome.respond(tabs['37226784'].handle, '1.2', url.format('37226784'), {'balance': 86.0})
+    assert BALANCE in captures['37202772'].poll()
+    captures['37226784'].poll()
+
+    balances = {account: capture.payloads[BALANCE]['balance'] for account, capture in captures.items()}
+    print(f"Captured balances: {balances}")
+    assert balances == {'37226784': 86.0, '37202772': 412.0}
+    for tab in tabs.values():
+        tab.quit()
+    assert browser.performance_logs == {}
+    print("✅ PASS")
+
+def shared_browser(engine):
+    browser = SharedBrowser(engine)
+    browser.page_load_poll = 0.01
+    return browser
+
+def test_page_loads_overlap():
+    print("\n=== Testing Overlapping Page Loads ===")
+    browser = shared_browser(FakeChromeEngine())
+    tabs = [browser.open_context() for _ in range(3)]
+    started = time.perf_counter()
+    threads = [threading.Thread(target=tab.get, args=(f"{URL}?tab={i}",)) for i, tab in enumerate(tabs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(f"3 page loads in {elapsed:.2f}s (one load takes {PAGE_SECONDS}s)")
+    # Loads holding the browser lock would take 3 x PAGE_SECONDS
+    assert elapsed < 2 * PAGE_SECONDS
+    assert [browser.driver.urls[tab.handle] for tab in tabs] == [f"{URL}?tab={i}" for i in range(3)]
+    print("✅ PASS")
+
+def test_deadline_uses_slowest_meter():
+    print("\n=== Testing Run Deadline Across Contexts ===")
+    circuit_breaker._breakers.clear()
+    engine = FakeChromeEngine()
+    scraper = MultiContextScraper(concurrency=3, scraper_factory=TabScraper,
+                                  browser_factory=lambda: shared_browser(engine))
+    # The first 3 meters take ~2 x PAGE_SECONDS; another round wouldn't fit
+    deadline = time.time() + 3 * PAGE_SECONDS
+    warnings, recharged, all_data = scraper.scrape_all_meters(URL, deadline=deadline)
+    print(f"Scraped {len(all_data)}, deferred {scraper.deferred_meters}")
+    assert len(all_data) == 3 and sorted(scraper.deferred_meters) == sorted(scraper.all_meters[3:])
+    assert time.time() <= deadline
+    print("✅ PASS")
+
+def test_contexts_scrape_concurrently():
+    print("=== Testing Multi-Context Scraping ===")
+    circuit_breaker._breakers.clear()
+    engine = FakeChromeEngine()
+    scraper = MultiContextScraper(concurrency=3, scraper_factory=TabScraper,
+                                  browser_factory=lambda: shared_browser(engine))
+    reported = []
+    started = time.perf_counter()
+    warnings, recharged, all_data = scraper.scrape_all_meters(
+        URL, progress_callback=lambda account, reading: reported.append(account)
+    )
+    elapsed = time.perf_counter() - started
+    print(f"5 meters in {elapsed:.2f}s with 3 contexts (sequential would be {10 * PAGE_SECONDS:.1f}s), "
+          f"peak {TabScraper.peak} pages loading at once")
+    assert [reading.account_number for reading in all_data] == scraper.all_meters
+    assert sorted(reported) == sorted(scraper.all_meters)
+    assert TabScraper.peak == 3
+    assert elapsed < 10 * PAGE_SECONDS
+    # Every context was disposed and the one browser process shut down
+    assert len(engine.browser.closed) == 5 and not engine.browser.contexts
+    assert engine.browser.quit_called
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Multi-Context Test")
+    print("=" * 40)
+
+    test_contexts_scrape_concurrently()
+    test_network_capture_per_tab()
+    test_page_loads_overlap()
+    test_deadline_uses_slowest_meter()
+
+    print("\n🎉 All multi-context tests passed!")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test reading the dashboard's balance and recharge XHR JSON from Chrome's network log
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import circuit_breaker
+from network_capture import reading_from_payloads
+from scraper import BrowserEngine, ChromeEngine, ElectricityMeterScraper
+
+URL = 'https://portal.capture-test.invalid/customer/#/customer-login'
+API = 'https://portal.capture-test.invalid/api/tkdes/customer'
+
+BALANCE_JSON = {"code": 200, "data": {"accountNo": "37226784", "balance": 86.5,
+                                      "readingTime": "2025-08-17 00:00:00"}}
+RECHARGE_JSON = {"code": 200, "data": [
+    {"rechargeDate": "2025-08-10 09:30:00", "totalAmount": 1000, "orderID": "A1"},
+    {"rechargeDate": "2025-08-17 15:16:00", "totalAmount": 3000, "orderID": "A2"},
+]}
+
+def event(method, **params):
+    return {'level': 'INFO', 'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+def response(request_id, url):
+    return [
+        event('Network.responseReceived', requestId=request_id,
+              response={'url': url, 'status': 200, 'mimeType': 'application/json'}),
+        event('Network.loadingFinished', requestId=request_id),
+    ]
+
+class FakeDriver:
+    """A Chrome whose performance log replays the dashboard's XHRs, one batch per get_log call"""
+
+    def __init__(self, batches, bodies):
+        self.batches = list(batches)
+        self.bodies = bodies
+        self.text_reads = 0
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get_log(self, log_type):
+        assert log_type == 'performance'
+        return self.batches.pop(0) if self.batches else []
+
+    def execute_cdp_cmd(self, command, params):
+        assert command == 'Network.getResponseBody'
+        return {'body': json.dumps(self.bodies[params['requestId']]), 'base64Encoded': False}
+
+    def find_elements(self, by, value):
+        self.text_reads += 1
+        return []
+
+    def quit(self):
+        pass
+
+class FakeEngine(BrowserEngine):
+    name = 'fake-chrome'
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def create_driver(self):
+        return self.driver
+
+class CaptureScraper(ElectricityMeterScraper):
+    def __init__(self, driver):
+        super().__init__()
+        self.capture_xhr = True
+        self.reuse_sessions = False
+        self.engine = FakeEngine(driver)
+
+    def login(self, website_url):
+        return True
+
+    def setup_driver(self):
+        super().setup_driver()
+        if self.network_capture:
+            self.network_capture.poll_interval = 0.01
+            self.network_capture.timeout = 0.3
+            self.network_capture.recharge_grace = 0.05
+        return True
+
+def scrape(scraper, account_number='37226784'):
+    original_sleep = time.sleep
+    # Only the fixed page-render waits are skipped; the capture's own polling still takes real time
+    time.sleep = lambda seconds: original_sleep(min(seconds, 0.01))
+    try:
+        return scraper.scrape_account(account_number, URL)
+    finally:
+        time.sleep = original_sleep
+
+def test_reading_from_captured_xhrs():
+    print("=== Testing XHR Capture ===")
+    circuit_breaker._breakers.clear()
+    driver = FakeDriver(
+        batches=[
+            # Login traffic and another account's responses are ignored
+            response('1', f"{API}/login") + response('2', f"{API}/getBalance?accountNo=37202772&meterNo="),
+            [],
+            response('3', f"{API}/getBalance?accountNo=37226784&meterNo="),
+            response('4', f"{API}/getRechargeHistory?accountNo=37226784&meterNo=&dateFrom=2025-07-18"),
+        ],
+        bodies={'1': {}, '2': {"data": {"balance": 999}}, '3': BALANCE_JSON, '4': RECHARGE_JSON},
+    )
+    started = time.perf_counter()
+    reading = scrape(CaptureScraper(driver))
+    elapsed = time.perf_counter() - started
+    print(f"Captured reading in {elapsed:.2f}s: {reading.balance_text}, recharge {reading.recharge_amount_text} "
+          f"on {reading.recharge_date_text}")
+    assert reading.succeeded
+    assert reading.balance == 86.5 and reading.balance_text == '86.50 BDT'
+    assert reading.reading_at == datetime(2025, 8, 17, 0, 0)
+    assert reading.recharge_amount == 3000.0 and reading.recharged_at == datetime(2025, 8, 17, 15, 16)
+    assert reading.recharge_date_text == '17 Aug 2025 15:16'
+    # Same-day recharge after the midnight reading is still detected
+    assert reading.recently_recharged
+    # Both responses landed, so neither the timeout nor the rendered page was waited for
+    assert driver.text_reads == 0
+    assert elapsed < 0.3
+    print("✅ PASS")
+
+def test_falls_back_to_page_text():
+    print("\n=== Testing Capture Fallback ===")
+    circuit_breaker._breakers.clear()
+    driver = FakeDriver(batches=[response('1', f"{API}/login")], bodies={'1': {}})
+    reading = scrape(CaptureScraper(driver))
+    assert driver.text_reads > 0
+    assert reading.balance_text == 'Not found'
+    # Balance without a recharge response still gives a reading
+    reading = reading_from_payloads('37226784', 'Ayon', BALANCE_JSON)
+    assert reading.balance == 86.5 and reading.recharge_amount is None
+    assert reading.recharge_amount_text == 'Not found'
+    assert reading_from_payloads('37226784', 'Ayon', {"code": 400, "data": None}) is None
+    print("✅ PASS")
+
+def test_chrome_options_enable_performance_log():
+    print("\n=== Testing Performance Log Option ===")
+    os.environ['XHR_CAPTURE'] = 'true'
+    try:
+        capabilities = ChromeEngine().build_options().to_capabilities()
+    finally:
+        del os.environ['XHR_CAPTURE']
+    assert capabilities['goog:loggingPrefs'] == {'performance': 'ALL'}
+    assert 'goog:loggingPrefs' not in ChromeEngine().build_options().to_capabilities()
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Network Capture Test")
+    print("=" * 40)
+
+    test_reading_from_captured_xhrs()
+    test_falls_back_to_page_text()
+    test_chrome_options_enable_performance_log()
+
+    print("\n🎉 All network capture tests passed!")
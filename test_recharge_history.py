@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test incremental recharge history / monthly consumption sync
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import circuit_breaker
+from history_store import MeterHistory
+from recharge_history import RechargeHistorySync
+
+RECHARGES = [
+    {"rechargeDate": "2025-08-01 10:15:00", "totalAmount": 1000, "orderID": "A1"},
+    {"rechargeDate": "2025-08-09 19:40:00", "totalAmount": 500.0, "orderID": "A2"},
+]
+MONTHS = [
+    {"month": "2025-07", "consumedUnit": 210.5, "consumedTaka": 1620.3},
+    {"month": "2025-08", "consumedUnit": 80, "consumedTaka": 610},
+]
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+class FakePortal:
+    """Serves RECHARGES / MONTHS filtered by the query's date range, like the portal API"""
+
+    def __init__(self):
+        self.recharges = list(RECHARGES)
+        self.months = list(MONTHS)
+        self.queries = []
+
+    def get(self, url, timeout=None):
+        query = {key: values[0] for key, values in parse_qs(urlparse(url).query, keep_blank_values=True).items()}
+        self.queries.append(query)
+        if 'dateFrom' in query:
+            rows = [r for r in self.recharges if query['dateFrom'] <= r['rechargeDate'][:10] <= query['dateTo']]
+        else:
+            rows = [m for m in self.months if query['monthFrom'] <= m['month'] <= query['monthTo']]
+        return FakeResponse({"code": 200, "data": rows})
+
+def test_incremental_sync():
+    print("=== Testing Incremental Recharge History Sync ===")
+    circuit_breaker._breakers.clear()
+    history = MeterHistory(os.path.join(tempfile.mkdtemp(), 'history.db'))
+    portal = FakePortal()
+    sync = RechargeHistorySync(history, session=portal, meter_nicknames={'37226784': 'Ayon'})
+    today = datetime(2025, 8, 10, 9, 0)
+
+    assert sync.sync_recharges('37226784', today) == 2
+    assert sync.sync_consumption('37226784', today) == 2
+    assert portal.queries[0]['dateFrom'] == '2024-08-10'
+
+    # Second run: only the day of the mark onwards is requested, nothing is stored twice
+    portal.recharges.append({"rechargeDate": "2025-08-10 08:05:00", "totalAmount": "2,000.00", "orderID": "A3"})
+    portal.months[1] = {"month": "2025-08", "consumedUnit": 95, "consumedTaka": 725}
+    assert sync.sync_recharges('37226784', today) == 1
+    assert portal.queries[2]['dateFrom'] == '2025-08-09'
+    assert sync.sync_consumption('37226784', today) == 1
+    assert portal.queries[3]['monthFrom'] == '2025-08'
+
+    events = history.get_recharge_events('37226784')
+    print(f"Stored recharges: {[(e['recharged_at'], e['amount']) for e in events]}")
+    assert [e['amount'] for e in events] == [1000.0, 500.0, 2000.0]
+    assert events[0]['nickname'] == 'Ayon' and events[0]['reference'] == 'A1'
+
+    months = history.get_monthly_consumption('37226784')
+    print(f"Stored months: {months}")
+    assert [(m['month'], m['units']) for m in months] == [('2025-07', 210.5), ('2025-08', 95.0)]
+    history.close()
+    print("✅ PASS")
+
+def test_sync_all_isolates_failures():
+    print("\n=== Testing Sync Failure Isolation ===")
+    circuit_breaker._breakers.clear()
+    history = MeterHistory(os.path.join(tempfile.mkdtemp(), 'history.db'))
+
+    class FlakyPortal(FakePortal):
+        def get(self, url, timeout=None):
+            if 'accountNo=37202772' in url:
+                raise ConnectionError("portal timeout")
+            return super().get(url, timeout)
+
+    sync = RechargeHistorySync(history, session=FlakyPortal())
+    # Reach back far enough to cover the fixture dates
+    sync.initial_days = (datetime.now() - datetime(2025, 1, 1)).days
+    results = sync.sync_all(['37202772', '37226784'])
+    print(f"Results: {results}")
+    assert 'error' in results['37202772']
+    assert results['37226784']['months'] == 2
+    history.close()
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Recharge History Sync Test")
+    print("=" * 40)
+
+    test_incremental_sync()
+    test_sync_all_isolates_failures()
+
+    print("\n🎉 All recharge history tests passed!")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test offline re-extraction of archived snapshots and the diff against stored readings
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import reextract
+from extraction import reading_from_texts
+from history_store import MeterHistory
+from reextract import ReExtractor
+from snapshot_archive import SnapshotArchive
+
+START = datetime(2025, 8, 1, 8, 0)
+
+def dashboard_texts(balance, minute):
+    return [
+        f"Remaining Balance: {balance:.2f} BDT",
+        f"Reading time: 17 Aug 2025 00:{minute:02d}",
+        "3,000.00 BDT",
+        "10 Jul 2025 11:05",
+    ]
+
+def build_archive(pages):
+    """An archive of `pages` snapshots plus the readings that were stored for them at scrape time"""
+    directory = tempfile.mkdtemp()
+    archive = SnapshotArchive(os.path.join(directory, 'snapshots'), retention_days=0)
+    history = MeterHistory(os.path.join(directory, 'history.db'))
+    readings = []
+    for i in range(pages):
+        account_number = ('37226784', '37202772')[i % 2]
+        captured_at = START + timedelta(minutes=30 * i)
+        # Every tenth page repeats the previous one's content, as an unchanged dashboard would
+        page = i - 1 if i % 10 == 1 else i
+        texts = dashboard_texts(100 + page, page % 60)
+        archive.put(account_number, {"url": "https://example.test/dashboard", "texts": texts},
+                    run_id=f"run-{i // 2}", captured_at=captured_at)
+        readings.append(reading_from_texts(texts, account_number, timestamp=captured_at - timedelta(seconds=4)))
+    history.record_readings(readings)
+    return archive, history
+
+def test_unchanged_rules_have_no_diffs():
+    print("=== Testing Re-extraction Without Rule Changes ===")
+    archive, history = build_archive(40)
+    results = list(ReExtractor(archive, history, workers=1).run(archive.entries()))
+    assert len(results) == 40
+    assert all(result["stored_timestamp"] and result["changes"] == {} for result in results)
+    assert not any(result["error"] for result in results)
+    print("✅ PASS")
+
+def test_every_stored_reading_in_range_is_matched():
+    print("\n=== Testing Stored Readings Beyond One Page ===")
+    archive, history = build_archive(3)
+    entries = archive.entries(account_number='37226784')
+    # A reading every 15s between the meter's two snapshots, far more than one page of history
+    first, last = (datetime.fromisoformat(entry['captured_at']) for entry in entries)
+    extra = [reading_from_texts(dashboard_texts(500, 0), '37226784', timestamp=first + timedelta(seconds=15 * i + 5))
+             for i in range(int((last - first).total_seconds() // 15) - 1)]
+    history.record_readings(extra)
+    stored = reextract.StoredReadings(history, entries, 300)
+    stored_readings = len(stored.readings['37226784'][0])
+    print(f"Loaded {stored_readings} stored readings for {len(entries)} snapshots")
+    # Both snapshots' own readings plus every extra one
+    assert stored_readings == len(extra) + 2
+    assert stored.find('37226784', last)['timestamp'] == (last - timedelta(seconds=4)).strftime('%Y-%m-%d %H:%M:%S')
+    history.close()
+    print("✅ PASS")
+
+def test_changed_rule_is_reported():
+    print("\n=== Testing Re-extraction Diff ===")
+    archive, history = build_archive(20)
+    original = reextract.extract_fields
+
+    def fixed_rules(texts, log=None):
+        # A fix that stops taking the 3,000 recharge from unlabelled text
+        fields = original(texts, log)
+        fields["last_recharge_amount"] = "Not found"
+        return fields
+
+    reextract.extract_fields = fixed_rules
+    try:
+        results = list(ReExtractor(archive, history, workers=1).run(archive.entries(account_number='37226784')))
+    finally:
+        reextract.extract_fields = original
+    assert len(results) == 10
+    for result in results:
+        assert result["changes"] == {
+            "last_recharge_amount": ["3,000.00 BDT", "Not found"],
+            "recharge_amount_numeric": [3000.0, None],
+        }, result["changes"]
+    print("✅ PASS")
+
+def test_process_pool_throughput():
+    print("\n=== Testing Re-extraction in a Process Pool ===")
+    archive, history = build_archive(2000)
+    reextractor = ReExtractor(archive, history, workers=2)
+    reextractor.min_pool_pages = 0
+    started = time.perf_counter()
+    results = list(reextractor.run(archive.entries()))
+    elapsed = time.perf_counter() - started
+    distinct = len({result["sha256"] for result in results})
+    print(f"{len(results)} snapshots ({distinct} distinct pages) in {elapsed:.2f}s with 2 workers")
+    assert len(results) == 2000 and distinct < 2000
+    assert sum(1 for result in results if result["changes"] == {}) == 2000
+    # Tens of thousands of snapshots should take minutes at most
+    assert elapsed < 30
+    print("✅ PASS")
+
+def test_cli_streams_json_lines():
+    print("\n=== Testing reextract CLI ===")
+    archive, history = build_archive(6)
+    # A page archived without a matching stored reading (e.g. the scrape crashed before saving)
+    archive.put('37226784', {"texts": ["Remaining Balance: 5.00 BDT"]}, captured_at=START + timedelta(days=30))
+    archive.put('37226784', {"url": "https://example.test/broken"}, captured_at=START + timedelta(days=31))
+    output = os.path.join(tempfile.mkdtemp(), 'results.jsonl')
+    status = reextract.main(['--archive', archive.root, '--db', history.db_path, '--output', output, '--all',
+                             '--workers', '1'])
+    with open(output) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 8
+    assert lines[6]["stored_timestamp"] is None and lines[6]["fields"]["balance_numeric"] == 5.0
+    assert lines[7]["error"].startswith("ValueError")
+    assert status == 1
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Re-extraction Test")
+    print("=" * 40)
+
+    test_unchanged_rules_have_no_diffs()
+    test_every_stored_reading_in_range_is_matched()
+    test_changed_rule_is_reported()
+    test_process_pool_throughput()
+    test_cli_streams_json_lines()
+
+    print("\n🎉 All re-extraction tests passed!")
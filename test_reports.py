@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test weekly/monthly digests rendered from rollups, and the report cache
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from history_store import MeterHistory
+from models import MeterReading, RechargeEvent
+from reports import DigestReporter, period_bounds
+
+NICKNAMES = {'37226784': 'Ayon', '37202772': 'Arif'}
+
+class RecordingBot:
+    def __init__(self):
+        self.messages = []
+        self.photos = []
+
+    def send_message(self, message):
+        self.messages.append(message)
+        return True
+
+    def send_photo(self, photo, caption=None):
+        self.photos.append(photo)
+        return True
+
+def make_history():
+    history = MeterHistory(os.path.join(tempfile.mkdtemp(), 'history.db'))
+    readings = []
+    # Ayon burns 50 BDT/day and Arif 20 BDT/day through August 2025
+    for day in range(31):
+        at = datetime(2025, 8, 1, 8, 0) + timedelta(days=day)
+        readings.append(MeterReading(account_number='37226784', balance=2000.0 - 50 * day, timestamp=at))
+        readings.append(MeterReading(account_number='37202772', balance=900.0 - 20 * day, timestamp=at))
+    history.record_readings(readings)
+    history.record_recharge_events([RechargeEvent('37202772', 'Arif', 500.0, datetime(2025, 8, 12, 9, 0))])
+    return history
+
+def test_period_bounds():
+    print("=== Testing Digest Periods ===")
+    assert period_bounds('weekly', date(2025, 8, 18)) == (date(2025, 8, 11), date(2025, 8, 17))
+    assert period_bounds('monthly', date(2025, 9, 1)) == (date(2025, 8, 1), date(2025, 8, 31))
+    assert DigestReporter(None).due_digests(date(2025, 9, 1)) == ['weekly', 'monthly']
+    assert DigestReporter(None).due_digests(date(2025, 9, 2)) == []
+    print("✅ PASS")
+
+def test_weekly_digest():
+    print("\n=== Testing Weekly Digest ===")
+    history = make_history()
+    bot = RecordingBot()
+    reporter = DigestReporter(history, bot, NICKNAMES, charts=False)
+
+    assert reporter.send('weekly', date(2025, 8, 18))
+    message = bot.messages[0]
+    print(message)
+    assert "Ayon (37226784)" in message and "Arif (37202772)" in message
+    assert "Used: 350.00 BDT (50.00/day)" in message
+    assert "Recharges: 1 (500.00 BDT)" in message
+    assert "Total used:</b> 490.00 BDT" in message
+    assert "1,200.00 BDT left lasts ~24 days" in message  # Ayon at 50 BDT/day
+    history.close()
+    print("✅ PASS")
+
+def test_cached_period_is_not_recomputed():
+    print("\n=== Testing Digest Cache ===")
+    history = make_history()
+    reporter = DigestReporter(history, RecordingBot(), NICKNAMES, charts=False)
+    first = reporter.build('monthly', date(2025, 9, 1))
+    assert not first.cached
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached digest should not read rollups")
+    history.get_rollups = fail
+    second = reporter.build('monthly', date(2025, 9, 1))
+    assert second.cached and second.message == first.message
+    print(f"Cached {second.kind} digest for {second.period_start}..{second.period_end}")
+    history.close()
+    print("✅ PASS")
+
+def test_late_data_invalidates_cached_digest():
+    print("\n=== Testing Digest Cache Invalidation ===")
+    history = make_history()
+    reporter = DigestReporter(history, RecordingBot(), NICKNAMES, charts=False)
+    weekly = reporter.build('weekly', date(2025, 8, 18))
+    monthly = reporter.build('monthly', date(2025, 9, 1))
+    assert "Recharges: 1 (500.00 BDT)" in monthly.message
+
+    # A recharge synced from the portal after the digests were built
+    history.record_recharge_events([RechargeEvent('37226784', 'Ayon', 1000.0, datetime(2025, 8, 25, 9, 0))])
+    rebuilt = reporter.build('monthly', date(2025, 9, 1))
+    assert not rebuilt.cached and rebuilt.message != monthly.message
+    assert "Recharges: 1 (1,000.00 BDT)" in rebuilt.message
+    # The earlier week doesn't include that day and stays cached
+    assert reporter.build('weekly', date(2025, 8, 18)).cached
+
+    # A reading stored late for an earlier day changes that week too
+    history.record_readings([MeterReading(account_number='37202772', balance=700.0,
+                                          timestamp=datetime(2025, 8, 13, 20, 0))])
+    again = reporter.build('weekly', date(2025, 8, 18))
+    assert not again.cached and again.message != weekly.message
+    history.close()
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Digest Report Test")
+    print("=" * 40)
+
+    test_period_bounds()
+    test_weekly_digest()
+    test_cached_period_is_not_recomputed()
+    test_late_data_invalidates_cached_digest()
+
+    print("\n🎉 All digest tests passed!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test incremental daily/monthly rollups against a full rebuild
+"""
+
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('HISTORY_DB_PATH', os.path.join(tempfile.mkdtemp(), 'history.db'))
+
+from history_store import MeterHistory
+from models import MeterReading, RechargeEvent
+import keep_alive
+
+def reading(hours, balance, account='37226784'):
+    return MeterReading(account_number=account, nickname='Ayon', balance=balance,
+                        timestamp=datetime(2025, 7, 30, 8, 0) + timedelta(hours=hours))
+
+def test_incremental_rollups():
+    print("=== Testing Incremental Rollups ===")
+    history = MeterHistory(os.path.join(tempfile.mkdtemp(), 'history.db'))
+    # 300 -> 280 (day 1) -> 250 (day 2) -> recharge to 1200 -> 1150 (day 3)
+    history.record_readings([reading(0, 300.0), reading(24, 250.0)])
+    # Backfilled reading lands between the two stored ones
+    history.record_readings([reading(12, 280.0)])
+    history.record_readings([reading(48, 1200.0), reading(50, 1150.0)])
+    history.record_recharge_events([RechargeEvent('37226784', 'Ayon', 1000.0, datetime(2025, 8, 1, 7, 0))])
+
+    days = {row['day']: row for row in history.get_rollups('37226784')}
+    print(f"Daily: {[(d, r['consumption'], r['min_balance'], r['recharge_total']) for d, r in days.items()]}")
+    assert days['2025-07-30']['consumption'] == 20.0
+    assert days['2025-07-31']['consumption'] == 30.0
+    assert days['2025-08-01']['consumption'] == 50.0
+    assert days['2025-08-01']['recharge_total'] == 1000.0
+    assert days['2025-08-01']['min_balance'] == 1150.0
+    assert days['2025-08-01']['closing_balance'] == 1150.0
+
+    months = {row['month']: row for row in history.get_rollups('37226784', 'monthly')}
+    assert months['2025-07']['consumption'] == 50.0
+    assert months['2025-07']['min_balance'] == 250.0
+    assert months['2025-07']['readings'] == 3
+    assert months['2025-08']['recharge_count'] == 1
+    print("✅ PASS")
+
+def test_matches_rebuild():
+    print("\n=== Testing Rollups Match a Full Rebuild ===")
+    history = MeterHistory(os.path.join(tempfile.mkdtemp(), 'history.db'))
+    rng = random.Random(7)
+    readings = [reading(hour * 5, round(rng.uniform(0, 900), 2), rng.choice(['1', '2'])) for hour in range(200)]
+    rng.shuffle(readings)
+    for start in range(0, len(readings), 17):
+        history.record_readings(readings[start:start + 17])
+
+    incremental = [history.get_rollups(account, period) for account in '12' for period in ('daily', 'monthly')]
+    history.rebuild_rollups()
+    rebuilt = [history.get_rollups(account, period) for account in '12' for period in ('daily', 'monthly')]
+    for got, expected in zip(incremental, rebuilt):
+        assert len(got) == len(expected)
+        for a, b in zip(got, expected):
+            assert abs(a['consumption'] - b['consumption']) < 1e-6
+            assert (a['min_balance'], a['closing_balance'], a['readings']) == \
+                   (b['min_balance'], b['closing_balance'], b['readings'])
+    print(f"Compared {sum(len(rows) for rows in rebuilt)} rollup rows")
+    print("✅ PASS")
+
+def test_usage_endpoint():
+    print("\n=== Testing /meters/<account>/usage ===")
+    history = keep_alive.get_history_store()
+    history.record_readings([reading(0, 300.0), reading(30, 210.0)])
+    client = keep_alive.app.test_client()
+
+    response = client.get('/meters/37226784/usage?period=monthly')
+    body = response.get_json()
+    print(f"Usage: {body}")
+    assert body['rollups'][0]['consumption'] == 90.0
+    assert client.get('/meters/37226784/usage?period=monthly',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get('/meters/37226784/usage?period=yearly').status_code == 400
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Rollup Test")
+    print("=" * 40)
+
+    test_incremental_rollups()
+    test_matches_rebuild()
+    test_usage_endpoint()
+
+    print("\n🎉 All rollup tests passed!")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test risk-ordered runs, the per-run time budget and deferred meters
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import circuit_breaker
+from history_store import MeterHistory
+from meter_policy import PolicyTable
+from models import MeterReading
+from run_planner import RunPlanner
+from scraper import ElectricityMeterScraper
+
+URL = 'https://portal.planner-test.invalid/login'
+NOW = datetime(2025, 8, 17, 10, 0)
+
+class SlowScraper(ElectricityMeterScraper):
+    """Each scrape 'takes' 10 seconds of a fake clock instead of launching Chrome"""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.calls = []
+
+    def scrape_account_with_retries(self, account_number, website_url):
+        self.calls.append(account_number)
+        self.clock[0] += 10
+        return MeterReading(account_number=account_number, nickname=self.get_meter_nickname(account_number),
+                            balance=250.0, timestamp=NOW)
+
+def test_riskiest_meters_first():
+    print("=== Testing Risk Ordering ===")
+    history = MeterHistory(os.path.join(tempfile.mkdtemp(), 'history.db'))
+    readings = []
+    # Arif looks richer than Payel, but it was read 3 days ago and burns 100 BDT/day
+    for account_number, balance, burn, read_days_ago in (
+        ('37226784', 900.0, 10.0, 0), ('37202772', 500.0, 100.0, 3), ('37195501', 300.0, 10.0, 0),
+    ):
+        for days_ago in range(10, read_days_ago - 1, -1):
+            readings.append(MeterReading(
+                account_number=account_number, nickname='Test', status='success',
+                balance=balance + burn * (days_ago - read_days_ago), timestamp=NOW - timedelta(days=days_ago, hours=1),
+            ))
+    history.record_readings(readings)
+
+    planner = RunPlanner(history, PolicyTable({}))
+    plan = planner.plan(['37226784', '37202772', '37195501', '37226785'], NOW)
+    print(f"Plan: {[(account, round(balance, 1) if balance is not None else None) for account, balance in plan]}")
+    # Never-read meter first, then Arif (~234 BDT predicted), Payel, Ayon
+    assert [account for account, _ in plan] == ['37226785', '37202772', '37195501', '37226784']
+    assert 200 < plan[1][1] < 300
+    history.close()
+    print("✅ PASS")
+
+def test_time_budget_defers_the_rest():
+    print("\n=== Testing Run Time Budget ===")
+    circuit_breaker._breakers.clear()
+    clock = [1000.0]
+    original_time, original_sleep = time.time, time.sleep
+    time.time = lambda: clock[0]
+    time.sleep = lambda seconds: None
+    try:
+        scraper = SlowScraper(clock)
+        # Room for 3 ten-second meters; the 4th wouldn't finish in time
+        warnings, recharged, all_data = scraper.scrape_all_meters(URL, deadline=clock[0] + 35)
+    finally:
+        time.time, time.sleep = original_time, original_sleep
+    print(f"Scraped {scraper.calls}, deferred {scraper.deferred_meters}")
+    assert scraper.calls == scraper.all_meters[:3]
+    assert scraper.deferred_meters == scraper.all_meters[3:]
+    assert len(all_data) == 3
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Run Planner Test")
+    print("=" * 40)
+
+    test_riskiest_meters_first()
+    test_time_budget_defers_the_rest()
+
+    print("\n🎉 All run planner tests passed!")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test per-meter retries and resuming an interrupted multi-meter run
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import circuit_breaker
+from models import MeterReading
+from run_state import RunState
+from scraper import ElectricityMeterScraper
+
+URL = 'https://portal.resume-test.invalid/login'
+
+class ScriptedScraper(ElectricityMeterScraper):
+    """scrape_account returns results from a script instead of launching Chrome"""
+
+    def __init__(self, failures_before_success=None, crash_on=None):
+        super().__init__()
+        self.retry_base_delay = 0
+        self.failures_before_success = failures_before_success or {}
+        self.crash_on = crash_on
+        self.calls = []
+
+    def scrape_account(self, account_number, website_url):
+        self.calls.append(account_number)
+        if account_number == self.crash_on:
+            raise KeyboardInterrupt("simulated crash")
+        remaining = self.failures_before_success.get(account_number, 0)
+        if remaining:
+            self.failures_before_success[account_number] = remaining - 1
+            return None
+        return MeterReading(
+            account_number=account_number,
+            nickname=self.get_meter_nickname(account_number),
+            balance=250.0,
+            timestamp=datetime(2025, 8, 17, 8, 0),
+        )
+
+def run_without_sleep(func, *args, **kwargs):
+    original_sleep = time.sleep
+    time.sleep = lambda seconds: None
+    try:
+        return func(*args, **kwargs)
+    finally:
+        time.sleep = original_sleep
+
+def test_retries_until_success():
+    print("=== Testing Per-Meter Retries ===")
+    circuit_breaker._breakers.clear()
+    scraper = ScriptedScraper(failures_before_success={'37202772': 2, '37195501': 5})
+
+    warnings, recharged, all_data = run_without_sleep(scraper.scrape_all_meters, URL)
+    scraped = [reading.account_number for reading in all_data]
+    print(f"Calls: {scraper.calls}")
+    print(f"Scraped: {scraped}")
+    assert '37202772' in scraped  # succeeded on the third attempt
+    assert '37195501' not in scraped  # gave up after max_retries
+    assert scraper.calls.count('37195501') == scraper.max_retries + 1
+    print("✅ PASS")
+
+def test_resume_after_crash():
+    print("\n=== Testing Resume After Crash ===")
+    circuit_breaker._breakers.clear()
+    path = os.path.join(tempfile.mkdtemp(), 'run_state.json')
+
+    scraper = ScriptedScraper(crash_on='37226785')
+    state = RunState.load_or_create(scraper.all_meters, path)
+    try:
+        run_without_sleep(scraper.scrape_all_meters, URL, accounts=state.accounts, run_state=state)
+    except KeyboardInterrupt:
+        print("Run crashed at 37226785")
+
+    resumed = RunState.load_or_create(scraper.all_meters, path)
+    print(f"Resumed run {resumed.run_id}, pending: {resumed.pending_accounts()}")
+    assert resumed.resumed and resumed.run_id == state.run_id
+    assert resumed.pending_accounts() == ['37226785', '37202771']
+
+    restarted = ScriptedScraper()
+    warnings, recharged, all_data = run_without_sleep(
+        restarted.scrape_all_meters, URL, accounts=resumed.accounts, run_state=resumed
+    )
+    resumed.finish()
+    print(f"Scraped after restart: {restarted.calls}")
+    assert restarted.calls == ['37226785', '37202771']
+    assert len(all_data) == 5
+    assert RunState.load(path) is None
+    print("✅ PASS")
+
+def test_stale_or_different_run_is_not_resumed():
+    print("\n=== Testing Resume Only Recent, Matching Runs ===")
+    path = os.path.join(tempfile.mkdtemp(), 'run_state.json')
+    meters = ['37226784', '37202772', '37195501']
+    crashed = RunState.load_or_create(meters, path)
+    crashed.record_result('37226784', MeterReading(account_number='37226784', balance=250.0,
+                                                   timestamp=datetime(2025, 8, 17, 8, 0)))
+    started = datetime.strptime(crashed.started_at, "%Y-%m-%d %H:%M:%S")
+
+    # A breaker retry for one meter starts its own run instead of the old full list
+    retry = RunState.load_or_create(['37202772'], path, max_age_seconds=3600, now=started)
+    assert not retry.resumed and retry.accounts == ['37202772']
+
+    # The same meters in a different order still resume
+    crashed.save()
+    resumed = RunState.load_or_create(list(reversed(meters)), path, max_age_seconds=3600, now=started)
+    assert resumed.resumed and resumed.run_id == crashed.run_id
+
+    # Days later, the old balances are dropped and every meter is scraped again
+    stale = RunState.load_or_create(meters, path, max_age_seconds=3600, now=started + timedelta(days=3))
+    print(f"Run after 3 days: {stale.run_id} (crashed run {crashed.run_id}), pending {stale.pending_accounts()}")
+    assert not stale.resumed and stale.run_id != crashed.run_id
+    assert stale.pending_accounts() == meters
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Retry and Resume Test")
+    print("=" * 40)
+
+    test_retries_until_success()
+    test_resume_after_crash()
+    test_stale_or_different_run_is_not_resumed()
+
+    print("\nTest completed!")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test the supervised scrape worker: streaming results, timeouts, RSS ceiling and tree kill
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import circuit_breaker
+from models import MeterReading
+from scrape_worker import IsolatedScraper
+
+URL = 'https://portal.worker-test.invalid/login'
+
+def fake_reading(account_number, balance):
+    return MeterReading(
+        account_number=account_number,
+        nickname='Test',
+        balance=balance,
+        balance_text=f'{balance} BDT',
+        timestamp=datetime(2025, 8, 17, 8, 0),
+    )
+
+def well_behaved_worker(conn, website_url, accounts, run_state_path, breaker_state, deadline=None):
+    for account_number in accounts:
+        conn.send(('meter', account_number, fake_reading(account_number, 50.0 if account_number == '37202772' else 300.0)))
+    conn.send(('done', [], breaker_state))
+    conn.close()
+
+def hang_on_first_attempt_worker(conn, website_url, accounts, run_state_path, breaker_state, deadline=None):
+    os.setsid()
+    conn.send(('meter', accounts[0], fake_reading(accounts[0], 300.0)))
+    if len(accounts) == 5:
+        # Simulates Chrome wedging: a grandchild process plus a hung worker
+        sleeper = subprocess.Popen(['sleep', '60'])
+        with open(os.environ['TEST_GRANDCHILD_PID_FILE'], 'w') as f:
+            f.write(str(sleeper.pid))
+        time.sleep(60)
+    for account_number in accounts[1:]:
+        conn.send(('meter', account_number, fake_reading(account_number, 300.0)))
+    conn.send(('done', [], breaker_state))
+    conn.close()
+
+def memory_hog_worker(conn, website_url, accounts, run_state_path, breaker_state, deadline=None):
+    hog = bytearray(300 * 1024 * 1024)
+    for i in range(0, len(hog), 4096):
+        hog[i] = 1
+    time.sleep(60)
+
+def make_scraper(target, **settings):
+    circuit_breaker._breakers.clear()
+    scraper = IsolatedScraper(worker_target=target)
+    scraper.poll_interval = 0.1
+    for name, value in settings.items():
+        setattr(scraper, name, value)
+    return scraper
+
+def test_results_stream_back():
+    print("=== Testing Worker Results ===")
+    scraper = make_scraper(well_behaved_worker)
+    progress = []
+    warnings, recharged, all_data = scraper.scrape_all_meters(
+        URL, progress_callback=lambda account, data: progress.append(account)
+    )
+    print(f"Progress: {progress}")
+    print(f"Warnings: {[w.account_number for w in warnings]}")
+    assert progress == scraper.all_meters
+    assert len(all_data) == 5
+    assert [w.account_number for w in warnings] == ['37202772']
+    print("✅ PASS")
+
+def test_timeout_kills_tree_and_restarts():
+    print("\n=== Testing Timeout, Tree Kill and Restart ===")
+    pid_file = os.path.join(tempfile.mkdtemp(), 'grandchild.pid')
+    os.environ['TEST_GRANDCHILD_PID_FILE'] = pid_file
+    scraper = make_scraper(hang_on_first_attempt_worker, timeout=3)
+
+    started = time.monotonic()
+    warnings, recharged, all_data = scraper.scrape_all_meters(URL)
+    elapsed = time.monotonic() - started
+    print(f"Finished in {elapsed:.1f}s with {len(all_data)} results")
+    assert elapsed < 20
+    assert len(all_data) == 5
+
+    with open(pid_file) as f:
+        grandchild = int(f.read())
+    alive = os.path.exists(f'/proc/{grandchild}') and 'Z' not in open(f'/proc/{grandchild}/stat').read().split(')')[1].split()[0]
+    print(f"Grandchild {grandchild} still running: {alive}")
+    assert not alive
+    print("✅ PASS")
+
+def test_unrelated_children_not_reaped():
+    print("\n=== Testing Reaping Leaves Other Children Alone ===")
+    # A child owned by other code in the scheduler process that exits while a worker is killed
+    other = subprocess.Popen(['sh', '-c', 'exit 3'])
+    time.sleep(0.2)
+    scraper = make_scraper(hang_on_first_attempt_worker, timeout=3)
+    scraper.scrape_all_meters(URL)
+    returncode = other.wait(timeout=5)
+    print(f"Unrelated child exit status: {returncode}")
+    # A stolen exit status would surface here as 0
+    assert returncode == 3
+    print("✅ PASS")
+
+def test_rss_ceiling():
+    print("\n=== Testing RSS Ceiling ===")
+    scraper = make_scraper(memory_hog_worker, max_rss_mb=150, max_restarts=0, timeout=30)
+    started = time.monotonic()
+    warnings, recharged, all_data = scraper.scrape_all_meters(URL, accounts=['37226784'])
+    elapsed = time.monotonic() - started
+    print(f"Killed after {elapsed:.1f}s, results: {all_data}")
+    assert all_data == []
+    assert elapsed < 20
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Scrape Worker Test")
+    print("=" * 40)
+
+    test_results_stream_back()
+    test_timeout_kills_tree_and_restarts()
+    test_unrelated_children_not_reaped()
+    test_rss_ceiling()
+
+    print("\nTest completed!")
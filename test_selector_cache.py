@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test the login selector cache against a fake WebDriver page
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+import selector_cache
+from selector_cache import SelectorCache
+from scraper import ElectricityMeterScraper
+
+class FakeElement:
+    def __init__(self, text='', attributes=None):
+        self.text = text
+        self.attributes = attributes or {}
+        self.value = ''
+
+    def get_attribute(self, name):
+        return self.attributes.get(name)
+
+    def clear(self):
+        self.value = ''
+
+    def send_keys(self, keys):
+        self.value += keys
+
+class FakeLoginPage:
+    """Minimal driver: selectors in `elements` resolve, everything else misses"""
+
+    title = 'DESCO Customer Login'
+    current_url = 'https://prepaid.desco.org.bd/customer/#/customer-login'
+
+    def __init__(self, elements):
+        self.elements = elements
+        self.lookups = []
+        self.clicked = None
+
+    def get(self, url):
+        pass
+
+    def find_element(self, by, value):
+        self.lookups.append(value)
+        if value in self.elements:
+            return self.elements[value][0]
+        raise NoSuchElementException(value)
+
+    def find_elements(self, by, value):
+        if by == By.CSS_SELECTOR:
+            self.lookups.append(value)
+        return self.elements.get(value, [])
+
+    def execute_script(self, script, *args):
+        if args:
+            self.clicked = args[0]
+
+def make_scraper(elements):
+    scraper = ElectricityMeterScraper()
+    scraper.driver = FakeLoginPage(elements)
+    scraper.cached_selector_timeout = 0.01
+    return scraper
+
+def login_without_sleep(scraper):
+    original_sleep = time.sleep
+    time.sleep = lambda seconds: None
+    try:
+        return scraper.login('https://prepaid.desco.org.bd/customer/#/customer-login')
+    finally:
+        time.sleep = original_sleep
+
+def test_cache_hit_skips_discovery():
+    print("=== Testing Selector Cache Hits ===")
+    cache = SelectorCache(os.path.join(tempfile.mkdtemp(), 'selectors.json'))
+    selector_cache._selector_cache = cache
+
+    account_input = FakeElement(attributes={'placeholder': 'Account No'})
+    login_button = FakeElement('Login')
+    elements = {
+        "input[placeholder*='Account']": [account_input],
+        "input": [account_input],
+        "button.btn-primary": [login_button],
+        "button": [login_button],
+    }
+
+    assert login_without_sleep(make_scraper(elements))
+    site = 'prepaid.desco.org.bd'
+    print(f"Learned selectors: {cache.entries[site]}")
+    assert cache.get(site, 'account_input') == "input[placeholder*='Account']"
+    assert cache.get(site, 'login_button') == "button.btn-primary"
+
+    scraper = make_scraper(elements)
+    assert login_without_sleep(scraper)
+    assert scraper.driver.clicked is login_button
+    stats = SelectorCache(cache.path).stats()[site]
+    print(f"Stats after second login: {stats}")
+    assert stats['account_input']['hits'] == 1
+    assert stats['login_button']['hit_rate'] == 1.0
+    print("✅ PASS")
+
+def test_cache_miss_falls_back():
+    print("\n=== Testing Selector Cache Miss ===")
+    cache = SelectorCache(os.path.join(tempfile.mkdtemp(), 'selectors.json'))
+    selector_cache._selector_cache = cache
+    site = 'prepaid.desco.org.bd'
+    cache.remember(site, 'account_input', 'input.old-layout')
+
+    account_input = FakeElement(attributes={'placeholder': 'Account No'})
+    elements = {
+        "input[placeholder*='Account']": [account_input],
+        "button.btn-primary": [FakeElement('Login')],
+    }
+    scraper = make_scraper(elements)
+    assert login_without_sleep(scraper)
+    assert account_input.value == scraper.account_number
+
+    print(f"Stats: {cache.stats()[site]['account_input']}")
+    assert cache.stats()[site]['account_input']['misses'] == 1
+    assert cache.get(site, 'account_input') == "input[placeholder*='Account']"
+    print("✅ PASS")
+
+def test_missed_selector_not_retried():
+    print("\n=== Testing Cached Selector Left Out of Discovery ===")
+    cache = SelectorCache(os.path.join(tempfile.mkdtemp(), 'selectors.json'))
+    selector_cache._selector_cache = cache
+    site = 'prepaid.desco.org.bd'
+    # Cached selector is also the first discovery selector, and the page no longer matches it
+    cache.remember(site, 'account_input', "input[placeholder*='Account']")
+
+    account_input = FakeElement(attributes={'placeholder': 'Meter No'})
+    elements = {
+        "input[placeholder*='Meter']": [account_input],
+        "button.btn-primary": [FakeElement('Login')],
+    }
+    scraper = make_scraper(elements)
+    started = time.perf_counter()
+    assert login_without_sleep(scraper)
+    elapsed = time.perf_counter() - started
+    print(f"Login after cache miss took {elapsed:.2f}s")
+    # Discovery would otherwise wait the full 5s on the selector that just missed
+    assert elapsed < 2
+    assert cache.get(site, 'account_input') == "input[placeholder*='Meter']"
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Selector Cache Test")
+    print("=" * 40)
+
+    test_cache_hit_skips_discovery()
+    test_cache_miss_falls_back()
+    test_missed_selector_not_retried()
+
+    print("\nTest completed!")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test saving and restoring portal login sessions instead of logging in every scrape
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import circuit_breaker
+import session_cache
+from models import MeterReading
+from scraper import ElectricityMeterScraper
+from session_cache import SessionCache
+
+URL = 'https://portal.session-test.invalid/customer/#/customer-login'
+DASHBOARD = 'https://portal.session-test.invalid/customer/#/customer-dashboard'
+
+class FakePortal:
+    """Server side: which auth tokens are currently accepted"""
+
+    def __init__(self):
+        self.valid_tokens = set()
+        self.issued = 0
+
+class FakeBrowser:
+    """Just enough of a WebDriver for login / session restore"""
+
+    def __init__(self, portal):
+        self.portal = portal
+        self.cookies = {}
+        self.local_storage = {}
+        self.current_url = 'about:blank'
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        self.current_url = url
+
+    def refresh(self):
+        # The SPA bounces unauthenticated visitors back to the login route
+        if self.cookies.get('token') not in self.portal.valid_tokens or 'token' not in self.local_storage:
+            self.current_url = URL
+
+    def delete_all_cookies(self):
+        self.cookies = {}
+
+    def add_cookie(self, cookie):
+        self.cookies[cookie['name']] = cookie['value']
+
+    def get_cookies(self):
+        return [{'name': name, 'value': value, 'path': '/'} for name, value in self.cookies.items()]
+
+    def execute_script(self, script, *args):
+        if script.startswith('return'):
+            return dict(self.local_storage)
+        self.local_storage.update(args[0])
+
+    def find_elements(self, by, value):
+        return ['Remaining Balance'] if self.current_url == DASHBOARD else []
+
+    def quit(self):
+        pass
+
+class PortalScraper(ElectricityMeterScraper):
+    def __init__(self, portal):
+        super().__init__()
+        self.portal = portal
+        self.session_validate_timeout = 0.2
+        self.logins = 0
+
+    def setup_driver(self):
+        self.driver = FakeBrowser(self.portal)
+        return True
+
+    def login(self, website_url):
+        self.logins += 1
+        self.portal.issued += 1
+        token = f"token-{self.portal.issued}"
+        self.portal.valid_tokens.add(token)
+        self.driver.cookies['token'] = token
+        self.driver.local_storage['token'] = token
+        self.driver.current_url = DASHBOARD
+        return True
+
+    def extract_data(self):
+        return MeterReading(account_number=self.account_number, nickname='Ayon', status='success',
+                            balance=250.0, timestamp=datetime(2025, 8, 17, 8, 0))
+
+def scrape(scraper, account_number='37226784'):
+    original_sleep = time.sleep
+    time.sleep = lambda seconds: None
+    try:
+        return scraper.scrape_account(account_number, URL)
+    finally:
+        time.sleep = original_sleep
+
+def test_session_reused_until_rejected():
+    print("=== Testing Session Reuse ===")
+    circuit_breaker._breakers.clear()
+    path = os.path.join(tempfile.mkdtemp(), 'sessions.json')
+    session_cache._session_cache = SessionCache(path)
+    portal = FakePortal()
+
+    scraper = PortalScraper(portal)
+    assert scrape(scraper).succeeded and scraper.logins == 1
+    assert oct(os.stat(path).st_mode & 0o777) == '0o600'
+
+    # New process: the saved session is restored and login is skipped
+    session_cache._session_cache = SessionCache(path)
+    restarted = PortalScraper(portal)
+    assert scrape(restarted).succeeded and restarted.logins == 0
+    print(f"Session stats after restore: {session_cache._session_cache.stats()}")
+    assert session_cache._session_cache.stats()['hits'] == 1
+
+    # The portal expires the token: fall back to a full login and save the new session
+    portal.valid_tokens.clear()
+    assert scrape(restarted).succeeded and restarted.logins == 1
+    assert session_cache._session_cache.stats()['misses'] == 1
+    assert session_cache._session_cache.get('37226784')['local_storage'] == {'token': 'token-2'}
+    session_cache._session_cache = None
+    print("✅ PASS")
+
+def test_expiry_and_isolation():
+    print("\n=== Testing Session Expiry ===")
+    cache = SessionCache(os.path.join(tempfile.mkdtemp(), 'sessions.json'))
+    saved_at = datetime(2025, 8, 17, 8, 0)
+    cache.save('37226784', [{'name': 'token', 'value': 'abc'}], {'token': 'abc'}, DASHBOARD, now=saved_at)
+    assert cache.get('37226784', now=saved_at + timedelta(hours=1))
+    assert cache.get('37226784', now=saved_at + cache.max_age + timedelta(minutes=1)) is None
+    assert cache.get('37202772', now=saved_at) is None
+    cache.invalidate('37226784')
+    assert cache.get('37226784', now=saved_at) is None
+    print("✅ PASS")
+
+def save_sessions(path, accounts):
+    # Each process has its own SessionCache, loaded before the others wrote anything
+    cache = SessionCache(path)
+    for account_number in accounts:
+        cache.save(account_number, [], {'token': account_number}, DASHBOARD)
+
+def test_concurrent_writers_keep_each_others_sessions():
+    print("\n=== Testing Concurrent Session Writers ===")
+    path = os.path.join(tempfile.mkdtemp(), 'sessions.json')
+    batches = [[f"{worker}{i:04d}" for i in range(20)] for worker in range(4)]
+    workers = [multiprocessing.Process(target=save_sessions, args=(path, accounts)) for accounts in batches]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    cache = SessionCache(path)
+    print(f"Sessions on disk: {len(cache.sessions)}")
+    assert sorted(cache.sessions) == sorted(account for accounts in batches for account in accounts)
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith('.tmp')]
+
+    # A stale process invalidating its rejected login keeps the newer one another process saved
+    stale = SessionCache(path)
+    cache.save('00000', [], {'token': 'fresh'}, DASHBOARD, now=datetime.now() + timedelta(minutes=1))
+    stale.invalidate('00000')
+    assert SessionCache(path).get('00000')['local_storage'] == {'token': 'fresh'}
+    stale.invalidate('10000')
+    assert SessionCache(path).get('10000') is None
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Session Cache Test")
+    print("=" * 40)
+
+    test_session_reused_until_rejected()
+    test_expiry_and_isolation()
+    test_concurrent_writers_keep_each_others_sessions()
+
+    print("\n🎉 All session cache tests passed!")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed page snapshot archive and the pure extraction rules
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import snapshot_archive
+from extraction import extract_fields
+from scraper import ElectricityMeterScraper, HttpDriver, get_browser_engine
+from snapshot_archive import SnapshotArchive
+
+DASHBOARD_HTML = """
+<html><body>
+  <span>Remaining Balance: 135.25 BDT</span>
+  <span>Reading time: 17 Aug 2025 00:00</span>
+  <p>Last Recharge: <b>1,000.00 BDT</b></p>
+  <p>Recharge time: 16 Aug 2025 15:16</p>
+</body></html>
+"""
+
+def test_dedupe_and_index():
+    print("=== Testing Snapshot Dedupe ===")
+    archive = SnapshotArchive(tempfile.mkdtemp(), retention_days=7)
+    page = {"url": "https://example.test/dashboard", "html": DASHBOARD_HTML * 50, "texts": ["Balance: 1 BDT"]}
+    morning = datetime(2025, 8, 17, 8, 0)
+    first = archive.put('37226784', page, run_id='run-1', captured_at=morning)
+    second = archive.put('37226784', dict(page), run_id='run-2', captured_at=morning + timedelta(hours=4))
+    other = archive.put('37202772', dict(page, texts=["Balance: 2 BDT"]), run_id='run-2', captured_at=morning)
+
+    stats = archive.stats()
+    print(f"Archive stats: {stats}")
+    assert first == second != other
+    assert stats['snapshots'] == 3 and stats['blobs'] == 2
+    assert stats['stored_bytes'] < stats['raw_bytes'] / 10
+    assert archive.get(first) == page
+    assert [row['run_id'] for row in archive.entries(account_number='37226784')] == ['run-1', 'run-2']
+    assert [row['account_number'] for row in archive.entries(run_id='run-2')] == ['37202772', '37226784']
+    print("✅ PASS")
+
+def test_retention():
+    print("\n=== Testing Snapshot Retention ===")
+    archive = SnapshotArchive(tempfile.mkdtemp(), retention_days=7)
+    now = datetime(2025, 8, 17, 8, 0)
+    old = archive.put('37226784', {"texts": ["old page"]}, captured_at=now - timedelta(days=10))
+    shared = archive.put('37226784', {"texts": ["same page"]}, captured_at=now - timedelta(days=9))
+    archive.put('37226784', {"texts": ["same page"]}, captured_at=now - timedelta(days=1))
+    # Blob files were all written just now; age them past the grace period
+    age_blobs(archive, time.time() - archive.prune_grace_seconds - 60)
+
+    removed, blobs_removed = archive.prune(now=now)
+    assert (removed, blobs_removed) == (2, 1)
+    # A blob still referenced by a recent day survives
+    assert archive.get(shared) == {"texts": ["same page"]}
+    try:
+        archive.get(old)
+        assert False, "pruned blob still readable"
+    except KeyError:
+        pass
+    print("✅ PASS")
+
+def age_blobs(archive, mtime):
+    for directory, _, names in os.walk(archive.objects_dir):
+        for name in names:
+            os.utime(os.path.join(directory, name), (mtime, mtime))
+
+def test_prune_spares_blobs_not_yet_indexed():
+    print("\n=== Testing Prune Grace Period ===")
+    root = tempfile.mkdtemp()
+    archive = SnapshotArchive(root, retention_days=7)
+    writer = SnapshotArchive(root, retention_days=7)
+    # Another process has written a blob but not yet its index row
+    content = b'{"texts": ["in flight"]}'
+    sha256 = hashlib.sha256(content).hexdigest()
+    writer._write_blob(sha256, content)
+
+    assert archive.prune() == (0, 0)
+    assert writer.get(sha256) == {"texts": ["in flight"]}
+
+    # Re-using an existing blob refreshes it, so it survives until the new row lands
+    age_blobs(archive, time.time() - archive.prune_grace_seconds - 60)
+    writer._write_blob(sha256, content)
+    assert archive.prune() == (0, 0)
+
+    # A blob orphaned for longer than the grace period is collected
+    age_blobs(archive, time.time() - archive.prune_grace_seconds - 60)
+    assert archive.prune() == (0, 1)
+    print("✅ PASS")
+
+def test_daily_prune_and_zlib_fallback():
+    print("\n=== Testing Daily Prune and zlib Blobs ===")
+    archive = SnapshotArchive(tempfile.mkdtemp(), retention_days=7)
+    old = archive.put('37226784', {"texts": ["a month ago"]}, captured_at=datetime.now() - timedelta(days=30))
+    # The process-wide archive was last pruned yesterday: the next use prunes again
+    archive.pruned_day = (datetime.now() - timedelta(days=1)).date().isoformat()
+    snapshot_archive._snapshot_archive = archive
+    assert snapshot_archive.get_snapshot_archive() is archive
+    assert archive.entries() == [] and archive.pruned_day == datetime.now().date().isoformat()
+    snapshot_archive._snapshot_archive = None
+    print(f"Pruned {old[:12]} on the first use of a new day")
+
+    # Blobs written with zlib by older versions stay readable
+    content = b'{"texts": ["zlib page"]}'
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = archive._path(sha256, 'zz')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(zlib.compress(content, 9))
+    assert archive.get(sha256) == {"texts": ["zlib page"]}
+    assert archive.codec == 'zst'
+    print("✅ PASS")
+
+def test_extract_data_archives_page():
+    print("\n=== Testing extract_data Snapshots ===")
+    snapshot_archive._snapshot_archive = SnapshotArchive(tempfile.mkdtemp())
+    scraper = ElectricityMeterScraper()
+    scraper.archive_snapshots = True
+    scraper.run_id = 'run-1'
+    scraper.engine = get_browser_engine('http')
+    scraper.driver = HttpDriver()
+    scraper.driver.load_html(DASHBOARD_HTML, 'https://example.test/dashboard')
+
+    reading = scraper.extract_data()
+    entries = snapshot_archive._snapshot_archive.entries(run_id='run-1')
+    assert len(entries) == 1 and entries[0]['account_number'] == scraper.account_number
+    snapshot = snapshot_archive._snapshot_archive.get(entries[0]['sha256'])
+    assert snapshot['html'] == DASHBOARD_HTML
+    # The archived texts reproduce the live reading offline
+    assert extract_fields(snapshot['texts'])['remaining_balance'] == reading.balance_text
+    snapshot_archive._snapshot_archive = None
+    print("✅ PASS")
+
+def test_extraction_special_cases():
+    print("\n=== Testing Extraction Rules ===")
+    fields = extract_fields(["3,000.00 BDT", "86.50 BDT", "10 Jul 2025 12:00", "17 Aug 2025 00:00"])
+    print(f"Fields: {fields}")
+    assert fields["remaining_balance"] == "86.50 BDT" and fields["balance_numeric"] == 86.5
+    assert fields["reading_time"] == "17 Aug 2025 00:00"
+    assert fields["last_recharge_amount"] == "3,000.00 BDT"
+    assert fields["last_recharge_date"] == "10 Jul 2025 12:00"
+    assert extract_fields([]) == {
+        "remaining_balance": "Not found", "balance_numeric": None, "reading_time": "Not found",
+        "last_recharge_amount": "Not found", "last_recharge_date": "Not found",
+    }
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Snapshot Archive Test")
+    print("=" * 40)
+
+    test_dedupe_and_index()
+    test_retention()
+    test_prune_spares_blobs_not_yet_indexed()
+    test_daily_prune_and_zlib_fallback()
+    test_extract_data_archives_page()
+    test_extraction_special_cases()
+
+    print("\n🎉 All snapshot archive tests passed!")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test the scrape work queue: leases, visibility timeouts, retries and exactly-once results
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import MeterReading
+from run_state import RunState
+from work_queue import QueueScraper, QueueWorker, SqliteWorkQueue
+
+ACCOUNTS = ['37226784', '37202772', '37195501', '37226785', '37202771']
+
+def fake_reading(account_number, balance=300.0):
+    return MeterReading(account_number=account_number, nickname='Test', balance=balance,
+                        balance_text=f'{balance} BDT', timestamp=datetime(2025, 8, 17, 8, 0))
+
+def new_queue():
+    return SqliteWorkQueue(os.path.join(tempfile.mkdtemp(), 'work_queue.db'))
+
+class FakeScraper:
+    """Stands in for ElectricityMeterScraper; fails the listed meters once"""
+
+    def __init__(self, flaky=()):
+        self.flaky = set(flaky)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def scrape_account(self, account_number, website_url):
+        with self.lock:
+            self.calls.append(account_number)
+            if account_number in self.flaky:
+                self.flaky.discard(account_number)
+                return None
+        return fake_reading(account_number, 50.0 if account_number == '37202772' else 300.0)
+
+def test_leases_and_exactly_once():
+    print("=== Testing Leases and Exactly-Once Results ===")
+    queue = new_queue()
+    assert queue.enqueue('run-1', ACCOUNTS[:2]) == 2
+    assert queue.enqueue('run-1', ACCOUNTS[:2]) == 0
+
+    first = queue.lease('worker-a', visibility_timeout=60)
+    second = queue.lease('worker-b', visibility_timeout=60)
+    assert first.account_number != second.account_number
+    assert queue.lease('worker-c') is None
+
+    # worker-a stalls past its lease; worker-c takes the job over
+    taken_over = queue.lease('worker-c', visibility_timeout=60, now=first.lease_expires + 1)
+    assert taken_over.id == first.id and taken_over.attempts == 2
+    assert not queue.complete(first, fake_reading(first.account_number, 1.0), 'worker-a')
+    assert not queue.heartbeat(first)
+    assert queue.complete(taken_over, fake_reading(first.account_number), 'worker-c')
+    assert not queue.complete(taken_over, fake_reading(first.account_number), 'worker-c')
+
+    results = queue.results('run-1')
+    print(f"Results: {[(account, r.balance) for account, r in results.items()]}")
+    assert results[first.account_number].balance == 300.0
+    assert queue.progress('run-1') == {'queued': 0, 'leased': 1, 'done': 1, 'failed': 0}
+    print("✅ PASS")
+
+def test_retries_until_max_attempts():
+    print("\n=== Testing Retries ===")
+    queue = new_queue()
+    queue.enqueue('run-2', ['37226784'], max_attempts=2)
+    job = queue.lease('worker-a')
+    assert queue.fail(job, "login failed")
+    job = queue.lease('worker-a')
+    assert job.attempts == 2
+    queue.fail(job, "login failed again")
+    assert queue.lease('worker-a') is None
+    assert queue.progress('run-2')['failed'] == 1
+    print("✅ PASS")
+
+def test_scheduler_and_workers():
+    print("\n=== Testing Queue Mode with Concurrent Workers ===")
+    path = os.path.join(tempfile.mkdtemp(), 'work_queue.db')
+    scraper = FakeScraper(flaky=['37195501'])
+    workers = [QueueWorker(SqliteWorkQueue(path), scraper, f'worker-{i}') for i in range(3)]
+    threads = []
+    for worker in workers:
+        worker.poll_interval = 0.05
+        threads.append(threading.Thread(target=worker.run, kwargs={'idle_exit': 1.0}, daemon=True))
+        threads[-1].start()
+
+    queue_scraper = QueueScraper(SqliteWorkQueue(path))
+    queue_scraper.poll_interval = 0.05
+    reported = []
+    started = time.perf_counter()
+    warnings, recharged, all_data = queue_scraper.scrape_all_meters(
+        'https://portal.queue-test.invalid/login', progress_callback=lambda a, r: reported.append(a), accounts=ACCOUNTS
+    )
+    print(f"Collected {len(all_data)} readings in {time.perf_counter() - started:.2f}s, "
+          f"{len(scraper.calls)} scrapes")
+    assert sorted(reading.account_number for reading in all_data) == sorted(ACCOUNTS)
+    assert sorted(reported) == sorted(ACCOUNTS)
+    assert [w.account_number for w in warnings] == ['37202772']
+    # The flaky meter was retried once, by the queue; nobody else was scraped twice
+    assert len(scraper.calls) == len(ACCOUNTS) + 1
+    assert scraper.calls.count('37195501') == 2
+    for thread in threads:
+        thread.join(5)
+    print("✅ PASS")
+
+def test_deadline_defers_unfinished_jobs():
+    print("\n=== Testing Run Deadline in Queue Mode ===")
+    path = os.path.join(tempfile.mkdtemp(), 'work_queue.db')
+    queue = SqliteWorkQueue(path)
+    queue_scraper = QueueScraper(SqliteWorkQueue(path))
+    queue_scraper.poll_interval = 0.05
+    run_id = 'run-deadline'
+    queue.enqueue(run_id, ACCOUNTS[:4], max_attempts=1)
+    # One meter done, one failed for good, one a worker is still scraping, one never started
+    done = queue.lease('worker-a', run_id=run_id)
+    queue.complete(done, fake_reading(done.account_number), 'worker-a')
+    failed = queue.lease('worker-a', run_id=run_id)
+    queue.fail(failed, "login failed")
+    busy = queue.lease('worker-b', visibility_timeout=600, run_id=run_id)
+
+    run_state = RunState(os.path.join(os.path.dirname(path), 'run_state.json'), ACCOUNTS[:4], run_id=run_id)
+    reported = {}
+    warnings, recharged, all_data = queue_scraper.scrape_all_meters(
+        'https://portal.queue-test.invalid/login', progress_callback=lambda a, r: reported.setdefault(a, r),
+        accounts=ACCOUNTS[:4], run_state=run_state, deadline=time.time() + 0.2
+    )
+    print(f"Deferred: {queue_scraper.deferred_meters}, reported: {sorted(reported)}")
+    assert [reading.account_number for reading in all_data] == [done.account_number]
+    assert sorted(queue_scraper.deferred_meters) == sorted([busy.account_number, ACCOUNTS[3]])
+    # Only the meter that really failed is reported as a failed scrape
+    assert reported == {done.account_number: reported[done.account_number], failed.account_number: None}
+    print("✅ PASS")
+
+if __name__ == "__main__":
+    print("Work Queue Test")
+    print("=" * 40)
+
+    test_leases_and_exactly_once()
+    test_retries_until_max_attempts()
+    test_scheduler_and_workers()
+    test_deadline_defers_unfinished_jobs()
+
+    print("\n🎉 All work queue tests passed!")
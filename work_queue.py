@@ -0,0 +1,472 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from models import MeterReading
+
+
+@dataclass(slots=True)
+class Job:
+    """One meter to scrape for one run, as handed to a worker with its lease"""
+    id: int
+    run_id: str
+    account_number: str
+    attempts: int
+    lease_token: str
+    lease_expires: float
+
+
+class WorkQueue:
+    """Interface for the scrape job queue; SqliteWorkQueue is the local implementation.
+
+    A broker-backed queue only has to provide these methods with the same
+    semantics: a leased job is invisible to other workers until its lease
+    expires, and at most one result per (run, meter) is ever recorded.
+    """
+
+    def enqueue(self, run_id, accounts, max_attempts=None):
+        raise NotImplementedError
+
+    def lease(self, worker_id, visibility_timeout=None, run_id=None):
+        raise NotImplementedError
+
+    def heartbeat(self, job, visibility_timeout=None):
+        raise NotImplementedError
+
+    def complete(self, job, reading, worker_id=None):
+        raise NotImplementedError
+
+    def fail(self, job, error):
+        raise NotImplementedError
+
+    def cancel(self, run_id, accounts):
+        raise NotImplementedError
+
+    def results(self, run_id):
+        raise NotImplementedError
+
+    def progress(self, run_id):
+        raise NotImplementedError
+
+    def job_states(self, run_id):
+        raise NotImplementedError
+
+
+class SqliteWorkQueue(WorkQueue):
+    """Work queue in a SQLite file that every scheduler and worker process opens.
+
+    Leasing happens inside BEGIN IMMEDIATE, so two workers (threads, processes
+    or nodes sharing the file) can never take the same job. Results are keyed
+    by (run_id, account_number) and only accepted from the current lease
+    holder, so a worker whose lease expired can't record a second result.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.getenv('WORK_QUEUE_PATH', 'work_queue.db')
+        self.visibility_timeout = float(os.getenv('WORK_QUEUE_VISIBILITY_TIMEOUT', '600'))
+        self.max_attempts = int(os.getenv('WORK_QUEUE_MAX_ATTEMPTS', '3'))
+        self._lock = threading.Lock()
+        # Transactions are managed explicitly so leases can use BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self._create_tables()
+
+    def _create_tables(self):
+        with self._lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    account_number TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    lease_owner TEXT,
+                    lease_token TEXT,
+                    lease_expires REAL,
+                    error TEXT,
+                    enqueued_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    UNIQUE (run_id, account_number)
+                )
+            """)
+            self.conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, lease_expires)
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    run_id TEXT NOT NULL,
+                    account_number TEXT NOT NULL,
+                    worker TEXT,
+                    data TEXT NOT NULL,
+                    recorded_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, account_number)
+                )
+            """)
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT/ROLLBACK, so concurrent writers across processes are serialized"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def enqueue(self, run_id, accounts, max_attempts=None):
+        """Add one job per meter; meters already queued for this run are left alone. Returns the number added."""
+        now = time.time()
+        max_attempts = max_attempts or self.max_attempts
+        with self._transaction() as conn:
+            added = 0
+            for account_number in accounts:
+                added += conn.execute("""
+                    INSERT OR IGNORE INTO jobs (run_id, account_number, max_attempts, enqueued_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (run_id, account_number, max_attempts, now, now)).rowcount
+        return added
+
+    def lease(self, worker_id, visibility_timeout=None, run_id=None, now=None):
+        """Take the oldest available job (queued, or leased with an expired lease), or return None"""
+        now = now or time.time()
+        visibility_timeout = visibility_timeout or self.visibility_timeout
+        with self._transaction() as conn:
+            # Expired leases that already used every attempt won't come back
+            conn.execute("""
+                UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expired'), updated_at = ?
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts
+            """, (now, now))
+            query = """
+                SELECT id, run_id, account_number, attempts FROM jobs
+                WHERE (status = 'queued' OR (status = 'leased' AND lease_expires < ?))
+            """
+            params = [now]
+            if run_id:
+                query += " AND run_id = ?"
+                params.append(run_id)
+            row = conn.execute(query + " ORDER BY id LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            job = Job(row['id'], row['run_id'], row['account_number'], row['attempts'] + 1,
+                      uuid.uuid4().hex, now + visibility_timeout)
+            conn.execute("""
+                UPDATE jobs SET status = 'leased', attempts = ?, lease_owner = ?, lease_token = ?,
+                                lease_expires = ?, updated_at = ?
+                WHERE id = ?
+            """, (job.attempts, worker_id, job.lease_token, job.lease_expires, now, job.id))
+        return job
+
+    def heartbeat(self, job, visibility_timeout=None):
+        """Extend a lease still held by this job; False if it was lost to another worker"""
+        now = time.time()
+        expires = now + (visibility_timeout or self.visibility_timeout)
+        with self._transaction() as conn:
+            updated = conn.execute("""
+                UPDATE jobs SET lease_expires = ?, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_token = ?
+            """, (expires, now, job.id, job.lease_token)).rowcount
+        if updated:
+            job.lease_expires = expires
+        return bool(updated)
+
+    def complete(self, job, reading, worker_id=None):
+        """Record the job's MeterReading exactly once. Returns False if the lease was lost or a result exists."""
+        now = time.time()
+        with self._transaction() as conn:
+            owned = conn.execute("""
+                UPDATE jobs SET status = 'done', lease_token = NULL, lease_expires = NULL, error = NULL, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_token = ?
+            """, (now, job.id, job.lease_token)).rowcount
+            if not owned:
+                return False
+            conn.execute("""
+                INSERT OR IGNORE INTO results (run_id, account_number, worker, data, recorded_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (job.run_id, job.account_number, worker_id, json.dumps(reading.to_dict()), now))
+        return True
+
+    def fail(self, job, error):
+        """Give the job back for another attempt, or mark it failed once attempts run out"""
+        now = time.time()
+        with self._transaction() as conn:
+            updated = conn.execute("""
+                UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                                lease_token = NULL, lease_expires = NULL, error = ?, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND lease_token = ?
+            """, (str(error), now, job.id, job.lease_token)).rowcount
+        return bool(updated)
+
+    def cancel(self, run_id, accounts):
+        """Withdraw jobs of a run that no worker has leased yet; returns the accounts withdrawn"""
+        now = time.time()
+        cancelled = []
+        with self._transaction() as conn:
+            for account_number in accounts:
+                if conn.execute("""
+                    UPDATE jobs SET status = 'cancelled', updated_at = ?
+                    WHERE run_id = ? AND account_number = ? AND status = 'queued'
+                """, (now, run_id, account_number)).rowcount:
+                    cancelled.append(account_number)
+        return cancelled
+
+    def results(self, run_id):
+        """MeterReadings recorded for a run, keyed by account number"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT account_number, data FROM results WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {row['account_number']: MeterReading.from_dict(json.loads(row['data'])) for row in rows}
+
+    def progress(self, run_id, now=None):
+        """Job counts by status for a run; leases that expired with attempts left count as queued"""
+        counts = {'queued': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        for state in self.job_states(run_id, now).values():
+            counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def job_states(self, run_id, now=None):
+        """{account: status} for a run, with expired leases counted as progress() does"""
+        now = now or time.time()
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT account_number,
+                       CASE WHEN status = 'leased' AND lease_expires < ?
+                            THEN CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END
+                            ELSE status END AS state
+                FROM jobs WHERE run_id = ?
+            """, (now, run_id)).fetchall()
+        return {row['account_number']: row['state'] for row in rows}
+
+    def purge(self, older_than_days=7):
+        """Drop jobs and results of runs finished more than older_than_days ago"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._transaction() as conn:
+            stale = [row[0] for row in conn.execute("""
+                SELECT run_id FROM jobs GROUP BY run_id
+                HAVING MAX(updated_at) < ? AND SUM(status IN ('queued', 'leased')) = 0
+            """, (cutoff,)).fetchall()]
+            for run_id in stale:
+                conn.execute("DELETE FROM jobs WHERE run_id = ?", (run_id,))
+                conn.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+        return len(stale)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+WORK_QUEUE_BACKENDS = {
+    'sqlite': SqliteWorkQueue,
+}
+
+
+def get_work_queue(name=None):
+    """Return the work queue selected by WORK_QUEUE_BACKEND (default: sqlite)"""
+    name = (name or os.getenv('WORK_QUEUE_BACKEND', 'sqlite')).lower()
+    if name not in WORK_QUEUE_BACKENDS:
+        print(f"Unknown WORK_QUEUE_BACKEND '{name}', using sqlite. Options: {', '.join(WORK_QUEUE_BACKENDS)}")
+        name = 'sqlite'
+    return WORK_QUEUE_BACKENDS[name]()
+
+
+class QueueWorker:
+    """Pulls jobs off the queue, scrapes each meter and pushes the result back.
+
+    Any number of these can run, on this machine or others sharing the queue.
+    The lease is extended in the background while a scrape is in progress, so
+    only a worker that died (or hung past the visibility timeout) loses its job.
+    Each lease is a single scrape attempt; a failed job goes back on the queue.
+    """
+
+    def __init__(self, queue, scraper=None, worker_id=None, website_url=None):
+        self.queue = queue
+        self._scraper = scraper
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.website_url = website_url or os.getenv(
+            'METER_WEBSITE_URL', 'https://prepaid.desco.org.bd/customer/#/customer-login'
+        )
+        self.poll_interval = float(os.getenv('WORK_QUEUE_POLL_SECONDS', '5'))
+
+    @property
+    def scraper(self):
+        # Only workers that actually get a job pay for Selenium
+        if self._scraper is None:
+            from scraper import ElectricityMeterScraper
+            self._scraper = ElectricityMeterScraper()
+        return self._scraper
+
+    def _keep_leased(self, job, stop):
+        interval = max((job.lease_expires - time.time()) / 3, 0.05)
+        while not stop.wait(interval):
+            if not self.queue.heartbeat(job):
+                print(f"Lost lease on job {job.id} ({job.account_number})")
+                return
+
+    def process(self, job):
+        """Scrape one leased job. Returns True if its result was recorded."""
+        print(f"Worker {self.worker_id}: job {job.id} account {job.account_number} (attempt {job.attempts})")
+        stop = threading.Event()
+        keeper = threading.Thread(target=self._keep_leased, args=(job, stop), daemon=True)
+        keeper.start()
+        try:
+            self.scraper.run_id = job.run_id
+            # One attempt per lease: retries are the queue's (WORK_QUEUE_MAX_ATTEMPTS), not SCRAPE_MAX_RETRIES on
+            # top of it, so a failing meter launches Chrome at most max_attempts times per run
+            reading = self.scraper.scrape_account(job.account_number, self.website_url)
+        except Exception as e:
+            reading = None
+            print(f"Worker {self.worker_id}: account {job.account_number} raised {str(e)}")
+        finally:
+            stop.set()
+            keeper.join()
+
+        if reading and reading.succeeded:
+            recorded = self.queue.complete(job, reading, self.worker_id)
+            if not recorded:
+                print(f"Worker {self.worker_id}: result for {job.account_number} discarded, lease was lost")
+            return recorded
+        self.queue.fail(job, getattr(reading, 'error_message', None) or "scrape failed")
+        return False
+
+    def run(self, run_id=None, once=False, idle_exit=None):
+        """Work until stopped; once=True drains the queue and returns, idle_exit stops after that many idle seconds"""
+        processed = 0
+        idle_since = time.monotonic()
+        while True:
+            job = self.queue.lease(self.worker_id, run_id=run_id)
+            if job is None:
+                if once or (idle_exit is not None and time.monotonic() - idle_since >= idle_exit):
+                    return processed
+                time.sleep(self.poll_interval)
+                continue
+            self.process(job)
+            processed += 1
+            idle_since = time.monotonic()
+
+
+class QueueScraper:
+    """Drop-in for ElectricityMeterScraper.scrape_all_meters that hands the meters to queue workers.
+
+    The scheduler enqueues one job per meter under the run's id (so a resumed
+    run doesn't enqueue twice), then collects results as workers record them
+    until every job is done or failed, or QUEUE_RUN_TIMEOUT passes.
+    """
+
+    def __init__(self, queue=None):
+        from scraper import ElectricityMeterScraper
+        self.queue = queue or get_work_queue()
+        # Used in-process only for configuration and result classification - never launches Chrome
+        self.inline = ElectricityMeterScraper()
+        self.all_meters = self.inline.all_meters
+        self.meter_nicknames = self.inline.meter_nicknames
+        self.skipped_meters = []
+        self.deferred_meters = []
+        self.timeout = float(os.getenv('QUEUE_RUN_TIMEOUT', '3600'))
+        self.poll_interval = float(os.getenv('WORK_QUEUE_POLL_SECONDS', '5'))
+
+    def scrape_all_meters(self, website_url, progress_callback=None, accounts=None, run_state=None, deadline=None):
+        accounts = list(accounts or self.all_meters)
+        run_id = run_state.run_id if run_state else uuid.uuid4().hex[:12]
+        self.skipped_meters = []
+        self.deferred_meters = []
+
+        results = {}
+        pending = []
+        for account_number in accounts:
+            resumed = run_state.get_completed(account_number) if run_state else None
+            if resumed:
+                results[account_number] = resumed
+                if progress_callback:
+                    progress_callback(account_number, resumed)
+            else:
+                pending.append(account_number)
+
+        added = self.queue.enqueue(run_id, pending)
+        print(f"Queued {added} meters for run {run_id} ({len(pending) - added} already queued)")
+
+        wait_until = time.time() + self.timeout
+        if deadline:
+            wait_until = min(wait_until, deadline)
+        while pending:
+            for account_number, reading in self.queue.results(run_id).items():
+                if account_number in pending:
+                    pending.remove(account_number)
+                    results[account_number] = reading
+                    if run_state:
+                        run_state.record_result(account_number, reading)
+                    if progress_callback:
+                        progress_callback(account_number, reading)
+            progress = self.queue.progress(run_id)
+            if not pending or progress['queued'] + progress['leased'] == 0:
+                break
+            if deadline and time.time() > deadline:
+                # Jobs nobody has started yet go to the follow-up run instead, and so do the ones a
+                # worker is still on - they weren't scraped in this run, they didn't fail
+                cancelled = self.queue.cancel(run_id, pending)
+                states = self.queue.job_states(run_id)
+                self.deferred_meters = [
+                    account for account in pending
+                    if account in cancelled or states.get(account) in ('queued', 'leased')
+                ]
+                print(f"Run {run_id}: time budget used up, deferring {len(self.deferred_meters)} meters")
+                break
+            if time.time() > wait_until:
+                print(f"Run {run_id}: gave up waiting for {len(pending)} meters after {self.timeout:.0f}s")
+                break
+            time.sleep(self.poll_interval)
+
+        for account_number in pending:
+            if progress_callback and account_number not in self.deferred_meters:
+                progress_callback(account_number, None)
+
+        low_balance_warnings = []
+        recently_recharged = []
+        all_data = []
+        for account_number in accounts:
+            if account_number in self.deferred_meters:
+                continue
+            self.inline.classify_meter_data(
+                account_number, results.get(account_number), low_balance_warnings, recently_recharged, all_data
+            )
+        return low_balance_warnings, recently_recharged, all_data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape work queue: run a worker or show a run's progress")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    worker = subparsers.add_parser('worker', help="Pull and scrape jobs from the queue")
+    worker.add_argument('--id', help="Worker id (defaults to hostname-pid)")
+    worker.add_argument('--run', help="Only take jobs from this run id")
+    worker.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+    status = subparsers.add_parser('status', help="Job counts for a run")
+    status.add_argument('run_id')
+    subparsers.add_parser('purge', help="Delete runs finished more than a week ago")
+    args = parser.parse_args(argv)
+
+    queue = get_work_queue()
+    try:
+        if args.command == 'worker':
+            processed = QueueWorker(queue, worker_id=args.id).run(run_id=args.run, once=args.once)
+            print(f"✅ Worker processed {processed} jobs")
+        elif args.command == 'status':
+            print(json.dumps(queue.progress(args.run_id), indent=2))
+        else:
+            print(f"🧹 Purged {queue.purge()} finished runs")
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())